@@ -1,31 +1,120 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from aiohttp import web
 from aiohttp_pydantic import oas
 from aiohttp_security import setup as setup_security
 
 from .config import get_config
+from .events import EventBroker
 from .level import MetaLevel
-from .models import error_middleware, Model
+from .level_executor import LevelExecutor
+from .metrics import metrics_middleware
+from .models import clock_middleware, error_middleware, Model
+from .models.games import member_ids
+from .models.storage import JournalStorage, SQLiteStorage
+from .puzzle_pool import puzzle_pool
 from .routes import setup_routes
+from .tracing import Tracer
+from .views import theme_cache
+from .warmup import warm_up
+from .watchdog import watchdog
 from .authorization import AuthorizationPolicy, BasicAuthIdentityPolicy
 
 
 __version__ = "2.0.2"
 
 
-def make_app(config_args: Optional[List] = None):
+async def _close_storage(app):
+    app["model"].storage.close()
+
+
+def make_app(config_args: Optional[List] = None, shard: Optional[Tuple] = None):
     """
     Read config and launch asterios server.
+
+    `shard` is the (index, count) of the worker when the games are
+    partitioned between workers, see `asterios.sharding`.
     """
     config = get_config(config_args)
+    # The files written by the workers are suffixed by the shard index.
+    shard_suffix = ""
+    if shard is not None:
+        member_ids.set_shard(*shard)
+        shard_suffix = ".{}".format(shard[0])
     for level_package in config["level_package"]:
         MetaLevel.load_level(level_package)
+    MetaLevel.compile()
+    puzzle_pool.configure(config["puzzle_pool_depth"])
+    if config.get("warmup"):
+        _, errors = warm_up(budget=config["warmup"]["budget"])
+        if errors and config["warmup"]["strict"]:
+            raise SystemExit("The warmup failed:\n" + "\n".join(errors))
+    theme_cache.encode()
 
-    app = web.Application(middlewares=[error_middleware])
+    middlewares = [metrics_middleware, error_middleware, clock_middleware]
+    tracer = None
+    if config.get("tracing"):
+        trace_path = config["tracing"]["file"]
+        tracer = Tracer(
+            server_timing=bool(config["tracing"]["server_timing"]),
+            path=trace_path and trace_path + shard_suffix,
+            max_bytes=config["tracing"]["file_max_bytes"],
+            backup_count=config["tracing"]["file_backups"],
+            slow=config["tracing"]["slow"],
+        )
+        middlewares.insert(1, tracer.middleware)
+
+    app = web.Application(middlewares=middlewares)
     setup_routes(app)
     app["config"] = config
-    app["model"] = Model()
+    executor = LevelExecutor(
+        thread_themes=config["thread_pool_themes"],
+        process_themes=config["process_pool_themes"],
+        max_workers=config["level_workers"] or None,
+    )
+    storage = None
+    if config.get("sqlite"):
+        storage = SQLiteStorage(
+            config["sqlite"]["path"] + shard_suffix,
+            config["sqlite"]["flush_interval"],
+        )
+    elif config.get("journal"):
+        storage = JournalStorage(
+            config["journal"]["directory"] + shard_suffix,
+            config["journal"]["fsync_interval"],
+            config["journal"]["snapshot_interval"],
+        )
+    app["model"] = Model(executor=executor, storage=storage)
+    app["model"].load()
+    app["events"] = EventBroker(config["event_buffer"])
+    app["model"].subscribe(app["events"])
+    app.on_shutdown.append(app["events"].stop)
+    app.on_startup.append(app["model"].storage.start)
+    app.on_cleanup.append(app["model"].storage.stop)
+    app.on_cleanup.append(_close_storage)
+    app.on_cleanup.append(executor.shutdown)
+    app.on_startup.append(app["model"].scheduler.start)
+    app.on_cleanup.append(app["model"].scheduler.stop)
+
+    if tracer is not None:
+        app.on_startup.append(tracer.start)
+        app.on_cleanup.append(tracer.stop)
+
+    if config.get("watchdog"):
+        watchdog_path = config["watchdog"]["file"]
+        watchdog.configure(
+            config["watchdog"]["threshold"],
+            interval=config["watchdog"]["interval"],
+            path=watchdog_path and watchdog_path + shard_suffix,
+            repeat=config["watchdog"]["repeat"],
+        )
+    else:
+        watchdog.configure(0.0)
+    app.on_startup.append(watchdog.start)
+    app.on_cleanup.append(watchdog.stop)
+
+    app.on_startup.append(puzzle_pool.start)
+    app.on_cleanup.append(puzzle_pool.stop)
 
     if config.get("authentication"):
         user_map = {
@@ -1,8 +1,13 @@
 import sys
-from aiohttp import web
 
 from . import make_app
+from .config import get_config
+from .sharding import install_event_loop, run_app, run_sharded
 
 
-app = make_app(sys.argv[1:])
-web.run_app(app, host=app["config"]["host"], port=app["config"]["port"])
+config = get_config(sys.argv[1:])
+if config["workers"] > 1:
+    run_sharded(sys.argv[1:], config)
+else:
+    install_event_loop(config["event_loop"])
+    run_app(make_app(sys.argv[1:]), config)
@@ -5,7 +5,13 @@ from basicauth import decode
 class AuthorizationPolicy(AbstractAuthorizationPolicy):
 
     PERMISSIONS = {
-        "superuser": ("gameconfig.create", "gameconfig.update", "gameconfig.delete")
+        "superuser": (
+            "gameconfig.create",
+            "gameconfig.update",
+            "gameconfig.delete",
+            "admin.read",
+            "admin.profile",
+        )
     }
 
     def __init__(self, user_map):
@@ -0,0 +1,6 @@
+"""
+This package contains the benchmarks of asterios.
+
+Each module can be run with `python -m asterios.bench.<module> --help`,
+`python -m asterios.bench` runs the load generator of `asterios.bench.load`.
+"""
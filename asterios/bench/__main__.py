@@ -0,0 +1,4 @@
+from .load import main
+
+
+main()
@@ -0,0 +1,367 @@
+"""
+Measure the throughput and the allocations of each route in-process.
+
+For each model size of `--sizes` (a number of started team members, in
+games of 10 members), an application is built with `make_app` and each
+route is called `--requests` times with the aiohttp test client, the best
+of `--repeat` rounds is kept to reduce the noise. The
+allocations of a request are the peak of the memory traced by `tracemalloc`
+while the application handles the request (the test client and the
+transport are excluded), measured on `ALLOC_SAMPLES` extra requests so
+that `tracemalloc` doesn't slow down the measure of the throughput::
+
+    PYTHONPATH=./sample/:$PYTHONPATH python -m asterios.bench.endpoints \\
+        --save baseline.json
+    PYTHONPATH=./sample/:$PYTHONPATH python -m asterios.bench.endpoints \\
+        --compare baseline.json --threshold 0.2
+
+With `--compare`, the command exits with the status 1 when the throughput
+of a route is lower than the baseline by more than `--threshold`, when
+the allocations of a route are higher than the baseline by more than
+`--alloc-threshold`, when a route returns an unexpected status or when
+a route of the baseline is not measured.
+"""
+
+from argparse import ArgumentParser
+import asyncio
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from .. import make_app
+from ..profiler import reset_peak
+
+
+ALLOC_SAMPLES = 20
+TEAM_SIZE = 10
+
+
+def _populate(model, theme, members):
+    teams = []
+    for index in range(0, members, TEAM_SIZE):
+        name = "team-{}".format(index // TEAM_SIZE)
+        model.create(
+            {
+                "team": name,
+                "team_members": [
+                    {"name": "member {}".format(number), "theme": theme}
+                    for number in range(min(TEAM_SIZE, members - index))
+                ],
+                "duration": 60,
+            }
+        )
+        game = model.start(name)
+        teams.append((name, [member.id for member in game.team_members]))
+    return teams
+
+
+def _create_ready_games(model, theme, prefix, count):
+    for index in range(count):
+        model.create(
+            {
+                "team": "{}-{}".format(prefix, index),
+                "team_members": [{"name": "member", "theme": theme}],
+                "duration": 60,
+            }
+        )
+
+
+def _routes(model, theme, teams, count):
+    """
+    Return a dict mapping a route to a 4-tuple with the HTTP method,
+    a function returning the URL and the keyword arguments of the request
+    number `index`, the expected status and a function preparing the model
+    or None.
+
+    The routes adding games are measured last, so that the added games
+    don't change the size of the model measured by the other routes.
+    """
+    members = [
+        (name, member_id) for name, member_ids in teams for member_id in member_ids
+    ]
+
+    def team(index):
+        return teams[index % len(teams)][0]
+
+    def member_url(index, action=""):
+        return "/asterios/{}/member/{}{}".format(
+            *members[index % len(members)], action
+        )
+
+    return {
+        "list": ("GET", lambda index: ("/game-config", {}), 200, None),
+        "get": ("GET", lambda index: ("/game-config/" + team(index), {}), 200, None),
+        "member": ("GET", lambda index: (member_url(index), {}), 200, None),
+        "leaderboard": ("GET", lambda index: ("/leaderboard", {}), 200, None),
+        "puzzle": (
+            "PUT",
+            lambda index: (member_url(index, "/puzzle"), {}),
+            200,
+            None,
+        ),
+        "solve": (
+            "PUT",
+            lambda index: (
+                member_url(index, "/solve"),
+                {"data": b"null", "headers": {"Content-Type": "application/json"}},
+            ),
+            420,
+            None,
+        ),
+        "create": (
+            "POST",
+            lambda index: (
+                "/game-config",
+                {
+                    "json": {
+                        "team": "bench-create-{}".format(index),
+                        "team_members": [{"name": "member", "theme": theme}],
+                        "duration": 60,
+                    }
+                },
+            ),
+            201,
+            None,
+        ),
+        "start": (
+            "PUT",
+            lambda index: ("/game-config/bench-start-{}/start".format(index), {}),
+            200,
+            lambda: _create_ready_games(model, theme, "bench-start", count),
+        ),
+        "add-member": (
+            "PUT",
+            lambda index: (
+                "/game-config/bench-add-{}/add-member".format(index),
+                {"json": {"name": "new member", "theme": theme}},
+            ),
+            200,
+            lambda: _create_ready_games(model, theme, "bench-add", count),
+        ),
+    }
+
+
+class _AllocationMeter:
+    """
+    Sums the peaks of the memory allocated by the handlers of the
+    application while `tracemalloc` is tracing.
+    """
+
+    def __init__(self):
+        self.allocated = 0
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        """
+        Measure the peak of the memory allocated by `handler`.
+        """
+        if not tracemalloc.is_tracing():
+            return await handler(request)
+        reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            return await handler(request)
+        finally:
+            self.allocated += tracemalloc.get_traced_memory()[1] - before
+
+
+async def _request(client, method, url, kwargs):
+    async with client.request(method, url, **kwargs) as response:
+        await response.read()
+        return response.status
+
+
+async def _measure(level_package, members, requests, repeat):
+    app = make_app(["--level-package", level_package])
+    meter = _AllocationMeter()
+    app.middlewares.insert(0, meter.middleware)
+    model = app["model"]
+    teams = _populate(model, level_package, members)
+    count = requests * repeat + ALLOC_SAMPLES
+    routes = _routes(model, level_package, teams, count)
+    results = {}
+    async with TestClient(TestServer(app)) as client:
+        for route, (method, build, status, prepare) in routes.items():
+            if prepare is not None:
+                prepare()
+            calls = [build(index) for index in range(count)]
+            errors = 0
+            elapsed = float("inf")
+            for offset in range(0, requests * repeat, requests):
+                gc.collect()
+                start = time.perf_counter()
+                for url, kwargs in calls[offset : offset + requests]:
+                    if await _request(client, method, url, kwargs) != status:
+                        errors += 1
+                elapsed = min(elapsed, time.perf_counter() - start)
+
+            meter.allocated = 0
+            tracemalloc.start()
+            for url, kwargs in calls[requests * repeat :]:
+                await _request(client, method, url, kwargs)
+            tracemalloc.stop()
+
+            results[route] = {
+                "ops": requests / elapsed,
+                "alloc_bytes": meter.allocated / ALLOC_SAMPLES,
+                "errors": errors,
+            }
+    return results
+
+
+def run(level_package, sizes, requests, repeat=3):
+    """
+    Return a dict mapping a model size to the results of each route.
+    """
+    return {
+        str(size): asyncio.run(_measure(level_package, size, requests, repeat))
+        for size in sizes
+    }
+
+
+def compare(baseline, results, threshold, alloc_threshold=0.2):
+    """
+    Return a list of (size, route, baseline ops, ops, change) of the routes
+    measured in both results, and the list of (size, route, reason) of the
+    failed routes: the routes whose throughput is lower than the baseline by
+    more than `threshold`, the routes whose allocations are higher than the
+    baseline by more than `alloc_threshold`, the routes with errors and the
+    routes of the baseline missing in the results.
+
+    >>> baseline = {'10': {'list': {'ops': 100.0, 'alloc_bytes': 1000.0},
+    ...                    'get': {'ops': 100.0, 'alloc_bytes': 1000.0},
+    ...                    'solve': {'ops': 100.0, 'alloc_bytes': 1000.0}}}
+    >>> results = {'10': {'list': {'ops': 70.0, 'alloc_bytes': 1100.0,
+    ...                            'errors': 0},
+    ...                   'get': {'ops': 195.0, 'alloc_bytes': 1500.0,
+    ...                           'errors': 200}}}
+    >>> rows, failures = compare(baseline, results, 0.2)
+    >>> [(route, round(change, 2)) for _, route, _, _, change in rows]
+    [('list', -0.3), ('get', 0.95)]
+    >>> for failure in failures:
+    ...     print(*failure)
+    10 list throughput -30.0%
+    10 get allocations +50.0%
+    10 get 200 errors
+    10 solve missing
+    """
+    rows = []
+    failures = []
+    for size, routes in results.items():
+        for route, result in routes.items():
+            reference = baseline.get(size, {}).get(route)
+            if reference is not None:
+                change = result["ops"] / reference["ops"] - 1
+                rows.append((size, route, reference["ops"], result["ops"], change))
+                if change < -threshold:
+                    failures.append((size, route, "throughput {:+.1%}".format(change)))
+                if reference.get("alloc_bytes"):
+                    alloc_change = result["alloc_bytes"] / reference["alloc_bytes"] - 1
+                    if alloc_change > alloc_threshold:
+                        failures.append(
+                            (size, route, "allocations {:+.1%}".format(alloc_change))
+                        )
+            if result["errors"]:
+                failures.append((size, route, "{} errors".format(result["errors"])))
+    for size, routes in baseline.items():
+        for route in routes:
+            if route not in results.get(size, {}):
+                failures.append((size, route, "missing"))
+    return rows, failures
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        prog="python -m asterios.bench.endpoints", description=__doc__.split("\n")[1]
+    )
+    parser.add_argument("--level-package", default="compute")
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[10, 1000, 50000],
+        help="comma separated numbers of team members",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="write the results in this baseline file")
+    parser.add_argument("--compare", help="compare the results to this baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="max ratio of throughput lost before failing the comparison",
+    )
+    parser.add_argument(
+        "--alloc-threshold",
+        type=float,
+        default=0.2,
+        help="max ratio of allocations added before failing the comparison",
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(args)
+
+    results = run(args.level_package, args.sizes, args.requests, args.repeat)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        rows, failures = compare(
+            baseline, results, args.threshold, args.alloc_threshold
+        )
+        failed = {(size, route) for size, route, _ in failures}
+        if args.json:
+            print(json.dumps({"results": results, "failures": failures}, indent=2))
+        else:
+            print(
+                "{:>6} {:<12} {:>10} {:>10} {:>8}".format(
+                    "size", "route", "baseline", "ops/s", "change"
+                )
+            )
+            for size, route, reference, ops, change in rows:
+                print(
+                    "{:>6} {:<12} {:>10.0f} {:>10.0f} {:>+8.1%}{}".format(
+                        size,
+                        route,
+                        reference,
+                        ops,
+                        change,
+                        "  FAILED" if (size, route) in failed else "",
+                    )
+                )
+            for size, route, reason in failures:
+                print("{} {}: {}".format(size, route, reason), file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        return
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        "{:>6} {:<12} {:>10} {:>12} {:>7}".format(
+            "size", "route", "ops/s", "alloc KiB", "errors"
+        )
+    )
+    for size, routes in results.items():
+        for route, result in routes.items():
+            print(
+                "{:>6} {:<12} {:>10.0f} {:>12.1f} {:>7}".format(
+                    size,
+                    route,
+                    result["ops"],
+                    result["alloc_bytes"] / 1024,
+                    result["errors"],
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
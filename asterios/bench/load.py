@@ -0,0 +1,400 @@
+"""
+Measure how many players an asterios server can handle.
+
+The scenario creates `--teams` games of `--members` team members with
+`POST /game-config`, starts them and runs a bot by team member playing the
+puzzle/solve loop during `--duration` seconds. The bots solve the levels of
+`sample/compute.py`, the puzzles of other levels get a wrong answer. A bot
+stops when its team member wins, `--wrong-answers` is the ratio of wrong
+answers sent on purpose to keep the bots playing the few levels of
+`sample/compute.py`.
+
+The server is started in a subprocess with `--level-package` and the
+unknown options, or the bots play against the running server of `--url`::
+
+    PYTHONPATH=./sample/:$PYTHONPATH python -m asterios.bench --teams 20
+    PYTHONPATH=./sample/:$PYTHONPATH python -m asterios.bench --workers 4
+    python -m asterios.bench --url http://127.0.0.1:8080 --json > run.json
+
+The report contains the throughput, the latency percentiles and the error
+rate of each route. The expected statuses are not errors, e.g. 420 when
+a bot sends a wrong answer. After an error, a bot waits before retrying,
+the delay is doubled after each error from `BACKOFF_MIN` to `BACKOFF_MAX`.
+"""
+
+from argparse import ArgumentParser
+import asyncio
+from collections import defaultdict
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+
+def _solve_decimal_sums(puzzle):
+    return [int(left) + int(right) for left, _, right in map(str.split, puzzle)]
+
+
+def _solve_hexadecimal_operations(puzzle):
+    answer = []
+    for left, operator, right in map(str.split, puzzle):
+        left, right = int(left, 16), int(right, 16)
+        answer.append("{:x}".format(left + right if operator == "+" else left - right))
+    return answer
+
+
+#: Maps (theme, level number) to a function returning the answer of a puzzle.
+SOLVERS = {
+    ("compute", 1): _solve_decimal_sums,
+    ("compute", 2): _solve_hexadecimal_operations,
+}
+
+#: The statuses returned by the routes when the bots play as expected.
+EXPECTED_STATUSES = {
+    "create": (201,),
+    "start": (200,),
+    "puzzle": (200, 409),
+    "solve": (201, 420),
+    "delete": (200,),
+}
+
+#: The routes of the puzzle/solve loop, the other routes prepare the games.
+PLAY_ROUTES = ("puzzle", "solve")
+
+#: The bounds in seconds of the delay of a bot retrying after an error.
+BACKOFF_MIN = 0.01
+BACKOFF_MAX = 1.0
+
+
+def percentile(values, rank):
+    """
+    Return the `rank` percentile of the sorted `values` (nearest rank).
+
+    >>> values = list(range(1, 101))
+    >>> percentile(values, 50), percentile(values, 99), percentile([], 50)
+    (50, 99, None)
+    """
+    if not values:
+        return None
+    index = max(0, -(-len(values) * rank // 100) - 1)
+    return values[index]
+
+
+class Recorder:
+    """
+    Records the latency and the status of the requests by route.
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.solved = 0
+        self.won = 0
+
+    async def request(self, session, route, method, url, **kwargs):
+        """
+        Send a request and return a 2-tuple with the status and the body,
+        the status is None if the request failed.
+        """
+        start = time.perf_counter()
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                body = await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status, body = None, None
+        self.latencies[route].append(time.perf_counter() - start)
+        if status not in EXPECTED_STATUSES[route]:
+            self.errors[route] += 1
+        return status, body
+
+    def report(self, elapsed):
+        """
+        Return the throughput, the error rate and the latency percentiles
+        of each route. The total throughput counts the requests of the
+        puzzle/solve loop sent during `elapsed` seconds.
+        """
+        routes = {}
+        for route, latencies in self.latencies.items():
+            latencies.sort()
+            routes[route] = {
+                "count": len(latencies),
+                "throughput": len(latencies) / elapsed,
+                "error_rate": self.errors[route] / len(latencies),
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+            }
+        count = sum(routes.get(route, {"count": 0})["count"] for route in PLAY_ROUTES)
+        return {
+            "elapsed": elapsed,
+            "requests": count,
+            "throughput": count / elapsed,
+            "errors": sum(self.errors.values()),
+            "solved": self.solved,
+            "won": self.won,
+            "routes": routes,
+        }
+
+
+async def _back_off(delay, deadline):
+    """
+    Wait before retrying after an error and return the delay,
+    `delay` is the delay of the previous error or 0.
+    """
+    delay = min(max(delay * 2, BACKOFF_MIN), BACKOFF_MAX)
+    await asyncio.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+    return delay
+
+
+async def _play(session, recorder, url, theme, deadline, wrong_answers):
+    level = 1
+    delay = 0.0
+    while time.monotonic() < deadline:
+        status, body = await recorder.request(session, "puzzle", "PUT", url + "puzzle")
+        if status == 409:
+            recorder.won += 1
+            return
+        if status != 200:
+            delay = await _back_off(delay, deadline)
+            continue
+
+        solver = SOLVERS.get((theme, level))
+        answer = None
+        if solver is not None and random.random() >= wrong_answers:
+            answer = solver(json.loads(body)["puzzle"])
+        status, _ = await recorder.request(
+            session,
+            "solve",
+            "PUT",
+            url + "solve",
+            data=json.dumps(answer),
+            headers={"Content-Type": "application/json"},
+        )
+        if status == 201:
+            recorder.solved += 1
+            level += 1
+        elif status != 420:
+            delay = await _back_off(delay, deadline)
+            continue
+        delay = 0.0
+
+
+async def _run(url, theme, teams, members, duration, wrong_answers, connections, auth):
+    recorder = Recorder()
+    prefix = "bench-{}-{}".format(os.getpid(), int(time.time()))
+    names = ["{}-{}".format(prefix, index) for index in range(teams)]
+    connector = aiohttp.TCPConnector(limit=connections)
+    async with aiohttp.ClientSession(url, connector=connector, auth=auth) as session:
+        players = []
+        for name in names:
+            status, body = await recorder.request(
+                session,
+                "create",
+                "POST",
+                "/game-config",
+                json={
+                    "team": name,
+                    "team_members": [
+                        {"name": "bot {}".format(index), "theme": theme}
+                        for index in range(members)
+                    ],
+                    "duration": int(duration // 60) + 1,
+                },
+            )
+            if status != 201:
+                raise SystemExit("Cannot create the game {}: {}".format(name, body))
+            players.extend(
+                (name, member["id"]) for member in json.loads(body)["team_members"]
+            )
+            await recorder.request(
+                session, "start", "PUT", "/game-config/{}/start".format(name)
+            )
+
+        start = time.perf_counter()
+        deadline = time.monotonic() + duration
+        await asyncio.gather(
+            *(
+                _play(
+                    session,
+                    recorder,
+                    "/asterios/{}/member/{}/".format(name, member_id),
+                    theme,
+                    deadline,
+                    wrong_answers,
+                )
+                for name, member_id in players
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+        if auth is not None:
+            for name in names:
+                await recorder.request(
+                    session, "delete", "DELETE", "/game-config/{}".format(name)
+                )
+    return recorder.report(elapsed)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(level_package, server_args, timeout=30.0):
+    """
+    Start an asterios server in a subprocess and return a 2-tuple
+    with the process and the URL of the server when it is ready.
+    """
+    port = _free_port()
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [
+            sys.executable,
+            "-m",
+            "asterios",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--level-package",
+            level_package,
+            *server_args,
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    url = "http://127.0.0.1:{}".format(port)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("The server exited with {}".format(process.returncode))
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("The server is not ready after {}s".format(timeout))
+
+
+def run(
+    url=None,
+    level_package="compute",
+    teams=10,
+    members=5,
+    duration=10.0,
+    wrong_answers=0.0,
+    connections=100,
+    auth=None,
+    server_args=(),
+):
+    """
+    Run the scenario and return the report.
+
+    A server is started with `level_package` and `server_args`
+    if `url` is None.
+    """
+    process = None
+    if url is None:
+        process, url = start_server(level_package, server_args)
+    try:
+        report = asyncio.run(
+            _run(
+                url,
+                level_package,
+                teams,
+                members,
+                duration,
+                wrong_answers,
+                connections,
+                auth,
+            )
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    report["scenario"] = {
+        "url": url,
+        "level_package": level_package,
+        "teams": teams,
+        "members": members,
+        "duration": duration,
+        "wrong_answers": wrong_answers,
+        "connections": connections,
+        "server_args": list(server_args),
+    }
+    return report
+
+
+def _format_ms(value):
+    return "{:>9.2f}".format(value * 1000) if value is not None else "{:>9}".format("-")
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        prog="python -m asterios.bench",
+        description=__doc__.split("\n")[1],
+        epilog="The unknown options are given to the started server.",
+    )
+    parser.add_argument("--url", help="the URL of a running server")
+    parser.add_argument("--level-package", default="compute")
+    parser.add_argument("--teams", type=int, default=10)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=10.0, help="in seconds")
+    parser.add_argument(
+        "--wrong-answers", type=float, default=0.0, help="ratio of wrong answers"
+    )
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--user", help="the superuser deleting the created games")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args, server_args = parser.parse_known_args(args)
+    if args.url is not None and server_args:
+        parser.error("unknown options: {}".format(" ".join(server_args)))
+
+    report = run(
+        url=args.url,
+        level_package=args.level_package,
+        teams=args.teams,
+        members=args.members,
+        duration=args.duration,
+        wrong_answers=args.wrong_answers,
+        connections=args.connections,
+        auth=aiohttp.BasicAuth(args.user, args.password) if args.user else None,
+        server_args=server_args,
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        "{requests} requests in {elapsed:.1f}s: {throughput:.0f} requests/s,"
+        " {errors} errors, {solved} levels solved, {won} winners".format(**report)
+    )
+    print(
+        "{:<8} {:>8} {:>10} {:>7} {:>9} {:>9} {:>9}".format(
+            "route", "count", "req/s", "errors", "p50 ms", "p95 ms", "p99 ms"
+        )
+    )
+    for route, stats in report["routes"].items():
+        print(
+            "{:<8} {:>8} {:>10.0f} {:>6.1%} {} {} {}".format(
+                route,
+                stats["count"],
+                stats["throughput"],
+                stats["error_rate"],
+                _format_ms(stats["p50"]),
+                _format_ms(stats["p95"]),
+                _format_ms(stats["p99"]),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
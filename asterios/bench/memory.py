@@ -0,0 +1,98 @@
+"""
+Measure the memory used by team member.
+
+The team members are created with the levels of `--level-package`, by default
+the levels of `sample/compute.py`::
+
+    PYTHONPATH=./sample/:$PYTHONPATH python -m asterios.bench.memory
+
+The "eager" line emulates the previous behaviour of `get_level_set`
+instantiating all the levels of the theme for each team member, the
+puzzles are generated by these levels rather than by the level set.
+"""
+
+from argparse import ArgumentParser
+import gc
+import json
+import tracemalloc
+
+from ..level import Difficulty, MetaLevel
+from ..models import TeamMember
+
+
+def _measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(index) for index in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def run(level_package, count, play):
+    """
+    Return a dict mapping a scenario to the bytes by team member.
+
+    If `play` is True, each team member generates a puzzle, so the
+    current level is instantiated.
+    """
+    MetaLevel.load_level(level_package)
+    levels = MetaLevel.get_levels(level_package)
+
+    def new_member(index):
+        member = TeamMember(
+            "member {}".format(index), 1, None, level_package, Difficulty.NORMAL
+        )
+        if play:
+            member.levels_obj.generate_puzzle()
+        return member
+
+    def new_eager_member(index):
+        member = TeamMember(
+            "member {}".format(index), 1, None, level_package, Difficulty.NORMAL
+        )
+        eager_levels = [levels[number](Difficulty.NORMAL) for number in sorted(levels)]
+        if play:
+            eager_levels[0].generate_puzzle()
+        return member, eager_levels
+
+    results = {"eager": _measure(new_eager_member, count)}
+    results["lazy"] = _measure(new_member, count)
+
+    member_states = {
+        level_class: level_class.member_state for level_class in levels.values()
+    }
+    try:
+        for level_class in levels.values():
+            level_class.member_state = None
+        results["without member_state"] = _measure(new_member, count)
+    finally:
+        for level_class, member_state in member_states.items():
+            level_class.member_state = member_state
+    return results
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        prog="python -m asterios.bench.memory", description=__doc__.split("\n")[1]
+    )
+    parser.add_argument("--level-package", default="compute")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument(
+        "--play", action="store_true", help="generate a puzzle for each member"
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(args)
+
+    results = run(args.level_package, args.count, args.play)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, size in results.items():
+            print("{:<24} {:>10.0f} bytes/member".format(name, size))
+
+
+if __name__ == "__main__":
+    main()
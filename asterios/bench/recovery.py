@@ -0,0 +1,87 @@
+"""
+Measure the time to restore the games saved by the journal storage.
+
+Games of `--team-size` members are created and started, then a level
+advance is journaled for every member. The model is restored from the
+journal only and from a snapshot::
+
+    PYTHONPATH=./sample/:$PYTHONPATH python -m asterios.bench.recovery
+"""
+
+from argparse import ArgumentParser
+import json
+import tempfile
+import time
+
+from ..level import MetaLevel
+from ..models import Model
+from ..models.storage import JournalStorage
+
+
+def _restore(directory):
+    storage = JournalStorage(directory)
+    model = Model(storage=storage)
+    start = time.perf_counter()
+    model.load()
+    duration = time.perf_counter() - start
+    storage.close()
+    return duration
+
+
+def run(level_package, count, team_size):
+    """
+    Return a dict mapping a scenario to the restoration time in seconds.
+    """
+    MetaLevel.load_level(level_package)
+    with tempfile.TemporaryDirectory() as directory:
+        storage = JournalStorage(directory)
+        model = Model(storage=storage)
+        for team in range(0, count, team_size):
+            name = "team-{}".format(team)
+            model.create(
+                {
+                    "team": name,
+                    "team_members": [
+                        {"name": "member {}".format(index), "theme": level_package}
+                        for index in range(min(team_size, count - team))
+                    ],
+                    "duration": 60,
+                }
+            )
+            game = model.start(name)
+            for member in game.team_members:
+                storage.level_advanced(game, member)
+
+        start = time.perf_counter()
+        storage.flush()
+        results = {"write journal": time.perf_counter() - start}
+        results["restore from journal"] = _restore(directory)
+
+        start = time.perf_counter()
+        storage.snapshot().result()
+        results["write snapshot"] = time.perf_counter() - start
+        results["restore from snapshot"] = _restore(directory)
+        storage.close()
+    return results
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        prog="python -m asterios.bench.recovery", description=__doc__.split("\n")[1]
+    )
+    parser.add_argument("--level-package", default="compute")
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--team-size", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(args)
+
+    results = run(args.level_package, args.count, args.team_size)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, duration in results.items():
+            print("{:<24} {:>8.2f} s".format(name, duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare the encoding time of puzzles using the stdlib `json` encoder and
+the `asterios.serializer` backend.
+
+The puzzles are generated by the levels of `--level-package`, by default
+the levels of `sample/compute.py`::
+
+    PYTHONPATH=./sample/:$PYTHONPATH python -m asterios.bench.serializer
+"""
+
+from argparse import ArgumentParser
+import json
+import timeit
+
+from ..level import Difficulty, MetaLevel
+from ..serializer import Serializer, serializer
+
+
+def _encoders():
+    return {
+        "stdlib json.dumps": lambda obj: json.dumps(obj, default=serializer.default),
+        "serializer (stdlib)": Serializer(False, serializer.encoders).dumps,
+        "serializer (native)": serializer.dumps,
+    }
+
+
+def run(level_package, number, repeat):
+    """
+    Return a list of (level, encoder name, best time in µs per puzzle).
+    """
+    MetaLevel.load_level(level_package)
+    results = []
+    for level_number, level_class in sorted(MetaLevel.get_levels(level_package).items()):
+        level = level_class(Difficulty.NORMAL)
+        payload = {"puzzle": level.generate_puzzle(), "tip": level_class.__doc__}
+        for name, encode in _encoders().items():
+            if name.endswith("(native)") and serializer.native is None:
+                continue
+            best = min(
+                timeit.repeat(lambda: encode(payload), number=number, repeat=repeat)
+            )
+            results.append((level_number, name, best / number * 1e6))
+    return results
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        prog="python -m asterios.bench.serializer", description=__doc__.split("\n")[1]
+    )
+    parser.add_argument("--level-package", default="compute")
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(args)
+
+    results = run(args.level_package, args.number, args.repeat)
+    if args.json:
+        print(
+            json.dumps(
+                [
+                    {"level": level, "encoder": name, "usec_per_puzzle": usec}
+                    for level, name, usec in results
+                ],
+                indent=2,
+            )
+        )
+    else:
+        for level, name, usec in results:
+            print("Level{:<3} {:<22} {:>10.2f} µs".format(level, name, usec))
+
+
+if __name__ == "__main__":
+    main()
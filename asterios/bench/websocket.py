@@ -0,0 +1,95 @@
+"""
+Compare the throughput of the HTTP and the WebSocket play loops.
+
+Each team member gets a puzzle and sends an answer `--rounds` times, using
+`PUT .../puzzle` and `PUT .../solve` requests or a single WebSocket
+connection. The answers are wrong so the team members stay on the first
+level of `--level-package`::
+
+    PYTHONPATH=./sample/:$PYTHONPATH python -m asterios.bench.websocket
+"""
+
+from argparse import ArgumentParser
+import asyncio
+import json
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from .. import make_app
+
+
+async def _http_loop(client, team, member_id, rounds):
+    url = "/asterios/{}/member/{}/".format(team, member_id)
+    for _ in range(rounds):
+        async with client.put(url + "puzzle") as response:
+            await response.read()
+        async with client.put(url + "solve", json=None) as response:
+            await response.read()
+
+
+async def _websocket_loop(client, team, member_id, rounds):
+    url = "/asterios/{}/member/{}/ws".format(team, member_id)
+    async with client.ws_connect(url) as websocket:
+        for _ in range(rounds):
+            await websocket.send_str('{"action":"puzzle"}')
+            await websocket.receive()
+            await websocket.send_str('{"action":"solve","answer":null}')
+            await websocket.receive()
+
+
+async def _run(level_package, members, rounds):
+    app = make_app(["--level-package", level_package])
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post(
+            "/game-config",
+            json={
+                "team": "bench",
+                "team_members": [
+                    {"name": "member {}".format(index), "theme": level_package}
+                    for index in range(members)
+                ],
+                "duration": 60,
+            },
+        )
+        ids = [member["id"] for member in (await response.json())["team_members"]]
+        await client.put("/game-config/bench/start")
+
+        results = {}
+        for name, loop in (("http", _http_loop), ("websocket", _websocket_loop)):
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(loop(client, "bench", member_id, rounds) for member_id in ids)
+            )
+            results[name] = members * rounds / (time.perf_counter() - start)
+    return results
+
+
+def run(level_package, members, rounds):
+    """
+    Return a dict mapping a play loop to the number of puzzle/solve rounds
+    by second.
+    """
+    return asyncio.run(_run(level_package, members, rounds))
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        prog="python -m asterios.bench.websocket", description=__doc__.split("\n")[1]
+    )
+    parser.add_argument("--level-package", default="compute")
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(args)
+
+    results = run(args.level_package, args.members, args.rounds)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, throughput in results.items():
+            print("{:<12} {:>10.0f} rounds/s".format(name, throughput))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,11 +9,132 @@ _CONFIG_SCHEMA = Schema(
     {
         Optional("port", default=8080, msg="Asterio port server"): int,
         Optional("host", default="127.0.0.1", msg="Asterio host server"): str,
+        Optional(
+            "unix_socket",
+            default="",
+            msg="Unix socket path to listen instead of host and port",
+        ): str,
+        Optional(
+            "workers",
+            default=1,
+            msg="Number of worker processes, the games are partitioned"
+            " by team between workers, the files of a worker are suffixed"
+            " by its index",
+        ): int,
+        Optional(
+            "event_loop", default="asyncio", msg="Event loop: asyncio or uvloop"
+        ): str,
         Optional(
             "level_package",
             default=[],
             msg="level_package_name to load (should be in PYTHONPATH)",
         ): [str],
+        Optional(
+            "puzzle_pool_depth",
+            default=0,
+            msg="Number of pre-generated puzzles by level and difficulty"
+            " (0 disables the puzzle pool)",
+        ): int,
+        Optional(
+            "thread_pool_themes",
+            default=[],
+            msg="Themes whose levels are run in a thread pool",
+        ): [str],
+        Optional(
+            "process_pool_themes",
+            default=[],
+            msg="Themes whose levels are run in a process pool",
+        ): [str],
+        Optional(
+            "level_workers",
+            default=0,
+            msg="Max number of workers of level pools (0 uses the default)",
+        ): int,
+        Optional(
+            "event_buffer",
+            default=256,
+            msg="Max number of events buffered by Server-Sent Events client,"
+            " slower clients are disconnected",
+        ): int,
+        Optional("tracing", msg="Measure the phases of requests"): {
+            Optional(
+                "server_timing",
+                default=0,
+                msg="1 adds the Server-Timing header to responses",
+            ): int,
+            Optional("file", default="", msg="Path of the rotating trace file"): str,
+            Optional(
+                "file_max_bytes",
+                default=10_000_000,
+                msg="Max size of the trace file before the rotation",
+            ): int,
+            Optional(
+                "file_backups", default=3, msg="Number of rotated trace files"
+            ): int,
+            Optional(
+                "slow",
+                default=0.0,
+                msg="Only write the requests slower than this duration in seconds"
+                " in the trace file",
+            ): float,
+        },
+        Optional("watchdog", msg="Find the level code blocking the event loop"): {
+            Optional(
+                "threshold",
+                default=0.05,
+                msg="Level calls slower than this duration in seconds are recorded",
+            ): float,
+            Optional(
+                "interval",
+                default=0.01,
+                msg="Interval in seconds of the lag measures and stack samples",
+            ): float,
+            Optional(
+                "file",
+                default="",
+                msg="Path of the file counting the slow level calls between runs",
+            ): str,
+            Optional(
+                "repeat",
+                default=3,
+                msg="Log at startup the levels slower than the threshold"
+                " this number of times",
+            ): int,
+        },
+        Optional("warmup", msg="Generate a puzzle of each level at startup"): {
+            Optional(
+                "budget",
+                default=0.0,
+                msg="Max duration in seconds to generate a puzzle, 0 for no limit",
+            ): float,
+            Optional(
+                "strict",
+                default=0,
+                msg="1 refuses to start when a level is missing, fails"
+                " or exceeds the budget",
+            ): int,
+        },
+        Optional("sqlite", msg="Save games in a SQLite database"): {
+            Required("path", msg="The SQLite database path"): str,
+            Optional(
+                "flush_interval",
+                default=1.0,
+                msg="Interval in seconds between two writes of the database",
+            ): float,
+        },
+        Optional("journal", msg="Save games in a journal and snapshots"): {
+            Required("directory", msg="The directory of journal and snapshot"): str,
+            Optional(
+                "fsync_interval",
+                default=0.05,
+                msg="Interval in seconds between two fsync of the journal",
+            ): float,
+            Optional(
+                "snapshot_interval",
+                default=300.0,
+                msg="Interval in seconds between two snapshots",
+            ): float,
+        },
         Optional("authentication", msg="Enable authentication"): {
             "type": "basic",
             Required("superuser"): {
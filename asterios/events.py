@@ -0,0 +1,154 @@
+"""
+This module contains the broker pushing the game events to the
+Server-Sent Events subscribers.
+
+The broker is a `Listener` notified by the `Model`. Each event is
+serialized once to a SSE frame and the frame is queued for each subscriber.
+The queue of a subscriber is bounded, a subscriber that doesn't read its
+events fast enough is dropped and should reconnect.
+
+The events are:
+
+    - "game-started": {"team": ..., "start_at": ..., "duration": ...}
+    - "level-up": {"team": ..., "member_id": ..., "name": ..., "level": ...}
+    - "win": {"team": ..., "member_id": ..., "name": ..., "won_at": ...}
+    - "game-stopped": {"team": ...}
+"""
+
+import asyncio
+
+from .models.listeners import Listener
+from .serializer import serializer
+
+
+class Subscriber:
+    """
+    The bounded queue of frames of a SSE client.
+
+    Args:
+        size - the max number of frames waiting to be sent.
+        team - only receive the events of `team` if it is not None.
+    """
+
+    def __init__(self, size, team=None):
+        self.team = team
+        self.dropped = False
+        self._queue = asyncio.Queue(size)
+
+    def put(self, frame):
+        """
+        Queue `frame` or drop the subscriber if its queue is full.
+        """
+        if self.dropped:
+            return
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped = True
+            # Free the buffered frames and wake up the reader.
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+
+    async def get(self):
+        """
+        Return the next frame or None if the subscriber is dropped.
+        """
+        return await self._queue.get()
+
+
+def encode_event(event, data):
+    """
+    Return the SSE frame of `event`.
+
+    >>> encode_event('game-stopped', {'team': 'SG-1'})
+    b'event: game-stopped\\ndata: {"team":"SG-1"}\\n\\n'
+    """
+    return b"event: " + event.encode() + b"\ndata: " + serializer.dumps(data) + b"\n\n"
+
+
+class EventBroker(Listener):
+    """
+    Publish the game events to the subscribers.
+
+    Args:
+        buffer_size - the max number of events buffered by subscriber.
+    """
+
+    def __init__(self, buffer_size=256):
+        self.buffer_size = buffer_size
+        self.subscribers = set()
+
+    def subscribe(self, team=None):
+        """
+        Return a new subscriber.
+        """
+        subscriber = Subscriber(self.buffer_size, team)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """
+        Remove `subscriber`.
+        """
+        self.subscribers.discard(subscriber)
+
+    def publish(self, team, event, data):
+        """
+        Serialize the event once and queue it for the subscribers.
+        """
+        if not self.subscribers:
+            return
+
+        frame = encode_event(event, data)
+        for subscriber in tuple(self.subscribers):
+            if subscriber.team is None or subscriber.team == team:
+                subscriber.put(frame)
+                if subscriber.dropped:
+                    self.subscribers.discard(subscriber)
+
+    def game_started(self, game):
+        self.publish(
+            game.team,
+            "game-started",
+            {"team": game.team, "start_at": game.start_at, "duration": game.duration},
+        )
+
+    def game_stopped(self, game):
+        self.publish(game.team, "game-stopped", {"team": game.team})
+
+    def level_advanced(self, game, member):
+        self.publish(
+            game.team,
+            "level-up",
+            {
+                "team": game.team,
+                "member_id": member.id,
+                "name": member.name,
+                "level": member.levels_obj.level_number,
+            },
+        )
+
+    def member_won(self, game, member):
+        self.publish(
+            game.team,
+            "win",
+            {
+                "team": game.team,
+                "member_id": member.id,
+                "name": member.name,
+                "won_at": member.won_at,
+            },
+        )
+
+    async def stop(self, app=None):
+        """
+        Close the streams of the subscribers.
+
+        This coroutine can be used as aiohttp `on_shutdown` signal.
+        """
+        # pylint: disable=unused-argument
+        for subscriber in self.subscribers:
+            subscriber.dropped = False
+            subscriber.put(None)
+        self.subscribers.clear()
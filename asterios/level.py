@@ -6,13 +6,19 @@ To create a new level, subclasse `BaseLevel` and implement required methods
 """
 
 from collections import defaultdict
+import copy
 import enum
 import importlib
 import re
 import textwrap
+import time
+from types import MappingProxyType
 
 import attr
 
+from .metrics import metrics
+from .watchdog import watchdog
+
 
 def _default(cls, attr_name):
     return next(
@@ -28,6 +34,64 @@ class Difficulty(enum.Enum):
     HARD = "hard"
 
 
+def render_tip(level_class):
+    """
+    Return the tip of `level_class`, its dedented docstring.
+    """
+    return textwrap.dedent(level_class.__doc__).strip()
+
+
+@attr.s(frozen=True, slots=True)
+class Catalog:
+    """
+    An immutable view of the loaded levels, compiled by `MetaLevel.catalog`
+    so that the hot paths don't rebuild tuples or render docstrings.
+
+        - `themes` is the tuple of themes.
+        - `levels` maps a theme to the tuple of its level classes ordered by
+          level number, the themes missing a level are not in `levels`.
+        - `tips` maps a level class to its rendered tip.
+    """
+
+    themes = attr.ib()
+    levels = attr.ib()
+    tips = attr.ib()
+
+    @classmethod
+    def compile(cls, register):
+        """
+        Return the catalog of the levels of `register`.
+        """
+        levels = {}
+        tips = {}
+        for theme, numbers in register.items():
+            ordered = tuple(
+                numbers.get(number) for number in range(1, len(numbers) + 1)
+            )
+            if None not in ordered:
+                levels[theme] = ordered
+            for level_class in numbers.values():
+                tips[level_class] = render_tip(level_class)
+        return cls(tuple(register), MappingProxyType(levels), MappingProxyType(tips))
+
+    def theme_levels(self, theme):
+        """
+        Return the tuple of the level classes of `theme`.
+        """
+        levels = self.levels.get(theme)
+        if levels is None:
+            if theme in self.themes:
+                raise LookupError("The theme {!r} has missing levels".format(theme))
+            raise LookupError("The theme {!r} is not in the register".format(theme))
+        return levels
+
+    def level_count(self, theme):
+        """
+        Return the number of levels of `theme`.
+        """
+        return len(self.theme_levels(theme))
+
+
 class MetaLevel(type):
     """
     Checks level definition and stores BaseLevel subclasses.
@@ -76,9 +140,17 @@ class MetaLevel(type):
     {1: <class 'asterios.level.Level1'>}
     >>> MetaLevel.get_level('asterios.level', 1) is Level1
     True
+
+    The catalog is compiled again when a level is defined.
+
+    >>> MetaLevel.catalog().theme_levels('asterios.level')
+    (<class 'asterios.level.Level1'>,)
+    >>> MetaLevel.catalog().tips[Level1]
+    'Use eval to compute'
     """
 
     register = defaultdict(dict)
+    _catalog = None
 
     def __init__(cls, name, bases, attributes):
         super().__init__(name, bases, attributes)
@@ -104,6 +176,7 @@ class MetaLevel(type):
                 )
 
             type(cls).register[cls.__module__][level] = cls
+            type(cls)._catalog = None
 
     @classmethod
     def get_level(mcs, theme: str, level: int):
@@ -126,7 +199,26 @@ class MetaLevel(type):
         """
         Return list of existing `theme` stored in register.
         """
-        return tuple(mcs.register)
+        return mcs.catalog().themes
+
+    @classmethod
+    def compile(mcs):
+        """
+        Compile the catalog of the loaded levels and return it.
+        """
+        mcs._catalog = Catalog.compile(mcs.register)
+        return mcs._catalog
+
+    @classmethod
+    def catalog(mcs):
+        """
+        Return the catalog of the loaded levels, it is compiled
+        if a level was defined since the last compilation.
+        """
+        catalog = mcs._catalog
+        if catalog is None:
+            catalog = mcs.compile()
+        return catalog
 
     @classmethod
     def clean(mcs):
@@ -134,6 +226,8 @@ class MetaLevel(type):
         Remove all level loaded in register.
         """
         mcs.register.clear()
+        mcs._catalog = None
+        _prototypes.clear()
 
     @staticmethod
     def load_level(package_name: str):
@@ -180,8 +274,23 @@ class BaseLevel(metaclass=MetaLevel):
 
     When a BaseLevel subclass is instantiate, the `difficulty` parameters is provided.
     The difficulty value is a `level.Difficulty` member.
+
+    If `generate_puzzle` only depends on `difficulty` and sets the attributes
+    used by `check_answer`, you can define `poolable = True`. The puzzles
+    of the level will be pre-generated in the `asterios.puzzle_pool`.
+
+    By default, a level object is created for each team member. If the only
+    attributes changed by `generate_puzzle` and `check_answer` are listed in
+    `member_state`, e.g. `member_state = ("expected",)`, the level is
+    instantiated once by difficulty and shared by the team members: a team
+    member only keeps the values of the `member_state` attributes, and each
+    call runs on a shallow copy of the shared level holding these values.
+    The other attributes should not be changed by the calls.
     """
 
+    poolable = False
+    member_state = None
+
     def __init__(self, difficulty):
         self.difficulty = difficulty
 
@@ -197,22 +306,54 @@ class BaseLevel(metaclass=MetaLevel):
         """
 
 
-@attr.s
+#: The level objects shared by the level sets, keyed by level class and
+#: difficulty, see `BaseLevel.member_state`.
+_prototypes = {}
+
+_MISSING = object()
+
+
+def _new_level(level_class, difficulty):
+    """
+    Return a new `level_class` object, the levels defining `member_state`
+    are shallow copies of a level object instantiated once by difficulty.
+    """
+    if level_class.member_state is None:
+        return level_class(difficulty)
+    key = (level_class, difficulty)
+    prototype = _prototypes.get(key)
+    if prototype is None:
+        prototype = _prototypes[key] = level_class(difficulty)
+    return copy.copy(prototype)
+
+
+def _call(level, method, *args):
+    return getattr(level, method)(*args)
+
+
+@attr.s(slots=True)
 class LevelSet:
     """
     LevelSet objet allow you to store levels.
+    The levels are instantiated with the difficulty when they become
+    the current level.
         >>> from unittest.mock import Mock
-        >>> level1 = Mock(name='Level1()')
+        >>> Level1 = Mock(name='Level1', member_state=None)
+        >>> level1 = Level1.return_value
         >>> level1.check_answer.return_value = (True, '')
-        >>> level2 = Mock(name='Level1()')
+        >>> Level2 = Mock(name='Level2', member_state=None)
+        >>> level2 = Level2.return_value
         >>> level2.check_answer.return_value = (True, '')
 
-        >>> levels = LevelSet('theme 1', [level1, level2])
+        >>> levels = LevelSet('theme 1', [Level1, Level2], difficulty=Difficulty.EASY)
 
     The generate_puzzle method calls generate_puzzle on the current level.
         >>> puzzle = levels.generate_puzzle()
         >>> puzzle is level1.generate_puzzle()
         True
+        >>> Level1.assert_called_once_with(Difficulty.EASY)
+        >>> Level2.called
+        False
 
     The check_answer method calls check_answer on the current level.
         >>> levels.check_answer(123)
@@ -249,39 +390,94 @@ class LevelSet:
         """
 
     theme = attr.ib()
-    _levels = attr.ib(default=attr.Factory(list))
+    _levels = attr.ib(default=attr.Factory(tuple))
     _current_level = attr.ib(default=1)
     _level_max = attr.ib()
-    _done = attr.ib(init=False, default=False)
+    _difficulty = attr.ib(default=Difficulty.NORMAL)
+    _done = attr.ib(default=False)
+    _level = attr.ib(init=False, default=None, repr=False)
+    _state = attr.ib(init=False, default=None, repr=False)
 
     @_level_max.default
     def __len__(self):
         return len(self._levels)
 
+    def call_level(self, method, *args, caller=_call):
+        """
+        Call `method` on the current level using `caller`, see
+        `asterios.level_executor.LevelExecutor`.
+        """
+        level = self.current_level
+        level_class = self.current_level_class
+        call = watchdog.enter(self.theme, level_class, method)
+        start = time.perf_counter()
+        try:
+            return caller(level, method, *args)
+        finally:
+            self._save_state(level_class, level)
+            metrics.level_duration.observe(
+                (self.theme, level_class, self._difficulty, method),
+                time.perf_counter() - start,
+            )
+            if call is not None:
+                watchdog.exit(call)
+
     def generate_puzzle(self):
         """
         Call `generate_puzzle` method on the current level.
         """
-        return self.current_level.generate_puzzle()
+        return self.call_level("generate_puzzle")
 
     def check_answer(self, answer):
         """
         Call `check_answer` method on the current level, if the level is True,
         The next level begin the current level.
         """
-        is_exact, comment = self.current_level.check_answer(answer)
+        return self.answered(self.call_level("check_answer", answer))
+
+    def answered(self, result):
+        """
+        Move to the next level if `result`, the 2-tuple returned by
+        `check_answer` on the current level, is exact and return it.
+        """
+        is_exact, comment = result
         if is_exact:
             if self._current_level < min(len(self._levels), self._level_max):
                 self._current_level += 1
+                self._level = None
+                self._state = None
             else:
                 self._done = True
         return is_exact, comment
 
+    def set_level_state(self, state):
+        """
+        Set the attributes of the current level using the `state` dict.
+        This method is used to load a pre-generated puzzle.
+        """
+        level = self.current_level
+        vars(level).update(state)
+        self._save_state(self.current_level_class, level)
+
+    def _save_state(self, level_class, level):
+        """
+        Keep the `member_state` attributes of `level`, a copy of
+        the shared `level_class` object.
+        """
+        member_state = level_class.member_state
+        if member_state is not None:
+            attributes = vars(level)
+            self._state = tuple(attributes.get(name, _MISSING) for name in member_state)
+
     def tip(self):
         """
         Return docstring of current level.
         """
-        return textwrap.dedent(self.current_level.__doc__).strip()
+        level_class = self.current_level_class
+        tip = MetaLevel.catalog().tips.get(level_class)
+        if tip is None:
+            tip = render_tip(level_class)
+        return tip
 
     @property
     def done(self):
@@ -291,14 +487,45 @@ class LevelSet:
         return self._done
 
     @property
-    def current_level(self):
+    def difficulty(self):
+        """
+        Returns the difficulty of levels.
+        """
+        return self._difficulty
+
+    @property
+    def current_level_class(self):
         """
-        Returns the current level object or raises a DoneException
+        Returns the class of the current level or raises a DoneException
         """
         if self._done:
             raise self.DoneException("LevelSet is done")
         return self._levels[self._current_level - 1]
 
+    @property
+    def current_level(self):
+        """
+        Returns the current level object or raises a DoneException.
+
+        The level is instantiated at the first call. For the levels defining
+        `member_state`, a new copy of the shared level holding the member
+        state is returned by each call (see `BaseLevel`), its changes are
+        only kept by `call_level` and `set_level_state`.
+        """
+        level_class = self.current_level_class
+        level = self._level
+        if level is None:
+            level = _new_level(level_class, self._difficulty)
+            if level_class.member_state is None:
+                self._level = level
+            elif self._state is not None:
+                vars(level).update(
+                    (name, value)
+                    for name, value in zip(level_class.member_state, self._state)
+                    if value is not _MISSING
+                )
+        return level
+
     @property
     def level_number(self):
         """
@@ -308,12 +535,12 @@ class LevelSet:
 
 
 def get_level_set(
-    theme, start_level=None, level_max=None, difficulty=Difficulty.NORMAL
+    theme, start_level=None, level_max=None, difficulty=Difficulty.NORMAL, done=False
 ):
     """
     Return a LevelSet object.
     """
-    levels = MetaLevel.get_levels(theme)
+    levels = MetaLevel.catalog().theme_levels(theme)
     level_set_attribute = {}
     if start_level is not None:
         level_set_attribute["current_level"] = start_level
@@ -322,7 +549,9 @@ def get_level_set(
 
     return LevelSet(
         theme,
-        [levels[i](difficulty) for i in range(1, len(levels) + 1)],
+        levels,
+        difficulty=difficulty,
+        done=done,
         **level_set_attribute
     )
 
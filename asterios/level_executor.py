@@ -0,0 +1,150 @@
+"""
+This module contains the `LevelExecutor` running the level code
+out of the event loop.
+
+By default the `generate_puzzle` and `check_answer` methods of levels are
+called in the event loop. A theme can be configured to run:
+
+    - in a thread pool ("thread" mode), when the level code releases the GIL
+      (numpy, hashlib, I/O, ...).
+    - in a process pool ("process" mode), for pure-Python CPU-bound code.
+      The level object is pickled, the method is called in a worker process
+      and the attributes of the level (e.g. `self.expected`) are copied back
+      to the level object of the team member.
+
+Only the level call leaves the event loop, the model is changed in the
+event loop by `Model.set_question_async` and `Model.check_answer_async`.
+These coroutines hold the lock of the team member so its calls are run one
+at a time.
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import functools
+import weakref
+
+from .level import _call
+
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+
+
+class _Unlocked:
+    """
+    The lock of the team members playing inline themes, their level calls
+    don't leave the event loop.
+    """
+
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+
+_UNLOCKED = _Unlocked()
+
+
+def _run_level(level, method, args):
+    """
+    Call `method` on `level` and return the result with the level attributes.
+
+    This function is called in a worker process.
+    """
+    result = getattr(level, method)(*args)
+    return result, vars(level)
+
+
+class LevelExecutor:
+    """
+    Run the level callbacks of team members using the mode of their theme.
+
+    Args:
+        thread_themes - themes running in a thread pool.
+        process_themes - themes running in a process pool.
+        max_workers - the max number of workers of each pool.
+    """
+
+    def __init__(self, thread_themes=(), process_themes=(), max_workers=None):
+        self.modes = {}
+        for theme in thread_themes:
+            self.modes[theme] = THREAD
+        for theme in process_themes:
+            self.modes[theme] = PROCESS
+        self.max_workers = max_workers
+        self._thread_pool = None
+        self._process_pool = None
+        self._locks = weakref.WeakKeyDictionary()
+
+    def mode(self, theme):
+        """
+        Return the mode used to run the levels of `theme`.
+        """
+        return self.modes.get(theme, INLINE)
+
+    def _get_thread_pool(self):
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="asterios-level"
+            )
+        return self._thread_pool
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(self.max_workers)
+        return self._process_pool
+
+    def call_in_process(self, level, method, *args):
+        """
+        Call `method` on `level` in the process pool and update
+        the level attributes. This method blocks until the call is done
+        so it must be run out of the event loop.
+        """
+        future = self._get_process_pool().submit(_run_level, level, method, args)
+        result, state = future.result()
+        vars(level).update(state)
+        return result
+
+    def lock(self, member):
+        """
+        Return the lock serializing the level calls of `member`.
+        """
+        if self.mode(member.levels_obj.theme) == INLINE:
+            return _UNLOCKED
+        lock = self._locks.get(member)
+        if lock is None:
+            lock = self._locks[member] = asyncio.Lock()
+        return lock
+
+    async def call_level(self, level_set, method, *args):
+        """
+        Call `method` on the current level of `level_set`.
+
+        Inline themes are called directly, thread themes are called in
+        the thread pool and process themes are called in the process pool.
+        """
+        mode = self.mode(level_set.theme)
+        if mode == INLINE:
+            return level_set.call_level(method, *args)
+
+        caller = self.call_in_process if mode == PROCESS else _call
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_thread_pool(),
+            functools.partial(level_set.call_level, method, *args, caller=caller),
+        )
+
+    async def shutdown(self, app=None):
+        """
+        Shutdown the pools.
+
+        This coroutine can be used as aiohttp `on_cleanup` signal.
+        """
+        # pylint: disable=unused-argument
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=True)
+        self._thread_pool = None
+        self._process_pool = None
@@ -0,0 +1,263 @@
+"""
+This module contains the metrics of asterios exposed in the Prometheus
+text format by the `/metrics` route.
+
+The metrics are recorded without lock: a value is a list of counters
+incremented in place, the GIL makes each increment cheap and an increment
+can only be lost when two threads of the level executor record the same
+metric at the same time.
+
+    - `asterios_requests_total` and `asterios_request_duration_seconds`
+      by route name, method and status.
+    - `asterios_level_duration_seconds` by theme, level class, difficulty
+      and method (`generate_puzzle` or `check_answer`), the puzzles
+      generated by the `asterios.puzzle_pool` are included.
+    - `asterios_puzzle_size_bytes` and `asterios_answer_size_bytes`
+      by theme.
+"""
+
+from bisect import bisect_left
+import enum
+import time
+
+from aiohttp import web
+
+
+DURATION_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _label_value(value):
+    """
+    Return the label value of a class, an enum or other object.
+    The classes and enums are formatted when the metrics are rendered,
+    so recording a metric stays cheap.
+    """
+    if isinstance(value, type):
+        value = value.__name__
+    elif isinstance(value, enum.Enum):
+        value = value.value
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    return ",".join(
+        '{}="{}"'.format(name, _label_value(value))
+        for name, value in zip(names, values)
+    )
+
+
+class Counter:
+    """
+    A counter by labels.
+
+    >>> counter = Counter('hits_total', 'The hits.', ('route',))
+    >>> counter.inc(('index',))
+    >>> print(counter.render())
+    # HELP hits_total The hits.
+    # TYPE hits_total counter
+    hits_total{route="index"} 1
+    """
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        """
+        Increment the counter of `labels`.
+        """
+        value = self.values.get(labels)
+        if value is None:
+            value = self.values.setdefault(labels, [0])
+        value[0] += amount
+
+    def render(self):
+        """
+        Return the counter in the Prometheus text format.
+        """
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} counter".format(self.name),
+        ]
+        for formatted, value in sorted(
+            (_format_labels(self.label_names, labels), value)
+            for labels, value in self.values.items()
+        ):
+            lines.append("{}{{{}}} {}".format(self.name, formatted, value[0]))
+        return "\n".join(lines)
+
+
+class Histogram:
+    """
+    A histogram by labels.
+
+    The value of `labels` is a list with the count of each bucket, the
+    count of values greater than the last bucket and the sum of values.
+
+    >>> histogram = Histogram('size', 'The sizes.', ('route',), (10, 100))
+    >>> histogram.observe(('index',), 42)
+    >>> print(histogram.render())
+    # HELP size The sizes.
+    # TYPE size histogram
+    size_bucket{route="index",le="10"} 0
+    size_bucket{route="index",le="100"} 1
+    size_bucket{route="index",le="+Inf"} 1
+    size_sum{route="index"} 42
+    size_count{route="index"} 1
+    """
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, labels, amount):
+        """
+        Record `amount` in the histogram of `labels`.
+        """
+        value = self.values.get(labels)
+        if value is None:
+            value = self.values.setdefault(labels, [0] * (len(self.buckets) + 2))
+        value[bisect_left(self.buckets, amount)] += 1
+        value[-1] += amount
+
+    def render(self):
+        """
+        Return the histogram in the Prometheus text format.
+        """
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} histogram".format(self.name),
+        ]
+        for formatted, value in sorted(
+            (_format_labels(self.label_names, labels), value)
+            for labels, value in self.values.items()
+        ):
+            prefix = formatted + "," if formatted else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), value):
+                cumulative += count
+                lines.append(
+                    '{}_bucket{{{}le="{}"}} {}'.format(
+                        self.name, prefix, bound, cumulative
+                    )
+                )
+            lines.append("{}_sum{{{}}} {}".format(self.name, formatted, value[-1]))
+            lines.append("{}_count{{{}}} {}".format(self.name, formatted, cumulative))
+        return "\n".join(lines)
+
+
+class Metrics:
+    """
+    The metrics of asterios.
+    """
+
+    def __init__(self):
+        self.requests = Counter(
+            "asterios_requests_total",
+            "Number of HTTP requests.",
+            ("route", "method", "status"),
+        )
+        self.request_duration = Histogram(
+            "asterios_request_duration_seconds",
+            "Duration of HTTP requests.",
+            ("route", "method"),
+            DURATION_BUCKETS,
+        )
+        self.level_duration = Histogram(
+            "asterios_level_duration_seconds",
+            "Duration of the level methods.",
+            ("theme", "level", "difficulty", "method"),
+            DURATION_BUCKETS,
+        )
+        self.puzzle_size = Histogram(
+            "asterios_puzzle_size_bytes",
+            "Size of the JSON puzzles.",
+            ("theme",),
+            SIZE_BUCKETS,
+        )
+        self.answer_size = Histogram(
+            "asterios_answer_size_bytes",
+            "Size of the JSON answers.",
+            ("theme",),
+            SIZE_BUCKETS,
+        )
+
+    def __iter__(self):
+        return iter(
+            (
+                self.requests,
+                self.request_duration,
+                self.level_duration,
+                self.puzzle_size,
+                self.answer_size,
+            )
+        )
+
+    def render(self):
+        """
+        Return all the metrics in the Prometheus text format.
+        """
+        return "\n".join(metric.render() for metric in self) + "\n"
+
+    def clear(self):
+        """
+        Reset all the metrics.
+        """
+        for metric in self:
+            metric.values.clear()
+
+
+metrics = Metrics()
+
+
+def route_name(request):
+    """
+    Return the name of the route matched by `request`.
+    """
+    route = request.match_info.route
+    if route.name is not None:
+        return route.name
+    if route.resource is None:
+        return "unmatched"
+    return route.resource.canonical
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """
+    Count the requests and record their duration by route name.
+    """
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as exc:
+        status = exc.status
+        raise
+    finally:
+        route = route_name(request)
+        metrics.request_duration.observe(
+            (route, request.method), time.perf_counter() - start
+        )
+        metrics.requests.inc((route, request.method, str(status)))
+
+
+async def metrics_handler(request):
+    """
+    Return the metrics in the Prometheus text format.
+    """
+    # pylint: disable=unused-argument
+    return web.Response(
+        body=metrics.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
@@ -1,7 +1,12 @@
+from ..level_executor import LevelExecutor
 from .basemodel import Collection
-from .errors import GameConflict, GameDoesntExist, error_middleware
-from .games import Game
+from .errors import GameConflict, GameDoesntExist, MemberDoesntExist, error_middleware
+from .games import Game, member_ids
+from .leaderboard import Leaderboard
+from .scheduler import ExpiryScheduler
+from .storage import MemoryStorage, game_from_record
 from .team_members import TeamMember
+from .utils import clock_middleware
 
 
 class _GameCollection(Collection):
@@ -12,6 +17,7 @@ class _GameCollection(Collection):
     """
 
     not_exist_error = GameDoesntExist
+    indexes = ("state",)
 
     def generate_id(self, obj):
         """
@@ -30,40 +36,101 @@ class _GameCollection(Collection):
 class Model:
     """
     This class is a Facade providing method to manipulate the models.
+
+    The `executor` is a `LevelExecutor` running the level code of
+    `set_question_async` and `check_answer_async`, used by the views.
+    By default the level code is run in the event loop.
+
+    The team members of all games are indexed by id, so a team member
+    is found without looking for its game.
+
+    The `storage` is notified after each mutation, see
+    `asterios.models.storage`. By default games are only kept in memory.
+    Other `Listener` objects can be notified using `subscribe`.
+
+    The `leaderboard` ranks the team members of started and stopped games.
     """
 
-    def __init__(self):
+    def __init__(self, executor=None, storage=None):
         self._games = _GameCollection()
+        self._members = {}
+        self.storage = MemoryStorage() if storage is None else storage
+        self.storage.bind(self)
+        self.leaderboard = Leaderboard()
+        self.listeners = [self.storage, self.leaderboard]
+        self.scheduler = ExpiryScheduler(
+            on_expire=lambda game: self._notify("game_stopped", game)
+        )
+        self.executor = LevelExecutor() if executor is None else executor
 
     def create(self, game):
         game = Game.from_dict(game)
-        self._games.append(game)
+        self._add_game(game)
+        self._notify("game_created", game)
         return game
 
+    def subscribe(self, listener):
+        """
+        Notify `listener` after each mutation.
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, hook, *args):
+        for listener in self.listeners:
+            getattr(listener, hook)(*args)
+
+    def _add_game(self, game):
+        self._games.append(game)
+        for member in game.team_members:
+            self._members[member.id] = (game, member)
+
+    def load(self):
+        """
+        Restore the games saved by the storage.
+
+        The started games whose duration is elapsed are stopped.
+        """
+        restored_ids = []
+        for record in self.storage.load():
+            game = game_from_record(record)
+            self._add_game(game)
+            self._notify("game_restored", game)
+            if game.state == "started":
+                self.scheduler.register(game)
+            restored_ids.extend(member.id for member in game.team_members)
+        member_ids.reserve(restored_ids)
+        self.scheduler.expire()
+
     def game(self, name):
         """
         Return a game
         """
-        game = self._games[name]
-        game.set_remaining_time()
-        return game
+        self.scheduler.expire()
+        return self._games[name]
 
     def __iter__(self):
-        for game in self._games:
-            game.set_remaining_time()
-            yield game
+        self.scheduler.expire()
+        return iter(self._games)
 
-    def games(self):
+    def games(self, state=None):
         """
-        Return all games
+        Return all games or the games in the given `state`.
         """
-        return list(self)
+        if state is None:
+            return list(self)
+        self.scheduler.expire()
+        return self._games.filter("state", state)
 
     def delete_game(self, name):
         """
         delete a game
         """
+        game = self._games[name]
+        self.scheduler.cancel(game)
+        for member in game.team_members:
+            del self._members[member.id]
         self._games.delete(name)
+        self._notify("game_deleted", game)
 
     def start(self, name):
         """
@@ -71,35 +138,102 @@ class Model:
         """
         game = self.game(name)
         game.start()
+        self.scheduler.register(game)
+        self._notify("game_started", game)
+        return game
+
+    def add_member(self, name, member):
+        """
+        Add a new team member to a game and return the game.
+        """
+        game = self.game(name)
+        member = game.add_member(member)
+        self._members[member.id] = (game, member)
+        self._notify("member_added", game, member)
         return game
 
     def drop(self):
         """
         Drop all games.
         """
+        self.scheduler.clear()
+        self._members.clear()
         self._games.clear()
+        self._notify("games_dropped")
 
     def set_question(self, game_name, member_id):
         """
         Generate puzzle for `member_id` in the `game_name`.
         """
-        self.game(game_name).ensure_state_is("started")
-        member = self.member_from_id(game_name, member_id)
+        _, member = self._member_entry(game_name, member_id, "started")
         return member.set_question()
 
+    async def set_question_async(self, game_name, member_id):
+        """
+        Coroutine version of `set_question` running the level code
+        with the `executor`.
+        """
+        game, member = self._member_entry(game_name, member_id, "started")
+        async with self.executor.lock(member):
+            # The game can be stopped while waiting for the lock.
+            game.ensure_state_is("started")
+            return await member.set_question_async(self.executor)
+
     def check_answer(self, game_name, member_id, answer):
         """
         Check the `answer` for `member_id` in the `game_name`.
         """
+        game, member = self._member_entry(game_name, member_id, "started")
+        is_exact, comment = game.check_answer(member.id, answer)
+        self._answered(game, member, is_exact)
+        return is_exact, comment
+
+    async def check_answer_async(self, game_name, member_id, answer):
+        """
+        Coroutine version of `check_answer` running the level code
+        with the `executor`.
+        """
+        game, member = self._member_entry(game_name, member_id, "started")
+        async with self.executor.lock(member):
+            is_exact, comment = await game.check_answer_async(
+                self.executor, member.id, answer
+            )
+        self._answered(game, member, is_exact)
+        return is_exact, comment
+
+    def _answered(self, game, member, is_exact):
+        if is_exact:
+            if member.won_at is None:
+                self._notify("level_advanced", game, member)
+            else:
+                self._notify("member_won", game, member)
+
+    def _member_entry(self, game_name, member_id, state=None):
+        """
+        Return the game and the team member having the id `member_id`.
+
+        The game is checked before the team member, it should be
+        in `state` if `state` is given.
+        """
         game = self.game(game_name)
-        return game.check_answer(member_id, answer)
+        if state is not None:
+            game.ensure_state_is(state)
+
+        try:
+            member_id = int(member_id)
+        except ValueError:
+            raise MemberDoesntExist(member_id, field="id") from None
+
+        entry = self._members.get(member_id)
+        if entry is None or entry[0] is not game:
+            raise MemberDoesntExist(member_id, field="id")
+        return entry
 
     def member_from_id(self, game_name, member_id):
         """
         Return a team member from an `id`.
         """
-        game = self.game(game_name)
-        return game.member_from_id(member_id)
+        return self._member_entry(game_name, member_id)[1]
 
     def member_from_name(self, game_name, member_name):
         """
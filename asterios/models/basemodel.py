@@ -1,4 +1,6 @@
-from collections import OrderedDict
+from itertools import count
+from math import gcd
+import random
 from uuid import uuid4
 
 from voluptuous import All, Length, Schema
@@ -6,6 +8,9 @@ from voluptuous import All, Length, Schema
 from .errors import DoesntExist
 
 
+_MISSING = object()
+
+
 class _MetaModel(type):
     """
     Ensure that `schema` is defined.
@@ -22,6 +27,8 @@ class ModelMixin(metaclass=_MetaModel):
     in `schema` attribute.
     """
 
+    __slots__ = ()
+
     schema = staticmethod(lambda value: value)
 
     @classmethod
@@ -34,6 +41,39 @@ class ModelMixin(metaclass=_MetaModel):
         return cls(**cleaned)
 
 
+class IndexedField:
+    """
+    A model attribute that can be indexed by a `Collection`.
+
+    The collections containing the model are notified
+    when the value of the attribute changes.
+
+    The value is stored in the attribute prefixed by an underscore and the
+    collections in the `_collections` attribute, models using `__slots__`
+    should define them.
+    """
+
+    def __init__(self):
+        self.name = None
+        self.storage_name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.storage_name = "_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj, self.storage_name)
+
+    def __set__(self, obj, value):
+        old = getattr(obj, self.storage_name, _MISSING)
+        setattr(obj, self.storage_name, value)
+        if old is not _MISSING:
+            for collection_ in getattr(obj, "_collections", ()):
+                collection_.reindex(obj, self.name, old, value)
+
+
 def collection(model, min_length=None, max_length=None):
     """
     A collection defines a list of Model in a voluptuous schema.
@@ -41,15 +81,119 @@ def collection(model, min_length=None, max_length=None):
     return All([model.from_dict], Length(min=min_length, max=max_length))
 
 
+class IdAllocator:
+    """
+    Allocates unique integer ids in a random order without reuse.
+
+    The ids are taken in blocks [start, 10 * start), [10 * start, 100 * start)...
+    Each block is walked using a random permutation `offset + n * step`
+    modulo the block size, so allocating an id is O(1) and ids stay compact.
+
+    >>> allocate = IdAllocator(start=1)
+    >>> sorted(allocate() for _ in range(9))
+    [1, 2, 3, 4, 5, 6, 7, 8, 9]
+    >>> 10 <= allocate() < 100
+    True
+
+    The ids can be partitioned between `count` allocators using
+    `set_shard`, the allocator `index` only returns ids equal to
+    `index` modulo `count`.
+
+    >>> allocate = IdAllocator(start=1)
+    >>> allocate.set_shard(2, 3)
+    >>> sorted(allocate() for _ in range(9))
+    [5, 8, 11, 14, 17, 20, 23, 26, 29]
+
+    The ids restored from a storage are reserved, they are skipped
+    when the permutation reaches them.
+
+    >>> allocate = IdAllocator(start=1)
+    >>> allocate.reserve([2, 5, 7])
+    >>> sorted(allocate() for _ in range(6))
+    [1, 3, 4, 6, 8, 9]
+    """
+
+    def __init__(self, start=1000):
+        self._block_start = start
+        self._block_size = 0
+        self._step = 1
+        self._offset = 0
+        self._count = 0
+        self._shard_index = 0
+        self._shard_count = 1
+        self._reserved = set()
+
+    def set_shard(self, index, count):
+        """
+        Only allocate ids equal to `index` modulo `count`.
+        """
+        self._shard_index = index
+        self._shard_count = count
+
+    def _open_next_block(self):
+        self._block_start += self._block_size
+        self._block_size = self._block_start * 9
+        step = random.randrange(1, self._block_size + 1)
+        while gcd(step, self._block_size) != 1:
+            step += 1
+        self._step = step
+        self._offset = random.randrange(self._block_size)
+        self._count = 0
+
+    def reserve(self, ids):
+        """
+        Never allocate the ids in `ids`.
+        """
+        self._reserved.update(ids)
+
+    def __call__(self):
+        while True:
+            if self._count == self._block_size:
+                self._open_next_block()
+            value = (self._offset + self._count * self._step) % self._block_size
+            self._count += 1
+            id_ = (self._block_start + value) * self._shard_count + self._shard_index
+            if id_ not in self._reserved:
+                return id_
+            # Each id is reached once, it can be forgotten.
+            self._reserved.discard(id_)
+
+
+class _Bucket(dict):
+    """
+    The items of a collection having the same indexed value mapped by `id`.
+
+    An index maps a value to the item if only one item has this value,
+    otherwise it maps the value to a `_Bucket`.
+    """
+
+    def items_in_order(self, positions):
+        """
+        Return the items in the order of `positions`, the insertion order
+        in the collection.
+        """
+        return sorted(self.values(), key=lambda obj: positions[id(obj)])
+
+
 class Collection:
     """
     Maps items with generated key.
+
+    The fields listed in the `indexes` attribute are indexed, the items
+    having a value can be found without scanning the collection. When an
+    indexed field is mutated, the item should notify the collection
+    (see `IndexedField`).
     """
 
     not_exist_error = DoesntExist
+    indexes = ()
 
     def __init__(self, iterable=()):
-        self._objects = OrderedDict()
+        self._objects = {}
+        self._indexes = {field: {} for field in self.indexes}
+        self._positions = {}
+        self._counter = count()
+        self._as_tuple = (self,)
         for obj in iterable:
             self.append(obj)
 
@@ -73,33 +217,101 @@ class Collection:
         remove an item from key
         """
         try:
-            del self._objects[key]
+            obj = self._objects.pop(key)
         except KeyError:
             raise self.not_exist_error(key) from None
+        self._unindex(obj)
 
     def get_first_from_value(self, field, value):
         """
         Return the first item with item.field=value.
         """
         try:
-            return next((item for item in self if getattr(item, field) == value))
+            return next(iter(self.filter(field, value)))
         except StopIteration:
             raise self.not_exist_error(field, value) from None
 
+    def filter(self, field, value):
+        """
+        Return the items with item.field=value.
+        """
+        index = self._indexes.get(field)
+        if index is None:
+            return [item for item in self if getattr(item, field) == value]
+        bucket = index.get(value)
+        if bucket is None:
+            return []
+        if isinstance(bucket, _Bucket):
+            return bucket.items_in_order(self._positions)
+        return [bucket]
+
     def append(self, obj):
         """
         Add an item to the collection.
         """
         new_id = self.generate_id(obj)
         self._objects[new_id] = obj
+        self._index(obj)
         return new_id
 
     def clear(self):
         """
         Clear the collection.
         """
+        for obj in self._objects.values():
+            self._unindex(obj)
         self._objects.clear()
 
+    def _index(self, obj):
+        if not self._indexes:
+            return
+        self._positions[id(obj)] = next(self._counter)
+        for field, index in self._indexes.items():
+            self._add_to_index(index, getattr(obj, field), obj)
+        # pylint: disable=protected-access
+        collections = getattr(obj, "_collections", ())
+        obj._collections = collections + self._as_tuple if collections else self._as_tuple
+
+    def _unindex(self, obj):
+        if not self._indexes:
+            return
+        del self._positions[id(obj)]
+        for field, index in self._indexes.items():
+            self._remove_from_index(index, getattr(obj, field), obj)
+        # pylint: disable=protected-access
+        obj._collections = tuple(
+            collection_ for collection_ in obj._collections if collection_ is not self
+        )
+
+    @staticmethod
+    def _add_to_index(index, value, obj):
+        bucket = index.get(value)
+        if bucket is None:
+            index[value] = obj
+        elif isinstance(bucket, _Bucket):
+            bucket[id(obj)] = obj
+        else:
+            index[value] = _Bucket(((id(bucket), bucket), (id(obj), obj)))
+
+    @staticmethod
+    def _remove_from_index(index, value, obj):
+        bucket = index.get(value)
+        if bucket is obj:
+            del index[value]
+        elif isinstance(bucket, _Bucket):
+            bucket.pop(id(obj), None)
+            if len(bucket) == 1:
+                index[value] = next(iter(bucket.values()))
+
+    def reindex(self, obj, field, old, new):
+        """
+        Move `obj` from `old` to `new` value in the index of `field`.
+        """
+        index = self._indexes.get(field)
+        if index is not None:
+            self._remove_from_index(index, old, obj)
+            self._add_to_index(index, new, obj)
+
     def __getitem__(self, key):
         """
         Return the item mapped with key `key`.
@@ -52,6 +52,12 @@ class MemberDoesntExist(DoesntExist):
     """
 
 
+class ThemeDoesntExist(DoesntExist):
+    """
+    Raises when the expected theme doesn't exist.
+    """
+
+
 @web.middleware
 async def error_middleware(request, handler):
     """
@@ -1,8 +1,10 @@
-import random
+from datetime import timedelta
+import math
 
 from voluptuous import All, Match, Range, Required, Schema
 
-from .basemodel import Collection, ModelMixin, collection
+from ..puzzle_pool import puzzle_pool
+from .basemodel import Collection, IdAllocator, IndexedField, ModelMixin, collection
 from .errors import GameConflict, MemberDoesntExist
 from .team_members import TeamMember
 from .utils import utcnow
@@ -18,19 +20,46 @@ CREATE_GAME_VALIDATOR = Schema(
 )
 
 
+# The ids of team members are unique in all games.
+member_ids = IdAllocator()
+
+
 class _TeamMemberCollection(Collection):
 
     not_exist_error = MemberDoesntExist
+    indexes = ("name",)
 
     def generate_id(self, obj):
-        id_ = random.randint(1000, 9999)
-        obj.id = id_
+        """
+        Allocate a new id to `obj` or keep its id if it is restored.
+        """
+        id_ = getattr(obj, "id", None)
+        if id_ is None:
+            id_ = member_ids()
+            obj.id = id_
         return id_
 
 
 class Game(ModelMixin):
+    """
+    A Game is played by a team. The `version` attribute is incremented
+    each time the JSON representation of the game changes, except for
+    the remaining time.
+    """
+
+    __slots__ = (
+        "team",
+        "_state",
+        "duration",
+        "team_members",
+        "start_at",
+        "version",
+        "_collections",
+        "__weakref__",
+    )
 
     schema = CREATE_GAME_VALIDATOR
+    state = IndexedField()
 
     def __init__(self, team, state, duration, team_members):
         self.team = team
@@ -38,28 +67,53 @@ class Game(ModelMixin):
         self.duration = duration
         self.team_members = _TeamMemberCollection(team_members)
         self.start_at = None
-        self.remaining = None
+        self.version = 0
 
-    def set_remaining_time(self):
+    @property
+    def deadline(self):
         """
-        Compute the remaining time and set it to the game.
+        Return the date when the game will be stopped or None
+        if the game is not started.
+        """
+        if self.start_at is None:
+            return None
+        return self.start_at + timedelta(minutes=self.duration)
+
+    @property
+    def remaining(self):
+        """
+        Return the remaining time in minute or None if the game
+        is not started.
         """
-        now = utcnow()
         if self.state == "started":
-            consumption = (now - self.start_at).seconds // 60
-            self.remaining = max(self.duration - consumption, 0)
-            if self.remaining == 0:
-                self.state = "stopped"
+            seconds = (self.deadline - utcnow()).total_seconds()
+            return min(max(math.ceil(seconds / 60), 0), self.duration)
+        if self.state == "stopped":
+            return 0
+        return None
 
     def start(self):
         """
         Start the game. If the game is already started, a GameConflict error
         is raised.
+
+        The puzzle pool of the current level of each team member is warmed.
         """
         self.ensure_state_is_not("started")
         self.state = "started"
         self.start_at = utcnow()
-        self.remaining = self.duration
+        self.version += 1
+        for member in self.team_members:
+            puzzle_pool.warm(member.levels_obj)
+        return self
+
+    def stop(self):
+        """
+        Stop the game, this method is called when the game duration
+        is elapsed.
+        """
+        self.state = "stopped"
+        self.version += 1
         return self
 
     def add_member(self, values: dict):
@@ -68,6 +122,7 @@ class Game(ModelMixin):
         """
         member = TeamMember.from_dict(values)
         new_id = self.team_members.append(member)
+        self.version += 1
         return self.team_members[new_id]
 
     def set_question(self, member_id):
@@ -77,7 +132,18 @@ class Game(ModelMixin):
     def check_answer(self, member_id, answer):
         self.ensure_state_is("started")
         member = self.member_from_id(member_id)
-        return member.check_answer(answer)
+        is_exact, comment = member.check_answer(answer)
+        if is_exact:
+            self.version += 1
+        return is_exact, comment
+
+    async def check_answer_async(self, executor, member_id, answer):
+        self.ensure_state_is("started")
+        member = self.member_from_id(member_id)
+        is_exact, comment = await member.check_answer_async(executor, answer)
+        if is_exact:
+            self.version += 1
+        return is_exact, comment
 
     def ensure_state_is(self, state: str):
         """
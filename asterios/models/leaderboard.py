@@ -0,0 +1,243 @@
+"""
+This module contains the leaderboard of the team members.
+
+The team members of started and stopped games are ranked by current level,
+then the winners first, then by the date when they reached their level or
+won. The ranking is kept in an indexable skip list, so updating the rank of
+a team member, finding the rank of a team member and reading a page of the
+ranking are O(log n).
+"""
+
+from math import log
+import random
+
+from .listeners import Listener
+from .utils import utcnow
+
+
+class _Node:
+
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, height):
+        self.key = key
+        self.next = [None] * height
+        self.width = [1] * height
+
+
+class RankedList:
+    """
+    A sorted list of unique keys supporting O(log n) insertion, deletion,
+    rank and access by index.
+
+    >>> ranked = RankedList()
+    >>> for key in (30, 10, 20):
+    ...     ranked.add(key)
+    >>> list(ranked)
+    [10, 20, 30]
+    >>> ranked.rank(20), ranked[2]
+    (1, 30)
+    >>> ranked.remove(10)
+    >>> list(ranked.iter_from(1)), len(ranked)
+    ([30], 2)
+    """
+
+    MAX_HEIGHT = 24
+
+    def __init__(self):
+        self._nil = _Node(None, 0)
+        self._head = _Node(None, self.MAX_HEIGHT)
+        self._head.next = [self._nil] * self.MAX_HEIGHT
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _search(self, key):
+        """
+        Return the last node before `key` at each height and the index
+        of these nodes.
+        """
+        chain = [None] * self.MAX_HEIGHT
+        positions = [0] * self.MAX_HEIGHT
+        node = self._head
+        position = 0
+        for height in reversed(range(self.MAX_HEIGHT)):
+            while node.next[height] is not self._nil and node.next[height].key < key:
+                position += node.width[height]
+                node = node.next[height]
+            chain[height] = node
+            positions[height] = position
+        return chain, positions
+
+    def add(self, key):
+        """
+        Insert `key`.
+        """
+        chain, positions = self._search(key)
+        height = min(self.MAX_HEIGHT, 1 - int(log(1.0 - random.random(), 2.0)))
+        node = _Node(key, height)
+        position = positions[0] + 1
+        for level in range(height):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            steps = position - positions[level]
+            node.width[level] = previous.width[level] - steps + 1
+            previous.width[level] = steps
+        for level in range(height, self.MAX_HEIGHT):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key):
+        """
+        Remove `key` or raise KeyError if it is not found.
+        """
+        chain, _ = self._search(key)
+        node = chain[0].next[0]
+        if node is self._nil or node.key != key:
+            raise KeyError(key)
+        for level in range(len(node.next)):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(len(node.next), self.MAX_HEIGHT):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def rank(self, key):
+        """
+        Return the index of `key`.
+        """
+        return self._search(key)[1][0]
+
+    def _node_at(self, index):
+        node = self._head
+        index += 1
+        for height in reversed(range(self.MAX_HEIGHT)):
+            while node.next[height] is not self._nil and node.width[height] <= index:
+                index -= node.width[height]
+                node = node.next[height]
+        return node
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return self._node_at(index).key
+
+    def iter_from(self, index):
+        """
+        Iterate over the keys starting from `index`.
+        """
+        node = self._node_at(index - 1) if index > 0 else self._head
+        node = node.next[0]
+        while node is not self._nil:
+            yield node.key
+            node = node.next[0]
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+
+class Leaderboard(Listener):
+    """
+    Rank the team members of the started and stopped games.
+
+    The leaderboard is a `Listener` notified by the `Model`. The date
+    when a restored team member reached its level is unknown, the start date
+    of the game is used.
+    """
+
+    def __init__(self):
+        self._ranking = RankedList()
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._ranking)
+
+    @staticmethod
+    def _key(member, reached_at):
+        if member.won_at is None:
+            return (-member.levels_obj.level_number, 1, reached_at, member.id)
+        return (-member.levels_obj.level_number, 0, member.won_at, member.id)
+
+    def _update(self, game, member, reached_at):
+        key = self._key(member, reached_at)
+        entry = self._entries.get(member.id)
+        if entry is not None:
+            self._ranking.remove(entry[0])
+        self._entries[member.id] = (key, game, member)
+        self._ranking.add(key)
+
+    def _remove(self, member):
+        entry = self._entries.pop(member.id, None)
+        if entry is not None:
+            self._ranking.remove(entry[0])
+
+    def _entry(self, key, rank):
+        _, game, member = self._entries[key[-1]]
+        return {
+            "rank": rank + 1,
+            "team": game.team,
+            "id": member.id,
+            "name": member.name,
+            "level": member.levels_obj.level_number,
+            "reached_at": key[2],
+            "won_at": member.won_at,
+        }
+
+    def page(self, offset=0, limit=10):
+        """
+        Return the entries of the team members ranked from `offset`
+        to `offset + limit`.
+        """
+        entries = []
+        for rank, key in enumerate(self._ranking.iter_from(offset), offset):
+            if len(entries) == limit:
+                break
+            entries.append(self._entry(key, rank))
+        return entries
+
+    def member(self, member):
+        """
+        Return the entry of `member` or None if it is not ranked.
+        """
+        entry = self._entries.get(member.id)
+        if entry is None:
+            return None
+        return self._entry(entry[0], self._ranking.rank(entry[0]))
+
+    def team(self, game):
+        """
+        Return the entries of the team members of `game` ordered by rank.
+        """
+        entries = (self.member(member) for member in game.team_members)
+        return sorted(
+            (entry for entry in entries if entry is not None),
+            key=lambda entry: entry["rank"],
+        )
+
+    def game_started(self, game):
+        for member in game.team_members:
+            self._update(game, member, game.start_at)
+
+    def game_restored(self, game):
+        if game.state != "ready":
+            self.game_started(game)
+
+    def member_added(self, game, member):
+        if game.state != "ready":
+            self._update(game, member, utcnow())
+
+    def level_advanced(self, game, member):
+        self._update(game, member, utcnow())
+
+    member_won = level_advanced
+
+    def game_deleted(self, game):
+        for member in game.team_members:
+            self._remove(member)
+
+    def games_dropped(self):
+        self._ranking = RankedList()
+        self._entries.clear()
@@ -0,0 +1,58 @@
+"""
+This module contains the base class of the objects notified by the `Model`
+after each mutation, see `Model.subscribe`.
+
+The listeners are notified in the event loop.
+"""
+
+
+class Listener:
+    """
+    Base class of listeners, each method is called by the `Model` after
+    a mutation. This listener does nothing.
+    """
+
+    def game_created(self, game):
+        """
+        Called when a game is created.
+        """
+
+    def game_started(self, game):
+        """
+        Called when a game is started.
+        """
+
+    def game_restored(self, game):
+        """
+        Called when a game is restored by `Model.load`.
+        """
+
+    def game_stopped(self, game):
+        """
+        Called when a game is stopped.
+        """
+
+    def game_deleted(self, game):
+        """
+        Called when a game is deleted.
+        """
+
+    def games_dropped(self):
+        """
+        Called when all games are deleted.
+        """
+
+    def member_added(self, game, member):
+        """
+        Called when a team member is added to a started game.
+        """
+
+    def level_advanced(self, game, member):
+        """
+        Called when a team member reaches the next level.
+        """
+
+    def member_won(self, game, member):
+        """
+        Called when a team member resolves the last level.
+        """
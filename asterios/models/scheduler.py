@@ -0,0 +1,117 @@
+"""
+This module contains the scheduler stopping games when their
+duration is elapsed.
+"""
+
+import asyncio
+import heapq
+import itertools
+
+from .utils import utcnow
+
+
+class ExpiryScheduler:
+    """
+    Stores the deadline of started games in a heap and stops each game
+    exactly once when its deadline is reached.
+
+    Expired games are stopped when `expire` is called and, when the scheduler
+    is started in an event loop, by a timer armed on the nearest deadline.
+
+    Args:
+        on_expire - callable called with each stopped game.
+    """
+
+    def __init__(self, on_expire=None):
+        self.on_expire = on_expire
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._loop = None
+        self._timer = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def register(self, game):
+        """
+        Register the deadline of a started game.
+        """
+        self.cancel(game)
+        entry = [game.deadline, next(self._counter), game]
+        self._entries[game] = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._arm()
+
+    def cancel(self, game):
+        """
+        Remove the deadline of `game` if it is registered.
+        """
+        entry = self._entries.pop(game, None)
+        if entry is not None:
+            entry[-1] = None
+
+    def clear(self):
+        """
+        Remove all deadlines.
+        """
+        self._heap.clear()
+        self._entries.clear()
+        self._arm()
+
+    def expire(self):
+        """
+        Stop the games whose deadline is reached.
+        """
+        heap = self._heap
+        if not heap:
+            return
+        now = utcnow()
+        while heap and heap[0][0] <= now:
+            game = heapq.heappop(heap)[-1]
+            if game is None:
+                continue
+            del self._entries[game]
+            game.stop()
+            if self.on_expire is not None:
+                self.on_expire(game)
+
+    def _arm(self):
+        if self._loop is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+        if self._heap:
+            delay = (self._heap[0][0] - utcnow()).total_seconds()
+            self._timer = self._loop.call_later(max(delay, 0), self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self.expire()
+        self._arm()
+
+    async def start(self, app=None):
+        """
+        Arm a timer in the running loop to stop games at their deadline.
+
+        This coroutine can be used as aiohttp `on_startup` signal.
+        """
+        # pylint: disable=unused-argument
+        self._loop = asyncio.get_running_loop()
+        self._arm()
+
+    async def stop(self, app=None):
+        """
+        Cancel the timer.
+
+        This coroutine can be used as aiohttp `on_cleanup` signal.
+        """
+        # pylint: disable=unused-argument
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._loop = None
@@ -0,0 +1,573 @@
+"""
+This module contains the storages saving the model.
+
+The `Model` serves all reads from memory and notifies its storage after
+each mutation. A storage saves the mutations and its `load` method returns the saved games
+as records when the server restarts.
+
+A game record is a dict::
+
+    {"team": "SG-1", "state": "started", "duration": 60,
+     "start_at": "2018-01-01T12:00:00", "team_members": [member_record, ...]}
+
+and a team member record is a dict::
+
+    {"id": 1432, "name": "D. Jackson", "level": 1, "level_max": None,
+     "theme": "", "level_theme": "compute", "difficulty": "easy",
+     "current_level": 2, "won_at": None}
+
+The `level_theme` is the theme played by the team member, it is chosen
+randomly when the `theme` is empty.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import itertools
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+
+from ..level import Difficulty
+from .games import Game
+from .listeners import Listener
+from .team_members import TeamMember, new_level_set
+
+_logger = logging.getLogger(__name__)
+
+
+def _date_to_str(value):
+    return None if value is None else value.isoformat()
+
+
+def _str_to_date(value):
+    return None if value is None else datetime.fromisoformat(value)
+
+
+def member_record(member):
+    """
+    Return the record of a team member.
+    """
+    return {
+        "id": member.id,
+        "name": member.name,
+        "level": member.level,
+        "level_max": member.level_max,
+        "theme": member.theme,
+        "level_theme": member.levels_obj.theme,
+        "difficulty": member.difficulty.value,
+        "current_level": member.levels_obj.level_number,
+        "won_at": _date_to_str(member.won_at),
+    }
+
+
+def game_record(game):
+    """
+    Return the record of a game.
+    """
+    return {
+        "team": game.team,
+        "state": game.state,
+        "duration": game.duration,
+        "start_at": _date_to_str(game.start_at),
+        "team_members": [member_record(member) for member in game.team_members],
+    }
+
+
+def game_from_record(record):
+    """
+    Build a game from its record, the ids and the progress of team members
+    are kept.
+    """
+    members = []
+    for member_values in record["team_members"]:
+        difficulty = Difficulty(member_values["difficulty"])
+        won_at = _str_to_date(member_values["won_at"])
+        levels_obj = new_level_set(
+            member_values["level_theme"],
+            member_values["current_level"],
+            member_values["level_max"],
+            difficulty,
+            done=won_at is not None,
+        )
+        member = TeamMember(
+            member_values["name"],
+            member_values["level"],
+            member_values["level_max"],
+            member_values["theme"],
+            difficulty,
+            levels_obj,
+        )
+        member.id = member_values["id"]
+        member.won_at = won_at
+        members.append(member)
+
+    game = Game(record["team"], record["state"], record["duration"], members)
+    game.start_at = _str_to_date(record["start_at"])
+    return game
+
+
+class Storage(Listener):
+    """
+    Base class of storages, the `Listener` methods are called by the `Model`
+    after each mutation. This storage doesn't save anything.
+    """
+
+    def bind(self, model):
+        """
+        Called by the `Model` using this storage.
+        """
+
+    def load(self):
+        """
+        Return the saved game records.
+        """
+        # pylint: disable=no-self-use
+        return []
+
+    async def start(self, app=None):
+        """
+        Start the storage.
+
+        This coroutine can be used as aiohttp `on_startup` signal.
+        """
+
+    async def stop(self, app=None):
+        """
+        Save the pending mutations and stop the storage.
+
+        This coroutine can be used as aiohttp `on_cleanup` signal.
+        """
+
+    def close(self):
+        """
+        Close the storage after it is stopped.
+        """
+
+
+class MemoryStorage(Storage):
+    """
+    The default storage, games are only stored in the model memory.
+    """
+
+
+class SQLiteStorage(Storage):
+    """
+    Save the model in a SQLite database in WAL mode.
+
+    The mutations are queued and written in a single transaction every
+    `flush_interval` seconds by a background thread, so the requests
+    don't wait for the disk.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS games ("
+        " team TEXT PRIMARY KEY, state TEXT, duration INTEGER, start_at TEXT)",
+        "CREATE TABLE IF NOT EXISTS members ("
+        " id INTEGER UNIQUE, team TEXT, name TEXT, level INTEGER,"
+        " level_max INTEGER, theme TEXT, level_theme TEXT, difficulty TEXT,"
+        " current_level INTEGER, won_at TEXT)",
+        "CREATE INDEX IF NOT EXISTS members_team ON members (team)",
+    )
+
+    _INSERT_GAME = (
+        "INSERT OR REPLACE INTO games (team, state, duration, start_at)"
+        " VALUES (:team, :state, :duration, :start_at)"
+    )
+    _INSERT_MEMBER = (
+        "INSERT OR REPLACE INTO members (id, team, name, level, level_max, theme,"
+        " level_theme, difficulty, current_level, won_at) VALUES (:id, :team,"
+        " :name, :level, :level_max, :theme, :level_theme, :difficulty,"
+        " :current_level, :won_at)"
+    )
+    _UPDATE_GAME = (
+        "UPDATE games SET state = :state, start_at = :start_at WHERE team = :team"
+    )
+    _UPDATE_MEMBER = (
+        "UPDATE members SET current_level = :current_level, won_at = :won_at"
+        " WHERE id = :id"
+    )
+
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._task = None
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="asterios-sqlite")
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            for statement in self._SCHEMA:
+                self._connection.execute(statement)
+
+    def load(self):
+        connection = self._connection
+        connection.row_factory = sqlite3.Row
+        try:
+            games = {
+                row["team"]: dict(row, team_members=[])
+                for row in connection.execute("SELECT * FROM games ORDER BY rowid")
+            }
+            for row in connection.execute("SELECT * FROM members ORDER BY rowid"):
+                record = dict(row)
+                games[record.pop("team")]["team_members"].append(record)
+        finally:
+            connection.row_factory = None
+        return list(games.values())
+
+    def _queue(self, statement, parameters):
+        self._pending.append((statement, parameters))
+
+    def _queue_member(self, game, member):
+        self._queue(self._INSERT_MEMBER, dict(member_record(member), team=game.team))
+
+    def game_created(self, game):
+        record = game_record(game)
+        del record["team_members"]
+        self._queue(self._INSERT_GAME, record)
+        for member in game.team_members:
+            self._queue_member(game, member)
+
+    def game_started(self, game):
+        self._queue(
+            self._UPDATE_GAME,
+            {
+                "team": game.team,
+                "state": game.state,
+                "start_at": _date_to_str(game.start_at),
+            },
+        )
+
+    game_stopped = game_started
+
+    def game_deleted(self, game):
+        self._queue("DELETE FROM members WHERE team = :team", {"team": game.team})
+        self._queue("DELETE FROM games WHERE team = :team", {"team": game.team})
+
+    def games_dropped(self):
+        self._queue("DELETE FROM members", {})
+        self._queue("DELETE FROM games", {})
+
+    def member_added(self, game, member):
+        self._queue_member(game, member)
+
+    def level_advanced(self, game, member):
+        self._queue(
+            self._UPDATE_MEMBER,
+            {
+                "id": member.id,
+                "current_level": member.levels_obj.level_number,
+                "won_at": _date_to_str(member.won_at),
+            },
+        )
+
+    member_won = level_advanced
+
+    def _write(self, operations):
+        with self._connection:
+            for statement, parameters in operations:
+                self._connection.execute(statement, parameters)
+
+    def flush(self):
+        """
+        Write the pending mutations synchronously.
+        """
+        operations, self._pending = self._pending, []
+        if operations:
+            self._writer.submit(self._write, operations).result()
+
+    async def _flush_periodically(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            operations, self._pending = self._pending, []
+            if operations:
+                try:
+                    await loop.run_in_executor(self._writer, self._write, operations)
+                except sqlite3.Error:
+                    _logger.exception("Cannot write %d operations", len(operations))
+
+    async def start(self, app=None):
+        # pylint: disable=unused-argument
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._flush_periodically())
+
+    async def stop(self, app=None):
+        # pylint: disable=unused-argument
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+    def close(self):
+        """
+        Write the pending mutations and close the database.
+        """
+        self.flush()
+        self._writer.shutdown()
+        self._connection.close()
+
+
+def _replay(games, members, entry):
+    """
+    Apply a journal `entry` to the game records.
+
+    `games` maps the team to the game record and `members` maps the id
+    to the team member record.
+    """
+    operation = entry["op"]
+    if operation == "create":
+        record = entry["game"]
+        games[record["team"]] = record
+        for member in record["team_members"]:
+            members[member["id"]] = member
+    elif operation in ("start", "stop"):
+        games[entry["team"]].update(state=entry["state"], start_at=entry["start_at"])
+    elif operation == "add_member":
+        member = entry["member"]
+        games[entry["team"]]["team_members"].append(member)
+        members[member["id"]] = member
+    elif operation == "advance":
+        members[entry["id"]].update(
+            current_level=entry["current_level"], won_at=entry["won_at"]
+        )
+    elif operation == "delete":
+        for member in games.pop(entry["team"])["team_members"]:
+            del members[member["id"]]
+    elif operation == "drop":
+        games.clear()
+        members.clear()
+    else:
+        raise ValueError("Unknown journal operation {!r}".format(operation))
+
+
+class JournalStorage(Storage):
+    """
+    Save the mutations of the model in an append-only journal.
+
+    The journal entries are written and fsynced together every
+    `fsync_interval` seconds (group commit). Every `snapshot_interval`
+    seconds, the games are written in a snapshot and the journal is
+    truncated. A final snapshot is written when the storage is stopped.
+
+    The snapshot is replaced atomically and stores the sequence number
+    of the last entry it contains, so the entries of the journal already
+    in the snapshot are skipped if the server stops before the journal
+    is truncated.
+
+    The files are `snapshot.json` and `journal.jsonl` in `directory`.
+    """
+
+    def __init__(self, directory, fsync_interval=0.05, snapshot_interval=300.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.directory / "snapshot.json"
+        self.journal_path = self.directory / "journal.jsonl"
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        self._model = None
+        self._pending = []
+        self._sequence = itertools.count(1)
+        self._last_sequence = 0
+        self._journal = None
+        self._tasks = []
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="asterios-journal")
+
+    def bind(self, model):
+        self._model = model
+
+    def load(self):
+        games = {}
+        members = {}
+        last_sequence = 0
+        if self.snapshot_path.exists():
+            with self.snapshot_path.open("rb") as snapshot:
+                content = json.load(snapshot)
+            last_sequence = content["sequence"]
+            for record in content["games"]:
+                _replay(games, members, {"op": "create", "game": record})
+
+        if self.journal_path.exists():
+            with self.journal_path.open("r+b") as journal:
+                end = 0
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        entry = None
+                    if entry is None or not line.endswith(b"\n"):
+                        # The last entry is truncated when the server is
+                        # killed while writing it. It is removed, else the
+                        # next entries would be appended to it.
+                        _logger.warning("Ignore truncated journal entry")
+                        journal.truncate(end)
+                        break
+                    end += len(line)
+                    if entry["seq"] > last_sequence:
+                        _replay(games, members, entry)
+                        last_sequence = entry["seq"]
+
+        self._sequence = itertools.count(last_sequence + 1)
+        self._last_sequence = last_sequence
+        return list(games.values())
+
+    def _append(self, entry):
+        entry["seq"] = self._last_sequence = next(self._sequence)
+        self._pending.append(json.dumps(entry, separators=(",", ":")))
+
+    def game_created(self, game):
+        self._append({"op": "create", "game": game_record(game)})
+
+    def game_started(self, game):
+        self._append(
+            {
+                "op": "start",
+                "team": game.team,
+                "state": game.state,
+                "start_at": _date_to_str(game.start_at),
+            }
+        )
+
+    def game_stopped(self, game):
+        self._append(
+            {
+                "op": "stop",
+                "team": game.team,
+                "state": game.state,
+                "start_at": _date_to_str(game.start_at),
+            }
+        )
+
+    def game_deleted(self, game):
+        self._append({"op": "delete", "team": game.team})
+
+    def games_dropped(self):
+        self._append({"op": "drop"})
+
+    def member_added(self, game, member):
+        self._append(
+            {"op": "add_member", "team": game.team, "member": member_record(member)}
+        )
+
+    def level_advanced(self, game, member):
+        self._append(
+            {
+                "op": "advance",
+                "id": member.id,
+                "current_level": member.levels_obj.level_number,
+                "won_at": _date_to_str(member.won_at),
+            }
+        )
+
+    member_won = level_advanced
+
+    def _write_journal(self, lines):
+        if self._journal is None:
+            self._journal = self.journal_path.open("a", encoding="utf-8")
+        self._journal.write("\n".join(lines) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _write_snapshot(self, lines, sequence, games):
+        if lines:
+            self._write_journal(lines)
+
+        tmp_path = self.snapshot_path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as snapshot:
+            json.dump({"sequence": sequence, "games": games}, snapshot)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = self.journal_path.open("w", encoding="utf-8")
+
+    def _take_pending(self):
+        lines, self._pending = self._pending, []
+        return lines
+
+    def flush(self):
+        """
+        Write and fsync the pending journal entries.
+        """
+        lines = self._take_pending()
+        if lines:
+            self._writer.submit(self._write_journal, lines).result()
+
+    def snapshot(self):
+        """
+        Write a snapshot of the games of the model and truncate the journal.
+        """
+        # The records are built in the calling thread, which owns the model.
+        games = [game_record(game) for game in self._model]
+        sequence = self._last_sequence
+        lines = self._take_pending()
+        return self._writer.submit(self._write_snapshot, lines, sequence, games)
+
+    async def _flush_periodically(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            lines = self._take_pending()
+            if lines:
+                try:
+                    await loop.run_in_executor(self._writer, self._write_journal, lines)
+                except OSError:
+                    _logger.exception("Cannot write %d journal entries", len(lines))
+
+    async def _snapshot_periodically(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await asyncio.wrap_future(self.snapshot())
+            except OSError:
+                _logger.exception("Cannot write the snapshot")
+
+    async def start(self, app=None):
+        # pylint: disable=unused-argument
+        if not self._tasks:
+            self._tasks = [
+                asyncio.ensure_future(self._flush_periodically()),
+                asyncio.ensure_future(self._snapshot_periodically()),
+            ]
+
+    async def stop(self, app=None):
+        # pylint: disable=unused-argument
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._model is not None:
+            await asyncio.wrap_future(self.snapshot())
+        else:
+            self.flush()
+
+    def close(self):
+        """
+        Write the pending entries and close the journal.
+        """
+        self.flush()
+        self._writer.submit(self._close_journal).result()
+        self._writer.shutdown()
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
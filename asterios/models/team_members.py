@@ -3,10 +3,26 @@ import random
 from voluptuous import All, Any, Invalid, Range, Required, Schema
 
 from ..level import Difficulty, get_level_set, get_themes
-from .basemodel import ModelMixin
+from ..puzzle_pool import puzzle_pool
+from .basemodel import IndexedField, ModelMixin
 from .utils import utcnow
 
 
+_MISSING = object()
+
+
+def new_level_set(theme, level, level_max, difficulty, done=False):
+    """
+    Return a new `LevelSet` of `theme` starting at `level`.
+
+    The theme will be chosen randomly if `theme` is not found or empty.
+    """
+    themes = get_themes()
+    if theme not in themes:
+        theme = random.choice(themes)
+    return get_level_set(theme, level, level_max, difficulty, done)
+
+
 def difficulty_validator(value):
     """
     Check if value is a valid difficulty.
@@ -33,54 +49,118 @@ class TeamMember(ModelMixin):
     """
     A TeamMember is a player, each Game has one or multiple TeamMember.
     A TeamMember cannot play multiple games.
+
+    The `version` attribute is incremented each time the JSON representation
+    of the team member changes.
     """
 
+    __slots__ = (
+        "id",
+        "_name",
+        "level",
+        "level_max",
+        "theme",
+        "difficulty",
+        "levels_obj",
+        "won_at",
+        "version",
+        "_collections",
+        "__weakref__",
+    )
+
     schema = CREATE_TEAM_MEMBER_VALIDATOR
+    name = IndexedField()
 
-    def __init__(self, name, level, level_max, theme, difficulty):
+    def __init__(self, name, level, level_max, theme, difficulty, levels_obj=None):
         self.name = name
         self.level = level
         self.level_max = level_max
         self.theme = theme
         self.difficulty = difficulty
-        self.levels_obj = None
+        self.levels_obj = levels_obj
         self.won_at = None
-        self.build_level_set()
+        self.version = 0
+        if levels_obj is None:
+            self.build_level_set()
 
     def set_question(self):
         """
         Return the current puzzle to resolve.
+
+        The puzzle is taken from the `puzzle_pool` when it is possible.
+        """
+        puzzle = self._take_puzzle()
+        if puzzle is _MISSING:
+            puzzle = self.levels_obj.generate_puzzle()
+        return self._question(puzzle)
+
+    async def set_question_async(self, executor):
         """
+        Coroutine version of `set_question`, the puzzle is generated
+        by the `LevelExecutor` `executor`.
+        """
+        puzzle = self._take_puzzle()
+        if puzzle is _MISSING:
+            puzzle = await executor.call_level(self.levels_obj, "generate_puzzle")
+        return self._question(puzzle)
+
+    def _take_puzzle(self):
         level_set = self.levels_obj
+        entry = puzzle_pool.take(
+            level_set.theme, level_set.current_level_class, level_set.difficulty
+        )
+        if entry is None:
+            return _MISSING
+        puzzle, state = entry
+        level_set.set_level_state(state)
+        return puzzle
+
+    def _question(self, puzzle):
         return {
-            "puzzle": level_set.generate_puzzle(),
-            "tip": level_set.tip(),
+            "puzzle": puzzle,
+            "tip": self.levels_obj.tip(),
         }
 
     def check_answer(self, answer):
         """
         Check if the answer resolve the current puzzle.
         """
+        is_exact, comment = self.levels_obj.check_answer(answer)
+        if self._answered(is_exact):
+            self.set_question()
+        return is_exact, comment
+
+    async def check_answer_async(self, executor, answer):
+        """
+        Coroutine version of `check_answer`, the answer is checked
+        by the `LevelExecutor` `executor`.
+        """
         level_set = self.levels_obj
-        is_exact, comment = level_set.check_answer(answer)
-        if is_exact:
-            if level_set.done:
-                self.won_at = utcnow()
-            else:
-                self.set_question()
+        is_exact, comment = level_set.answered(
+            await executor.call_level(level_set, "check_answer", answer)
+        )
+        if self._answered(is_exact):
+            await self.set_question_async(executor)
         return is_exact, comment
 
+    def _answered(self, is_exact):
+        """
+        Update the team member after an answer and return True if a puzzle
+        of the next level should be generated.
+        """
+        if not is_exact:
+            return False
+        self.version += 1
+        if self.levels_obj.done:
+            self.won_at = utcnow()
+            return False
+        return True
+
     def build_level_set(self):
         """
         Build a `LevelSet` object using `theme` attribute and set to
-        the `levels_obj` attribute.
-
-        The `theme` of built `LevelSet` will be chosen randomly if the expected
-        theme is not found or empty.
+        the `levels_obj` attribute, see `new_level_set`.
         """
-        themes = get_themes()
-        theme = self.theme
-        difficulty = self.difficulty
-        if theme not in themes:
-            theme = random.choice(themes)
-        self.levels_obj = get_level_set(theme, self.level, self.level_max, difficulty)
+        self.levels_obj = new_level_set(
+            self.theme, self.level, self.level_max, self.difficulty
+        )
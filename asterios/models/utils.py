@@ -1,6 +1,9 @@
 from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 
+from aiohttp import web
+
 
 class UTCNow:
     """
@@ -12,24 +15,59 @@ class UTCNow:
     >>> with utcnow.patch(datetime(2018, 7, 29, 9, 0)):
     ...    utcnow()
     datetime.datetime(2018, 7, 29, 9, 0)
+
+    The `cached` method reads the clock once and returns the same
+    value until the end of the block in the current context.
+
+    >>> with utcnow.cached():
+    ...    utcnow() is utcnow()
+    True
     """
 
     def __init__(self):
         self.mocked = None
+        self._cached = ContextVar("utcnow", default=None)
 
     def __call__(self):
-        if self.mocked is None:
-            return datetime.utcnow()
-        return self.mocked
+        if self.mocked is not None:
+            return self.mocked
+        cached = self._cached.get()
+        if cached is not None:
+            return cached
+        return datetime.utcnow()
 
     @contextmanager
     def patch(self, return_value):
         """
         Change the returned value when object is called.
         """
+        previous = self.mocked
         self.mocked = return_value
-        yield
-        self.mocked = None
+        try:
+            yield
+        finally:
+            self.mocked = previous
+
+    @contextmanager
+    def cached(self):
+        """
+        Read the clock once and return this reading in the current context.
+        """
+        token = self._cached.set(datetime.utcnow())
+        try:
+            yield
+        finally:
+            self._cached.reset(token)
 
 
 utcnow = UTCNow()
+
+
+@web.middleware
+async def clock_middleware(request, handler):
+    """
+    This coroutine reads the clock once by request, so the remaining time
+    of all games returned by a request are computed from the same time.
+    """
+    with utcnow.cached():
+        return await handler(request)
@@ -0,0 +1,200 @@
+"""
+This module contains the profilers of the admin routes, they profile
+a running server for a few seconds and can only be used by the superuser.
+
+    - `GET /admin/profile?seconds=N` samples the stacks of all threads
+      every `interval` seconds and returns the collapsed stacks, one stack
+      by line followed by the number of samples, the format read by
+      flamegraph.pl and speedscope.
+    - `GET /admin/memory?seconds=N` traces the memory allocations with
+      `tracemalloc` and returns the memory allocated by each level module
+      and the lines allocating the most memory.
+
+A single profile runs at a time.
+"""
+
+import asyncio
+from collections import Counter
+import sys
+import threading
+import time
+import tracemalloc
+
+from aiohttp import web
+from aiohttp_security import check_permission
+
+from .level import MetaLevel
+
+
+MAX_SECONDS = 60.0
+TRACEMALLOC_FRAMES = 25
+
+_profiling = threading.Lock()
+
+
+def _frame_name(frame):
+    return "{}:{}".format(frame.f_globals.get("__name__", "?"), frame.f_code.co_name)
+
+
+def sample_stacks(seconds, interval=0.005):
+    """
+    Sample the stacks of the other threads during `seconds` and return
+    a Counter of the stacks, from the thread name to the innermost frame
+    joined with ";".
+    """
+    ident = threading.get_ident()
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        for thread_ident, frame in frames.items():
+            if thread_ident == ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_ident, str(thread_ident)))
+            stacks[";".join(reversed(stack))] += 1
+        del frames
+        time.sleep(interval)
+    return stacks
+
+
+def collapse(stacks):
+    """
+    Return the collapsed stacks text of a Counter of stacks.
+
+    >>> print(collapse(Counter({'main;a:f': 2, 'main;a:f;b:g': 3})))
+    main;a:f 2
+    main;a:f;b:g 3
+    """
+    return "\n".join(
+        "{} {}".format(stack, count) for stack, count in sorted(stacks.items())
+    )
+
+
+def level_modules():
+    """
+    Return a dict mapping the file of each level module to its name.
+    """
+    files = {}
+    for theme in MetaLevel.get_themes():
+        module = sys.modules.get(theme)
+        path = getattr(module, "__file__", None)
+        if path is not None:
+            files[path] = theme
+    return files
+
+
+def reset_peak():
+    """
+    Reset the peak of the memory traced by `tracemalloc`.
+
+    `tracemalloc.reset_peak` is new in Python 3.9, with Python 3.8 the
+    traces are cleared, which also resets the peak.
+    """
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.clear_traces()
+
+
+def memory_report(snapshot, limit=10):
+    """
+    Return the memory allocated by each level module and the `limit` lines
+    allocating the most memory in `snapshot`.
+
+    An allocation belongs to the innermost level module of its traceback,
+    the allocations out of level code are grouped in "other".
+    """
+    snapshot = snapshot.filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),)
+    )
+    modules = level_modules()
+    groups = {}
+    for statistic in snapshot.statistics("traceback"):
+        name = "other"
+        for frame in reversed(statistic.traceback):
+            if frame.filename in modules:
+                name = modules[frame.filename]
+                break
+        group = groups.setdefault(name, {"module": name, "size": 0, "count": 0})
+        group["size"] += statistic.size
+        group["count"] += statistic.count
+
+    return {
+        "modules": sorted(groups.values(), key=lambda group: -group["size"]),
+        "top": [
+            {
+                "line": "{}:{}".format(
+                    statistic.traceback[0].filename, statistic.traceback[0].lineno
+                ),
+                "size": statistic.size,
+                "count": statistic.count,
+            }
+            for statistic in snapshot.statistics("lineno")[:limit]
+        ],
+    }
+
+
+def _float_query(request, name, default):
+    try:
+        value = float(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(text="{} should be a number".format(name))
+    if not 0 < value <= MAX_SECONDS:
+        raise web.HTTPBadRequest(
+            text="{} should be in ]0, {}]".format(name, MAX_SECONDS)
+        )
+    return value
+
+
+async def profile_handler(request):
+    """
+    Sample the stacks during `seconds` (10 by default) and return
+    the collapsed stacks.
+    """
+    await check_permission(request, "admin.profile")
+    seconds = _float_query(request, "seconds", 10.0)
+    interval = _float_query(request, "interval", 0.005)
+    if not _profiling.acquire(blocking=False):
+        raise web.HTTPConflict(text="A profile is running")
+    try:
+        loop = asyncio.get_running_loop()
+        stacks = await loop.run_in_executor(None, sample_stacks, seconds, interval)
+    finally:
+        _profiling.release()
+    return web.Response(text=collapse(stacks) + "\n")
+
+
+async def memory_handler(request):
+    """
+    Trace the memory allocations during `seconds` (10 by default) and
+    return the allocations grouped by level module and the `limit`
+    (10 by default) lines allocating the most memory.
+    """
+    await check_permission(request, "admin.profile")
+    seconds = _float_query(request, "seconds", 10.0)
+    try:
+        limit = int(request.query.get("limit", 10))
+    except ValueError:
+        raise web.HTTPBadRequest(text="limit should be an integer")
+    if not _profiling.acquire(blocking=False):
+        raise web.HTTPConflict(text="A profile is running")
+    try:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            await asyncio.sleep(seconds)
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if started:
+                tracemalloc.stop()
+        loop = asyncio.get_running_loop()
+        report = await loop.run_in_executor(None, memory_report, snapshot, limit)
+    finally:
+        _profiling.release()
+    return web.json_response(report)
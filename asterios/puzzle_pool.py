@@ -0,0 +1,264 @@
+"""
+This module contains a pool of pre-generated puzzles.
+
+Generating a puzzle can be expensive and, at the start of a game, a lot of
+team members ask a puzzle of the same level at the same time. The `PuzzlePool`
+generates puzzles of poolable levels in the background so that
+`TeamMember.set_question` only has to pop a ready puzzle.
+
+A pool entry is a 2-tuple containing the puzzle and the state of the level
+object after `generate_puzzle`: its `member_state` attributes, or all its
+attributes if the level doesn't define `member_state`. Only levels
+defining `poolable = True` are pooled, their `generate_puzzle` method
+must not depend on attributes set by previous calls.
+"""
+
+import asyncio
+from collections import Counter, deque
+import logging
+import time
+
+from .level import _new_level
+from .metrics import metrics
+
+
+_logger = logging.getLogger(__name__)
+
+
+def generate_entry(theme, level_class, difficulty):
+    """
+    Generate a puzzle with a new `level_class` object and return a 2-tuple
+    with the puzzle and the state of the level, see `PuzzlePool`.
+
+    The whole state is kept, so `generate_puzzle` can change
+    the attributes in place.
+
+    The generation is recorded in `asterios_level_duration_seconds`
+    like the puzzles generated by `LevelSet.call_level`.
+
+    >>> from asterios.level import BaseLevel, Difficulty, MetaLevel
+    >>> class Level1(BaseLevel):
+    ...     "tip"
+    ...     def generate_puzzle(self):
+    ...         self.expected = 7
+    ...         return '3 + 4'
+    ...     def check_answer(self, answer):
+    ...         return (answer == self.expected, '')
+    >>> MetaLevel.clean()
+    >>> generate_entry('asterios.puzzle_pool', Level1, Difficulty.EASY)
+    ('3 + 4', {'difficulty': <Difficulty.EASY: 'easy'>, 'expected': 7})
+    >>> Level1.member_state = ('expected',)
+    >>> generate_entry('asterios.puzzle_pool', Level1, Difficulty.EASY)
+    ('3 + 4', {'expected': 7})
+    """
+    level = _new_level(level_class, difficulty)
+    start = time.perf_counter()
+    try:
+        puzzle = level.generate_puzzle()
+    finally:
+        metrics.level_duration.observe(
+            (theme, level_class, difficulty, "generate_puzzle"),
+            time.perf_counter() - start,
+        )
+    attributes = vars(level)
+    if level_class.member_state is None:
+        return puzzle, dict(attributes)
+    return puzzle, {
+        name: attributes[name]
+        for name in level_class.member_state
+        if name in attributes
+    }
+
+
+class PuzzlePool:
+    """
+    Stores bounded ring buffers of pre-generated puzzles
+    keyed by (theme, level class, difficulty).
+
+    >>> from asterios.level import BaseLevel, Difficulty, MetaLevel
+    >>> class Level1(BaseLevel):
+    ...     "tip"
+    ...     poolable = True
+    ...     member_state = ('expected',)
+    ...     def generate_puzzle(self):
+    ...         self.expected = 7
+    ...         return '3 + 4'
+    ...     def check_answer(self, answer):
+    ...         return (answer == self.expected, '')
+    >>> MetaLevel.clean()
+
+    The pool is disabled while `depth` is 0.
+
+    >>> pool = PuzzlePool(depth=2)
+    >>> key = ('asterios.puzzle_pool', Level1, Difficulty.EASY)
+    >>> pool.take(*key) is None
+    True
+    >>> pool.fill(*key)
+    2
+    >>> pool.take(*key)
+    ('3 + 4', {'expected': 7})
+    >>> pool.stats()[key]
+    {'size': 1, 'hits': 1, 'misses': 1}
+    """
+
+    def __init__(self, depth=0):
+        self.depth = depth
+        self.hits = Counter()
+        self.misses = Counter()
+        self._buffers = {}
+        self._pending = {}
+        self._wakeup = None
+        self._task = None
+
+    def configure(self, depth):
+        """
+        Change the depth of the pool and drop pre-generated puzzles.
+        """
+        self.depth = depth
+        self.clear()
+
+    @property
+    def enabled(self):
+        """
+        Returns True if puzzles can be pooled.
+        """
+        return self.depth > 0
+
+    def is_poolable(self, level_class):
+        """
+        Returns True if the puzzles of `level_class` can be pooled.
+        """
+        return self.enabled and getattr(level_class, "poolable", False)
+
+    def _buffer(self, key):
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = deque(maxlen=self.depth)
+        return buffer
+
+    def take(self, theme, level_class, difficulty):
+        """
+        Pop a pre-generated entry or return None if the pool is empty.
+
+        The pool of the level is refilled in background.
+        """
+        if not self.is_poolable(level_class):
+            return None
+
+        key = (theme, level_class, difficulty)
+        buffer = self._buffer(key)
+        self.request_fill(*key)
+        if buffer:
+            self.hits[key] += 1
+            return buffer.popleft()
+
+        self.misses[key] += 1
+        return None
+
+    def fill(self, theme, level_class, difficulty):
+        """
+        Fill the pool of a level synchronously and return
+        the number of generated puzzles.
+        """
+        if not self.is_poolable(level_class):
+            return 0
+
+        buffer = self._buffer((theme, level_class, difficulty))
+        count = 0
+        while len(buffer) < self.depth:
+            buffer.append(generate_entry(theme, level_class, difficulty))
+            count += 1
+        return count
+
+    def request_fill(self, theme, level_class, difficulty):
+        """
+        Ask the background task to fill the pool of a level.
+        """
+        if not self.is_poolable(level_class):
+            return
+
+        self._pending[(theme, level_class, difficulty)] = None
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def warm(self, level_set):
+        """
+        Ask the background task to fill the pool of the current level
+        of `level_set`.
+        """
+        if level_set.done:
+            return
+        self.request_fill(
+            level_set.theme, level_set.current_level_class, level_set.difficulty
+        )
+
+    def clear(self):
+        """
+        Drop all pre-generated puzzles and reset counters.
+        """
+        self._buffers.clear()
+        self._pending.clear()
+        self.hits.clear()
+        self.misses.clear()
+
+    def stats(self):
+        """
+        Returns size, hits and misses of each pool.
+        """
+        return {
+            key: {
+                "size": len(buffer),
+                "hits": self.hits[key],
+                "misses": self.misses[key],
+            }
+            for key, buffer in self._buffers.items()
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                key = next(iter(self._pending))
+                del self._pending[key]
+                buffer = self._buffer(key)
+                while len(buffer) < self.depth:
+                    try:
+                        entry = await loop.run_in_executor(None, generate_entry, *key)
+                    except Exception:  # pylint: disable=broad-except
+                        _logger.exception("Cannot generate puzzle for %r", key)
+                        break
+                    buffer.append(entry)
+
+    async def start(self, app=None):
+        """
+        Start the background task filling the pools.
+
+        This coroutine can be used as aiohttp `on_startup` signal.
+        """
+        # pylint: disable=unused-argument
+        if self.enabled and self._task is None:
+            self._wakeup = asyncio.Event()
+            if self._pending:
+                self._wakeup.set()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self, app=None):
+        """
+        Stop the background task filling the pools.
+
+        This coroutine can be used as aiohttp `on_cleanup` signal.
+        """
+        # pylint: disable=unused-argument
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+
+puzzle_pool = PuzzlePool()
@@ -2,6 +2,8 @@
 This module contains code to bind http handers to a http route.
 """
 
+from .metrics import metrics_handler
+from .profiler import memory_handler, profile_handler
 from .views import (
     GameConfigItemView,
     GameConfigCollectionView,
@@ -10,7 +12,15 @@ from .views import (
     AsteriosItemView,
     GameConfigActionStartView,
     GameConfigActionAddMemberView,
+    LeaderboardView,
+    LeaderboardTeamView,
+    LeaderboardMemberView,
+    ThemeCollectionView,
+    ThemeItemView,
+    asterios_websocket,
+    event_stream,
 )
+from .watchdog import health_handler, lag_handler
 
 
 def setup_routes(app):
@@ -30,6 +40,11 @@ def setup_routes(app):
         AsteriosActionSolveView,
         name="asterios-solve",
     )
+    app.router.add_get(
+        "/asterios/{team}/member/{team_member}/ws",
+        asterios_websocket,
+        name="asterios-ws",
+    )
     app.router.add_view(
         "/game-config", GameConfigCollectionView, name="game-collection"
     )
@@ -42,3 +57,20 @@ def setup_routes(app):
         GameConfigActionAddMemberView,
         name="game-action-add-member",
     )
+    app.router.add_get("/events", event_stream, name="events")
+    app.router.add_view("/leaderboard", LeaderboardView, name="leaderboard")
+    app.router.add_view(
+        "/leaderboard/{team}", LeaderboardTeamView, name="leaderboard-team"
+    )
+    app.router.add_view(
+        "/leaderboard/{team}/{team_member}",
+        LeaderboardMemberView,
+        name="leaderboard-member",
+    )
+    app.router.add_view("/themes", ThemeCollectionView, name="theme-collection")
+    app.router.add_view("/themes/{theme}", ThemeItemView, name="theme-item")
+    app.router.add_get("/metrics", metrics_handler, name="metrics")
+    app.router.add_get("/health", health_handler, name="health")
+    app.router.add_get("/admin/lag", lag_handler, name="admin-lag")
+    app.router.add_get("/admin/profile", profile_handler, name="admin-profile")
+    app.router.add_get("/admin/memory", memory_handler, name="admin-memory")
@@ -93,6 +93,61 @@ class ReturnedGameSchema(GameToCreateSchema):
         }
 
 
+class LeaderboardEntrySchema(BaseModel):
+    """
+    The rank of a team member.
+    """
+
+    rank: int = Field(description="The rank of the team member, starting at 1")
+    team: str = Field(description="The name of team")
+    id: int = Field(description="The id of the team member")
+    name: str = Field(description="The name of the team member")
+    level: int = Field(description="The current level")
+    reached_at: datetime.datetime = Field(
+        description="The date when the current level is reached"
+    )
+    won_at: Optional[datetime.datetime] = Field(
+        description="The date of victory in ISO 8601 format"
+    )
+
+
+class LeaderboardPageSchema(BaseModel):
+    """
+    A page of the leaderboard.
+    """
+
+    total: int = Field(description="The number of ranked team members")
+    offset: int
+    limit: int
+    entries: List[LeaderboardEntrySchema]
+
+
+class ThemeSchema(BaseModel):
+    """
+    A theme of levels.
+    """
+
+    name: str = Field(description="The name of the theme")
+    level_count: int = Field(description="The number of levels")
+
+
+class ThemeLevelSchema(BaseModel):
+    """
+    A level of a theme.
+    """
+
+    level: int = Field(description="The level number, starting at 1")
+    tip: str = Field(description="The tip of the level")
+
+
+class ThemeDetailSchema(ThemeSchema):
+    """
+    A theme of levels with the tips of its levels.
+    """
+
+    levels: List[ThemeLevelSchema]
+
+
 class ErrorSchema(BaseModel):
     message: str
     exception: str
@@ -0,0 +1,214 @@
+"""
+This module contains the JSON serializer of asterios.
+
+The `Serializer` encodes objects that are not natively JSON serializable
+using encoders registered by type. The encoder of an object is found from
+its type in a dict, the MRO is only walked once by type.
+
+When `orjson` is installed it is used to encode the JSON, else the stdlib
+`json` module is used. Both backends return the same JSON: the dataclasses
+are encoded by the registered encoders, the subclasses of `str`, `int`,
+`float`, `list`, `tuple` and `dict` are encoded as their base type and the
+enum members as their value, so no encoder can be registered for these
+types.
+
+Level authors can register encoders for their own puzzle types::
+
+    from asterios.serializer import serializer
+
+    @serializer.register(Maze)
+    def encode_maze(maze):
+        return maze.rows
+"""
+
+from datetime import datetime
+import enum
+import json
+
+from .level import Difficulty, LevelSet
+from .models import Game, TeamMember
+from .models.basemodel import Collection
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+#: The encoders of the subclasses of the types encoded natively by both
+#: backends, they are used when `orjson` passes a subclass to `default`.
+_BASE_ENCODERS = {str: str, int: int, float: float, list: list, tuple: list, dict: dict}
+
+
+def _is_native(type_):
+    if issubclass(type_, enum.Enum):
+        return type_ is not enum.Enum
+    return issubclass(type_, tuple(_BASE_ENCODERS))
+
+
+class Serializer:
+    """
+    Encode objects to JSON bytes using encoders registered by type.
+
+    The `encoders` dict maps types to encoders, it can be shared
+    between serializers using different backends.
+
+    >>> serializer = Serializer(native=False)
+    >>> serializer.dumps({'a': [1, 2]})
+    b'{"a":[1,2]}'
+    >>> serializer.dumps({1})
+    Traceback (most recent call last):
+        ...
+    TypeError: Object of type set is not JSON serializable
+    >>> @serializer.register(set)
+    ... def encode_set(value):
+    ...     return sorted(value)
+    >>> serializer.dumps({3, 1, 2})
+    b'[1,2,3]'
+    >>> serializer.register(Difficulty, lambda difficulty: difficulty.name)
+    Traceback (most recent call last):
+        ...
+    TypeError: Difficulty objects are encoded natively
+    """
+
+    def __init__(self, native=True, encoders=None):
+        self.native = orjson if native else None
+        self.encoders = {} if encoders is None else encoders
+        self._dispatch = {}
+
+    def register(self, type_, encoder=None):
+        """
+        Register `encoder` to encode `type_` objects. The encoder returns
+        a JSON serializable object.
+
+        This method can be used as decorator if `encoder` is not given.
+        """
+        if encoder is None:
+            return lambda encoder: self.register(type_, encoder)
+
+        if _is_native(type_):
+            raise TypeError("{} objects are encoded natively".format(type_.__name__))
+        self.encoders[type_] = encoder
+        self._dispatch.clear()
+        return encoder
+
+    def _find_encoder(self, type_):
+        for cls in type_.__mro__:
+            encoder = self.encoders.get(cls, _BASE_ENCODERS.get(cls))
+            if encoder is not None:
+                return encoder
+        return None
+
+    def default(self, obj):
+        """
+        Encode `obj` using the encoder registered for its type.
+        """
+        try:
+            encoder = self._dispatch[type(obj)]
+        except KeyError:
+            encoder = self._dispatch[type(obj)] = self._find_encoder(type(obj))
+
+        if encoder is None:
+            raise TypeError(
+                "Object of type {} is not JSON serializable".format(
+                    type(obj).__name__
+                )
+            )
+        return encoder(obj)
+
+    def dumps(self, obj):
+        """
+        Encode `obj` to JSON bytes.
+        """
+        if self.native is not None:
+            try:
+                return self.native.dumps(
+                    obj,
+                    default=self.default,
+                    option=self.native.OPT_PASSTHROUGH_DATETIME
+                    | self.native.OPT_PASSTHROUGH_DATACLASS
+                    | self.native.OPT_PASSTHROUGH_SUBCLASS
+                    | self.native.OPT_NON_STR_KEYS,
+                )
+            except self.native.JSONEncodeError:
+                # orjson doesn't support some values such as integers
+                # larger than 64 bits, we try with the stdlib.
+                pass
+
+        return json.dumps(obj, default=self.default, separators=(",", ":")).encode()
+
+
+serializer = Serializer()
+
+
+@serializer.register(datetime)
+def encode_datetime(obj):
+    """
+    Encode datetime using ISO 8601 format.
+    """
+    return obj.isoformat()
+
+
+@serializer.register(enum.Enum)
+def encode_enum(obj):
+    """
+    Encode an enum member, e.g. a `Difficulty`, to its value
+    as `orjson` does.
+    """
+    return obj.value
+
+
+@serializer.register(LevelSet)
+def encode_level_set(obj):
+    """
+    Encode LevelSet object to dict with `theme` and `level` keys.
+    """
+    return {"theme": obj.theme, "level": obj.level_number}
+
+
+@serializer.register(Collection)
+def encode_collection(obj):
+    """
+    Encode a collection to a list.
+    """
+    return list(obj)
+
+
+@serializer.register(TeamMember)
+def encode_team_member(obj):
+    """
+    Encode a team member.
+    """
+    return {
+        "id": obj.id,
+        "name": obj.name,
+        "level": obj.level,
+        "level_max": obj.level_max,
+        "theme": obj.theme,
+        "difficulty": obj.difficulty,
+        "levels_obj": obj.levels_obj,
+        "won_at": obj.won_at,
+    }
+
+
+@serializer.register(Game)
+def encode_game(obj):
+    """
+    Encode a game, `start_at` and `remaining` are encoded
+    when the game is started.
+    """
+    ret = {
+        "team": obj.team,
+        "state": obj.state,
+        "duration": obj.duration,
+        "team_members": obj.team_members,
+    }
+
+    if obj.start_at is not None:
+        ret["start_at"] = obj.start_at
+
+    remaining = obj.remaining
+    if remaining is not None:
+        ret["remaining"] = remaining
+
+    return ret
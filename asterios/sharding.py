@@ -0,0 +1,427 @@
+"""
+This module contains the sharded serving mode of asterios.
+
+When `--workers N` is greater than 1, N worker processes each run the
+asterios application on a private Unix socket and a front process routes
+the requests. The games are partitioned by team name, so all the requests
+of a team are served by the worker owning the team:
+
+    - `/asterios/{team}/...` and `/game-config/{team}/...` are routed using
+      the team of the path.
+    - `POST /game-config` is routed using the team of the JSON body.
+    - `GET /game-config` is sent to all workers and the games are merged.
+    - `GET /events` streams the events of all workers, or of the worker
+      owning the `team` query parameter.
+    - `GET /leaderboard` merges the rankings of all workers. The ranks
+      returned by `/leaderboard/{team}` are the ranks in the worker
+      owning the team.
+    - `GET /metrics?worker=N` returns the metrics of the worker N, each
+      worker should be scraped. `/health` and `/admin/...` also accept
+      `?worker=N`.
+    - The other requests (documentation...) are sent to the first worker.
+
+WebSocket connections are proxied to the worker owning the team.
+
+The worker of a team is computed from a stable hash of the team name, so
+the number of workers must not change between restarts when the games
+are saved.
+"""
+
+import asyncio
+import heapq
+import json
+from multiprocessing import Process
+import os
+from pathlib import Path
+import re
+import tempfile
+import zlib
+
+from aiohttp import (
+    ClientSession,
+    UnixConnector,
+    WSMsgType,
+    WSServerHandshakeError,
+    web,
+)
+
+
+_TEAM_PATH = re.compile(r"^/(?:asterios|game-config|leaderboard)/([^/]+)")
+
+# Paths served by the worker selected with the `worker` query parameter.
+_WORKER_PATH = re.compile(r"^/(?:metrics|health|admin/.*)$")
+
+# Headers that are managed by the client and the server of the proxy.
+_HOP_BY_HOP_HEADERS = frozenset(
+    (
+        "connection",
+        "content-length",
+        "host",
+        "keep-alive",
+        "transfer-encoding",
+        "upgrade",
+    )
+)
+
+
+def shard_of(team, count):
+    """
+    Return the index of the shard owning `team`.
+
+    >>> shard_of('SG-1', 4) == shard_of('SG-1', 4)
+    True
+    >>> shard_of('SG-1', 1)
+    0
+    """
+    return zlib.crc32(team.encode()) % count
+
+
+def team_from_path(path):
+    """
+    Return the team of a request path or None.
+
+    >>> team_from_path('/asterios/SG-1/member/1432/puzzle')
+    'SG-1'
+    >>> team_from_path('/game-config') is None
+    True
+    """
+    match = _TEAM_PATH.match(path)
+    if match is None:
+        return None
+    return match.group(1)
+
+
+def _forwarded_headers(headers):
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in _HOP_BY_HOP_HEADERS
+        and not name.lower().startswith("sec-websocket-")
+    }
+
+
+class Router:
+    """
+    Forward the requests to the worker owning the team.
+
+    Args:
+        socket_paths - the Unix socket paths of the workers.
+    """
+
+    def __init__(self, socket_paths):
+        self.socket_paths = list(socket_paths)
+        self._sessions = []
+
+    async def start(self, app=None):
+        """
+        Open a connection pool by worker.
+
+        This coroutine can be used as aiohttp `on_startup` signal.
+        """
+        # pylint: disable=unused-argument
+        self._sessions = [
+            ClientSession(connector=UnixConnector(path=path), auto_decompress=False)
+            for path in self.socket_paths
+        ]
+
+    async def stop(self, app=None):
+        """
+        Close the connection pools.
+
+        This coroutine can be used as aiohttp `on_cleanup` signal.
+        """
+        # pylint: disable=unused-argument
+        for session in self._sessions:
+            await session.close()
+        self._sessions = []
+
+    def session_of(self, team):
+        """
+        Return the session of the worker owning `team`.
+        """
+        return self._sessions[shard_of(team, len(self._sessions))]
+
+    async def _forward(self, session, request, body):
+        async with session.request(
+            request.method,
+            "http://asterios" + request.path_qs,
+            headers=_forwarded_headers(request.headers),
+            data=body,
+            allow_redirects=False,
+        ) as response:
+            return web.Response(
+                status=response.status,
+                body=await response.read(),
+                headers=_forwarded_headers(response.headers),
+            )
+
+    async def _forward_websocket(self, session, request):
+        try:
+            upstream = await session.ws_connect(
+                "http://asterios" + request.path_qs,
+                headers=_forwarded_headers(request.headers),
+            )
+        except WSServerHandshakeError:
+            # The worker refuses the connection (unknown team member...),
+            # the client gets the error response of the worker.
+            return await self._forward(session, request, None)
+
+        async with upstream:
+            downstream = web.WebSocketResponse()
+            await downstream.prepare(request)
+
+            async def pump(source, destination):
+                async for frame in source:
+                    if frame.type == WSMsgType.TEXT:
+                        await destination.send_str(frame.data)
+                    elif frame.type == WSMsgType.BINARY:
+                        await destination.send_bytes(frame.data)
+                await destination.close()
+
+            await asyncio.gather(pump(downstream, upstream), pump(upstream, downstream))
+            return downstream
+
+    async def _stream_events(self, sessions, request):
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+
+        async def pump(session):
+            async with session.get(
+                "http://asterios" + request.path_qs,
+                headers=_forwarded_headers(request.headers),
+            ) as upstream:
+                frame = []
+                async for line in upstream.content:
+                    frame.append(line)
+                    if line == b"\n":
+                        await response.write(b"".join(frame))
+                        frame = []
+
+        tasks = [asyncio.ensure_future(pump(session)) for session in sessions]
+        try:
+            # Stop when a worker or the client closes its stream.
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        except ConnectionResetError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+        return response
+
+    async def _list_games(self, request):
+        responses = await asyncio.gather(
+            *(self._forward(session, request, None) for session in self._sessions)
+        )
+        for response in responses:
+            if response.status != 200:
+                return response
+
+        games = b",".join(
+            response.body[1:-1] for response in responses if response.body != b"[]"
+        )
+        return web.Response(
+            body=b"[" + games + b"]",
+            headers=_forwarded_headers(responses[0].headers),
+        )
+
+    async def _ranking(self, session, request, count):
+        """
+        Return the `count` first entries of the leaderboard of a worker
+        and the number of ranked team members.
+        """
+        entries = []
+        while True:
+            async with session.get(
+                "http://asterios/leaderboard",
+                params={"offset": len(entries), "limit": 100},
+                headers=_forwarded_headers(request.headers),
+            ) as response:
+                page = await response.json()
+            entries.extend(page["entries"])
+            if len(entries) >= count or len(page["entries"]) < 100:
+                return entries[:count], page["total"]
+
+    async def _leaderboard_page(self, request):
+        try:
+            offset = max(int(request.query.get("offset", 0)), 0)
+            limit = min(max(int(request.query.get("limit", 10)), 0), 100)
+        except ValueError:
+            return await self._forward(self._sessions[0], request, None)
+
+        rankings = await asyncio.gather(
+            *(
+                self._ranking(session, request, offset + limit)
+                for session in self._sessions
+            )
+        )
+        merged = heapq.merge(
+            *(entries for entries, _ in rankings),
+            key=lambda entry: (
+                -entry["level"],
+                entry["won_at"] is None,
+                entry["reached_at"],
+                entry["id"],
+            ),
+        )
+        entries = []
+        for rank, entry in enumerate(merged, 1):
+            if rank > offset + limit:
+                break
+            if rank > offset:
+                entries.append(dict(entry, rank=rank))
+        return web.json_response(
+            {
+                "total": sum(total for _, total in rankings),
+                "offset": offset,
+                "limit": limit,
+                "entries": entries,
+            }
+        )
+
+    async def handle(self, request):
+        """
+        Forward `request` and return the response of the worker.
+        """
+        team = team_from_path(request.path)
+        if request.headers.get("Upgrade", "").lower() == "websocket":
+            return await self._forward_websocket(
+                self.session_of(team) if team else self._sessions[0], request
+            )
+
+        if request.path == "/events" and request.method == "GET":
+            team = request.query.get("team")
+            sessions = [self.session_of(team)] if team else self._sessions
+            return await self._stream_events(sessions, request)
+
+        if request.path == "/leaderboard" and request.method == "GET":
+            return await self._leaderboard_page(request)
+
+        body = await request.read()
+        if request.path == "/game-config":
+            if request.method == "GET":
+                return await self._list_games(request)
+            if request.method == "POST":
+                try:
+                    team = json.loads(body)["team"]
+                except (ValueError, TypeError, KeyError):
+                    team = None
+
+        if isinstance(team, str):
+            session = self.session_of(team)
+        elif _WORKER_PATH.match(request.path):
+            try:
+                session = self._sessions[int(request.query.get("worker", 0))]
+            except (ValueError, IndexError):
+                raise web.HTTPNotFound(text="Unknown worker")
+        else:
+            session = self._sessions[0]
+        return await self._forward(session, request, body)
+
+
+def make_router_app(socket_paths):
+    """
+    Return the front application forwarding requests to the workers
+    listening on `socket_paths`.
+    """
+    router = Router(socket_paths)
+    app = web.Application()
+    app["router"] = router
+    app.router.add_route("*", "/{path:.*}", router.handle)
+    app.on_startup.append(router.start)
+    app.on_cleanup.append(router.stop)
+    return app
+
+
+def install_event_loop(name):
+    """
+    Install the event loop policy `name`, "asyncio" or "uvloop".
+    """
+    if name == "uvloop":
+        try:
+            import uvloop  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            raise SystemExit("uvloop event loop requires the uvloop package")
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    elif name != "asyncio":
+        raise SystemExit("Unknown event loop {!r}".format(name))
+
+
+def run_worker(config_args, index, count, socket_path):
+    """
+    Run the asterios application of the shard `index` on `socket_path`.
+
+    This function is the target of the worker processes.
+    """
+    from . import make_app  # pylint: disable=import-outside-toplevel
+
+    app = make_app(config_args, shard=(index, count))
+    install_event_loop(app["config"]["event_loop"])
+    web.run_app(app, path=socket_path, print=None)
+
+
+def _wait_for_sockets(paths, workers, timeout=60):
+    async def wait(app):  # pylint: disable=unused-argument
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not all(os.path.exists(path) for path in paths):
+            if loop.time() > deadline or not all(
+                worker.is_alive() for worker in workers
+            ):
+                raise RuntimeError("The asterios workers didn't start")
+            await asyncio.sleep(0.05)
+
+    return wait
+
+
+def run_sharded(config_args, config):
+    """
+    Start `config["workers"]` worker processes and run the front router.
+    """
+    count = config["workers"]
+    with tempfile.TemporaryDirectory(prefix="asterios-") as directory:
+        paths = [
+            str(Path(directory) / "worker-{}.sock".format(index))
+            for index in range(count)
+        ]
+        workers = [
+            Process(
+                target=run_worker,
+                args=(config_args, index, count, path),
+                name="asterios-worker-{}".format(index),
+            )
+            for index, path in enumerate(paths)
+        ]
+        for worker in workers:
+            worker.start()
+
+        async def stop_workers(app):  # pylint: disable=unused-argument
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                await asyncio.get_running_loop().run_in_executor(None, worker.join)
+
+        app = make_router_app(paths)
+        app.on_startup.insert(0, _wait_for_sockets(paths, workers))
+        app.on_cleanup.append(stop_workers)
+        install_event_loop(config["event_loop"])
+        try:
+            run_app(app, config)
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+
+
+def run_app(app, config):
+    """
+    Run `app` on the Unix socket or on the host and the port of `config`.
+    """
+    if config["unix_socket"]:
+        web.run_app(app, path=config["unix_socket"])
+    else:
+        web.run_app(app, host=config["host"], port=config["port"])
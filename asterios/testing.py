@@ -0,0 +1,277 @@
+"""
+This module helps the level authors to measure their levels.
+
+`profile_theme` loads a level package with `MetaLevel.load_level` and, for
+each level and each difficulty, calls `generate_puzzle` and `check_answer`
+`runs` times on new level objects. The report of a level contains the
+percentiles of the durations, the peak of the memory allocated by
+a generate/check round and the size of the JSON encoded puzzle and answer.
+
+The answers are computed by the `solvers` given by level number, the
+answer is None (a wrong answer) for the other levels.
+
+`assert_within_budget` raises a `BudgetExceeded` error listing the levels
+exceeding a `Budget`, so a test of the level package fails when a level is
+too slow or its puzzles are too big::
+
+    import unittest
+
+    from asterios.testing import Budget, assert_within_budget
+
+    class TestPerformance(unittest.TestCase):
+
+        def test_levels_should_be_within_budget(self):
+            assert_within_budget(
+                "my_levels", Budget(generate_p99=0.01, puzzle_size=65536)
+            )
+
+The command line prints the reports of a level package and exits with
+the status 1 when a budget is exceeded::
+
+    PYTHONPATH=./sample/:$PYTHONPATH python -m asterios.testing compute \\
+        --generate-p99 0.01
+"""
+
+from argparse import ArgumentParser
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+import attr
+
+from .level import Difficulty, MetaLevel
+from .profiler import reset_peak
+from .serializer import serializer
+
+
+#: The number of rounds measuring the peak of memory, `tracemalloc` slows
+#: down the level code so these rounds are not timed.
+MEMORY_RUNS = 5
+
+
+class BudgetExceeded(AssertionError):
+    """
+    Raised when a level exceeds its budget.
+    """
+
+
+@attr.s(frozen=True)
+class Budget:
+    """
+    The max durations in seconds and sizes in bytes allowed for each level,
+    None means unlimited.
+    """
+
+    generate_p99 = attr.ib(default=None)
+    check_p99 = attr.ib(default=None)
+    peak_memory = attr.ib(default=None)
+    puzzle_size = attr.ib(default=None)
+    answer_size = attr.ib(default=None)
+
+    def violations(self, report):
+        """
+        Return the messages describing how `report` exceeds the budget.
+
+        >>> report = {'theme': 'compute', 'level': 1, 'difficulty': 'easy',
+        ...           'generate': {'p99': 0.02}, 'check': {'p99': 0.001},
+        ...           'peak_memory': 1000, 'puzzle_size': 100, 'answer_size': 10}
+        >>> Budget(generate_p99=0.01, puzzle_size=1000).violations(report)
+        ['compute Level1 (easy): generate_puzzle p99 0.02s > 0.01s']
+        """
+        measures = (
+            (
+                "generate_puzzle p99",
+                report["generate"]["p99"],
+                self.generate_p99,
+                "s",
+            ),
+            ("check_answer p99", report["check"]["p99"], self.check_p99, "s"),
+            ("peak memory", report["peak_memory"], self.peak_memory, "B"),
+            ("puzzle size", report["puzzle_size"], self.puzzle_size, "B"),
+            ("answer size", report["answer_size"], self.answer_size, "B"),
+        )
+        return [
+            "{} Level{} ({}): {} {:g}{} > {:g}{}".format(
+                report["theme"],
+                report["level"],
+                report["difficulty"],
+                name,
+                value,
+                unit,
+                limit,
+                unit,
+            )
+            for name, value, limit, unit in measures
+            if limit is not None and value > limit
+        ]
+
+
+def _percentiles(durations):
+    if len(durations) < 2:
+        durations = durations * 2
+    cuts = statistics.quantiles(durations, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98], "max": max(durations)}
+
+
+def _round(level_class, difficulty, solver):
+    level = level_class(difficulty)
+    start = time.perf_counter()
+    puzzle = level.generate_puzzle()
+    generated = time.perf_counter()
+    answer = solver(puzzle) if solver is not None else None
+    checking = time.perf_counter()
+    level.check_answer(answer)
+    end = time.perf_counter()
+    return puzzle, answer, generated - start, end - checking
+
+
+def profile_level(theme, number, level_class, difficulty, runs=100, solver=None):
+    """
+    Return the report of `level_class` with `difficulty`.
+    """
+    generate, check = [], []
+    puzzle_size = answer_size = 0
+    for _ in range(runs):
+        puzzle, answer, generate_duration, check_duration = _round(
+            level_class, difficulty, solver
+        )
+        generate.append(generate_duration)
+        check.append(check_duration)
+        puzzle_size = max(puzzle_size, len(serializer.dumps(puzzle)))
+        answer_size = max(answer_size, len(serializer.dumps(answer)))
+
+    peak_memory = 0
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        for _ in range(min(runs, MEMORY_RUNS)):
+            reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            _round(level_class, difficulty, solver)
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    return {
+        "theme": theme,
+        "level": number,
+        "difficulty": difficulty.value,
+        "runs": runs,
+        "generate": _percentiles(generate),
+        "check": _percentiles(check),
+        "peak_memory": peak_memory,
+        "puzzle_size": puzzle_size,
+        "answer_size": answer_size,
+    }
+
+
+def load_themes(package_name):
+    """
+    Load the levels of `package_name` and return its themes.
+    """
+    MetaLevel.load_level(package_name)
+    return [
+        theme
+        for theme in MetaLevel.get_themes()
+        if theme == package_name or theme.startswith(package_name + ".")
+    ]
+
+
+def profile_theme(
+    package_name, runs=100, solvers=None, difficulties=tuple(Difficulty)
+):
+    """
+    Return the reports of each level of `package_name` for each difficulty.
+
+    `solvers` maps a level number to a function returning the answer
+    of a puzzle.
+    """
+    solvers = solvers or {}
+    return [
+        profile_level(
+            theme, number, level_class, difficulty, runs, solvers.get(number)
+        )
+        for theme in load_themes(package_name)
+        for number, level_class in sorted(MetaLevel.get_levels(theme).items())
+        for difficulty in difficulties
+    ]
+
+
+def assert_within_budget(package_name, budget, runs=100, solvers=None):
+    """
+    Profile the levels of `package_name` and raise a `BudgetExceeded`
+    error if a level exceeds `budget`. Return the reports.
+    """
+    reports = profile_theme(package_name, runs, solvers)
+    violations = [
+        violation for report in reports for violation in budget.violations(report)
+    ]
+    if violations:
+        raise BudgetExceeded("\n".join(violations))
+    return reports
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        prog="python -m asterios.testing",
+        description="Measure the levels of a level package.",
+    )
+    parser.add_argument("package", help="the level package")
+    parser.add_argument("--runs", type=int, default=100)
+    for field in attr.fields(Budget):
+        parser.add_argument(
+            "--" + field.name.replace("_", "-"),
+            type=float,
+            help="the max {} of the levels".format(field.name.replace("_", " ")),
+        )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(args)
+
+    budget = Budget(
+        **{field.name: getattr(args, field.name) for field in attr.fields(Budget)}
+    )
+    reports = profile_theme(args.package, args.runs)
+    violations = [
+        violation for report in reports for violation in budget.violations(report)
+    ]
+    if args.json:
+        print(json.dumps({"reports": reports, "violations": violations}, indent=2))
+    else:
+        print(
+            "{:<20} {:>6} {:<7} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+                "theme",
+                "level",
+                "diff.",
+                "gen p99 ms",
+                "chk p99 ms",
+                "peak KiB",
+                "puzzle B",
+                "answer B",
+            )
+        )
+        for report in reports:
+            print(
+                "{:<20} {:>6} {:<7} {:>10.3f} {:>10.3f} {:>10.1f} {:>10} {:>10}"
+                .format(
+                    report["theme"],
+                    report["level"],
+                    report["difficulty"],
+                    report["generate"]["p99"] * 1000,
+                    report["check"]["p99"] * 1000,
+                    report["peak_memory"] / 1024,
+                    report["puzzle_size"],
+                    report["answer_size"],
+                )
+            )
+        for violation in violations:
+            print(violation, file=sys.stderr)
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+This module measures the phases of requests.
+
+When the tracing is enabled, the `Tracer.middleware` starts a `Trace` by
+request and the views measure their phases using `span` and `mark`:
+
+    - "validation": the routing and the validation of the `PydanticView`.
+    - "parse": the parsing of the request body.
+    - "model": the look up of the game and the team member.
+    - "level": the level code.
+    - "encode": the JSON encoding of the response.
+    - "total": the whole request.
+
+The phases are sent in the `Server-Timing` header and/or written in
+a rotating trace file, one JSON object by line. The trace file is written
+by a background thread.
+
+When the tracing is disabled, `span` and `mark` return immediately.
+"""
+
+from contextvars import ContextVar
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import queue
+import time
+
+from aiohttp import web
+
+
+_current_trace = ContextVar("trace", default=None)
+
+
+class Trace:
+    """
+    The durations of the phases of a request in seconds.
+    """
+
+    __slots__ = ("start", "checkpoint", "spans")
+
+    def __init__(self):
+        self.start = self.checkpoint = time.perf_counter()
+        self.spans = {}
+
+    def add(self, name, duration):
+        """
+        Add `duration` to the phase `name`.
+        """
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    def server_timing(self, total):
+        """
+        Return the value of the Server-Timing header.
+
+        >>> trace = Trace()
+        >>> trace.add('level', 0.0125)
+        >>> trace.server_timing(0.02)
+        'level;dur=12.500, total;dur=20.000'
+        """
+        return ", ".join(
+            "{};dur={:.3f}".format(name, duration * 1000)
+            for name, duration in list(self.spans.items()) + [("total", total)]
+        )
+
+
+class _Span:
+
+    __slots__ = ("name", "trace", "start")
+
+    def __init__(self, name, trace):
+        self.name = name
+        self.trace = trace
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        self.trace.add(self.name, end - self.start)
+        self.trace.checkpoint = end
+
+
+class _NoSpan:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """
+    Return a context manager measuring the phase `name` of the
+    current request.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(name, trace)
+
+
+def mark(name):
+    """
+    Measure the phase `name` as the time since the end of the previous
+    phase of the current request.
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        now = time.perf_counter()
+        trace.add(name, now - trace.checkpoint)
+        trace.checkpoint = now
+
+
+class Tracer:
+    """
+    Configure the tracing of the requests.
+
+    Args:
+        server_timing - add the Server-Timing header to the responses.
+        path - the path of the trace file, no file is written if empty.
+        max_bytes - the max size of the trace file before the rotation.
+        backup_count - the number of rotated trace files.
+        slow - only write the requests slower than `slow` seconds in
+               the trace file.
+    """
+
+    def __init__(
+        self,
+        server_timing=True,
+        path="",
+        max_bytes=10_000_000,
+        backup_count=3,
+        slow=0.0,
+    ):
+        self.server_timing = server_timing
+        self.slow = slow
+        self._logger = None
+        self._listener = None
+        self._started = False
+        if path:
+            self._logger = logging.Logger("asterios.trace")
+            records = queue.SimpleQueue()
+            self._logger.addHandler(QueueHandler(records))
+            handler = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count
+            )
+            self._listener = QueueListener(records, handler)
+
+    def write(self, request, status, trace, total):
+        """
+        Write the trace of a request in the trace file.
+        """
+        if self._logger is not None and total >= self.slow:
+            self._logger.info(
+                json.dumps(
+                    {
+                        "time": time.time(),
+                        "method": request.method,
+                        "path": request.path,
+                        "status": status,
+                        "total": total,
+                        "spans": trace.spans,
+                    }
+                )
+            )
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        """
+        Start a trace by request, add the Server-Timing header and write
+        the trace file.
+        """
+        trace = Trace()
+        token = _current_trace.set(trace)
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            if self.server_timing and not response.prepared:
+                response.headers["Server-Timing"] = trace.server_timing(
+                    time.perf_counter() - trace.start
+                )
+            return response
+        except web.HTTPException as exc:
+            status = exc.status
+            raise
+        finally:
+            _current_trace.reset(token)
+            self.write(request, status, trace, time.perf_counter() - trace.start)
+
+    async def start(self, app=None):
+        """
+        Start the thread writing the trace file.
+
+        This coroutine can be used as aiohttp `on_startup` signal.
+        """
+        # pylint: disable=unused-argument
+        if self._listener is not None and not self._started:
+            self._listener.start()
+            self._started = True
+
+    async def stop(self, app=None):
+        """
+        Write the pending traces and stop the thread.
+
+        This coroutine can be used as aiohttp `on_cleanup` signal.
+        """
+        # pylint: disable=unused-argument
+        if self._started:
+            self._listener.stop()
+            self._started = False
@@ -4,82 +4,193 @@ This module contains the asterios view
 A view is a class containing several HTTP handlers.
 """
 
-from datetime import datetime
+import asyncio
+import hashlib
 import json
 from json.decoder import JSONDecodeError
-from typing import Union, List
+from typing import List, Literal, Optional, Union
+import weakref
 
-from aiohttp import web
+from aiohttp import WSMsgType, web
 from aiohttp_pydantic import PydanticView
-from aiohttp_pydantic.oas.typing import r200, r201, r404, r409, r420
+from aiohttp_pydantic.oas.typing import r200, r201, r400, r404, r409, r420
 from aiohttp_security import has_permission
 
-from .level import LevelSet, Difficulty
-from .models import TeamMember, Game
-from .models.basemodel import Collection
+from .level import LevelSet, MetaLevel
+from .metrics import metrics
+from .models.errors import DoesntExist, GameConflict, ModelConflict, ThemeDoesntExist
 from .schema import (
+    LeaderboardEntrySchema,
+    LeaderboardPageSchema,
     ReturnedGameSchema,
     GameToCreateSchema,
     ReturnedTeamMemberSchema,
     TeamMemberToCreateSchema,
+    ThemeDetailSchema,
+    ThemeSchema,
     ErrorSchema,
 )
+from .serializer import serializer
+from .tracing import mark, span
 
 
-class JSONEncoder(json.JSONEncoder):
+def json_response(obj, status=200):
+    """
+    Return a web.Response containing `obj` encoded with the serializer.
+    """
+    with span("encode"):
+        body = serializer.dumps(obj)
+    return bytes_response(body, status=status)
+
+
+class EncodingCache:
     """
-    This JSONEncoder can encode datetime using ISO 8601 format
-    and LevelSet object to dict with `theme` and `level` keys.
+    Caches the JSON encoded bytes of games and team members.
+
+    The cached bytes of a team member are reused while its `version` doesn't
+    change. The cached bytes of a game are reused while its `version` and its
+    remaining time don't change, they are built joining the cached bytes of
+    its team members.
     """
 
-    def default(self, o):
+    def __init__(self):
+        self._members = weakref.WeakKeyDictionary()
+        self._games = weakref.WeakKeyDictionary()
+
+    def member(self, member):
         """
-        Encode Model object to JSON.
+        Return the JSON encoded bytes of a team member.
         """
+        cached = self._members.get(member)
+        if cached is None or cached[0] != member.version:
+            cached = (member.version, serializer.dumps(member))
+            self._members[member] = cached
+        return cached[1]
 
-        # pylint: disable=method-hidden, too-many-return-statements
-        if isinstance(o, datetime):
-            return o.isoformat()
-        if isinstance(o, LevelSet):
-            return {"theme": o.theme, "level": o.level_number}
-        if isinstance(o, Difficulty):
-            return o.value
-        if isinstance(o, TeamMember):
-            return {
-                "id": o.id,
-                "name": o.name,
-                "level": o.level,
-                "level_max": o.level_max,
-                "theme": o.theme,
-                "difficulty": o.difficulty,
-                "levels_obj": o.levels_obj,
-                "won_at": o.won_at,
-            }
-        if isinstance(o, Collection):
-            return list(o)
-        if isinstance(o, Game):
-            ret = {
-                "team": o.team,
-                "state": o.state,
-                "duration": o.duration,
-                "team_members": o.team_members,
-            }
+    def game(self, game):
+        """
+        Return the JSON encoded bytes of a game.
+        """
+        key = (game.version, game.remaining)
+        cached = self._games.get(game)
+        if cached is None or cached[0] != key:
+            head = {"team": game.team, "state": game.state, "duration": game.duration}
+            tail = {}
+            if game.start_at is not None:
+                tail["start_at"] = game.start_at
+            if key[1] is not None:
+                tail["remaining"] = key[1]
+
+            parts = [
+                serializer.dumps(head)[:-1],
+                b',"team_members":[',
+                b",".join(self.member(member) for member in game.team_members),
+                b"]",
+            ]
+            if tail:
+                parts.append(b"," + serializer.dumps(tail)[1:])
+            else:
+                parts.append(b"}")
+            cached = (key, b"".join(parts))
+            self._games[game] = cached
+        return cached[1]
+
+    def games(self, games):
+        """
+        Return the JSON encoded bytes of a list of games.
+        """
+        return b"[" + b",".join(self.game(game) for game in games) + b"]"
 
-            if o.start_at is not None:
-                ret["start_at"] = o.start_at
 
-            if o.remaining is not None:
-                ret["remaining"] = o.remaining
+encoding_cache = EncodingCache()
 
-            return ret
-        return json.JSONEncoder.default(self, o)
 
+def bytes_response(body, status=200):
+    """
+    Return a web.Response containing JSON encoded bytes.
+    """
+    return web.Response(body=body, status=status, content_type="application/json")
 
-def json_response(obj, status=200):
+
+#: The themes only change when the server restarts with other level packages.
+THEME_CACHE_CONTROL = "public, max-age=86400"
+
+
+class ThemeCache:
     """
-    Return a web.json_response manage model object json encoding.
+    Caches the JSON encoded bytes and the strong ETag of the themes.
+
+    The themes are read from the level catalog compiled by `MetaLevel`, they
+    are encoded again only when the catalog is compiled again. `make_app`
+    encodes them at startup so the requests only copy the cached bytes.
+    Only the themes without missing levels are listed.
     """
-    return web.json_response(obj, status=status, dumps=JSONEncoder().encode)
+
+    def __init__(self):
+        self._catalog = None
+        self._themes = {}
+
+    @staticmethod
+    def _entry(obj):
+        body = serializer.dumps(obj)
+        return (body, '"{}"'.format(hashlib.blake2b(body, digest_size=16).hexdigest()))
+
+    def encode(self):
+        """
+        Encode the themes if the catalog changed.
+        """
+        catalog = MetaLevel.catalog()
+        if catalog is self._catalog:
+            return
+        summaries = []
+        themes = {}
+        for name in catalog.themes:
+            levels = catalog.levels.get(name)
+            if levels is None:
+                continue
+            summary = {"name": name, "level_count": len(levels)}
+            summaries.append(summary)
+            themes[name] = self._entry(
+                dict(
+                    summary,
+                    levels=[
+                        {"level": number, "tip": catalog.tips[level_class]}
+                        for number, level_class in enumerate(levels, 1)
+                    ],
+                )
+            )
+        themes[None] = self._entry(summaries)
+        self._themes = themes
+        self._catalog = catalog
+
+    def get(self, theme=None):
+        """
+        Return the (bytes, ETag) of `theme` or of the theme list if `theme`
+        is None.
+        """
+        self.encode()
+        try:
+            return self._themes[theme]
+        except KeyError:
+            raise ThemeDoesntExist(theme, "name") from None
+
+
+theme_cache = ThemeCache()
+
+
+def cached_response(request, body, etag):
+    """
+    Return a web.Response containing JSON encoded bytes with a strong ETag
+    and long cache headers, or a 304 response if the `If-None-Match` header
+    of `request` matches `etag`.
+    """
+    headers = {"ETag": etag, "Cache-Control": THEME_CACHE_CONTROL}
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None and any(
+        tag.strip() in ("*", etag, "W/" + etag) for tag in if_none_match.split(",")
+    ):
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=body, headers=headers, content_type="application/json")
 
 
 class GameConfigCollectionView(PydanticView):
@@ -87,12 +198,21 @@ class GameConfigCollectionView(PydanticView):
     HTTP handlers to create a game or get all games.
     """
 
-    async def get(self) -> r200[List[ReturnedGameSchema]]:
+    async def get(
+        self, state: Optional[Literal["ready", "started", "stopped"]] = None
+    ) -> Union[r200[List[ReturnedGameSchema]], r400]:
         """
         Return all created game.
+
+        Query parameters:
+            state: Return only the games in this state ("ready", "started"
+                   or "stopped").
+
+        Status Codes:
+            400: The state is unknown.
         """
-        result = self.request.app["model"].games()
-        return json_response(result)
+        result = self.request.app["model"].games(state)
+        return bytes_response(encoding_cache.games(result))
 
     async def post(
         self, game_config: GameToCreateSchema
@@ -106,7 +226,7 @@ class GameConfigCollectionView(PydanticView):
             201: The game is created.
         """
         game = self.request.app["model"].create(game_config.dict(exclude_unset=True))
-        return json_response(game, status=201)
+        return bytes_response(encoding_cache.game(game), status=201)
 
 
 class GameConfigItemView(PydanticView):
@@ -125,7 +245,7 @@ class GameConfigItemView(PydanticView):
             404: The game is not found
         """
         result = self.request.app["model"].game(name)
-        return json_response(result)
+        return bytes_response(encoding_cache.game(result))
 
     @has_permission("gameconfig.delete")
     async def delete(self, name: str, /) -> Union[r200, r404[ErrorSchema]]:
@@ -150,9 +270,8 @@ class GameConfigActionStartView(PydanticView):
         Status Codes:
             200: The game is started
         """
-        game = self.request.app["model"].game(name)
-        game.start()
-        return json_response(game)
+        game = self.request.app["model"].start(name)
+        return bytes_response(encoding_cache.game(game))
 
 
 class GameConfigActionAddMemberView(PydanticView):
@@ -167,9 +286,8 @@ class GameConfigActionAddMemberView(PydanticView):
             404: The game does not exist.
             409: The state of game do not allow to add a member.
         """
-        game = self.request.app["model"].game(name)
-        game.add_member(team_member.dict())
-        return json_response(game)
+        game = self.request.app["model"].add_member(name, team_member.dict())
+        return bytes_response(encoding_cache.game(game))
 
 
 class AsteriosItemView(PydanticView):
@@ -180,9 +298,8 @@ class AsteriosItemView(PydanticView):
         """
         Return a member of team.
         """
-        return json_response(
-            self.request.app["model"].member_from_id(team, team_member)
-        )
+        member = self.request.app["model"].member_from_id(team, team_member)
+        return bytes_response(encoding_cache.member(member))
 
 
 class AsteriosActionPuzzleView(PydanticView):
@@ -199,7 +316,15 @@ class AsteriosActionPuzzleView(PydanticView):
             200: A question is generated and returned.
             404: If the game or team member doesn't exist
         """
-        return json_response(self.request.app["model"].set_question(team, team_member))
+        mark("validation")
+        model = self.request.app["model"]
+        with span("model"):
+            member = model.member_from_id(team, team_member)
+        with span("level"):
+            question = await model.set_question_async(team, team_member)
+        response = json_response(question)
+        metrics.puzzle_size.observe((member.levels_obj.theme,), len(response.body))
+        return response
 
 
 class AsteriosActionSolveView(PydanticView):
@@ -217,14 +342,246 @@ class AsteriosActionSolveView(PydanticView):
             404: If the game or team member doesn't exist
             420: The puzzle isn't solved.
         """
+        mark("validation")
         try:
-            answer = await self.request.json()
+            with span("parse"):
+                answer = await self.request.json()
         except JSONDecodeError as error:
             return json_response(str(error), status=400)
 
-        is_exact, comment = self.request.app["model"].check_answer(
-            team, team_member, answer
+        model = self.request.app["model"]
+        with span("model"):
+            member = model.member_from_id(team, team_member)
+        metrics.answer_size.observe(
+            (member.levels_obj.theme,), len(await self.request.read())
         )
+        with span("level"):
+            is_exact, comment = await model.check_answer_async(
+                team, team_member, answer
+            )
         if is_exact:
             return json_response(comment, status=201)
         return json_response(comment, status=420)
+
+
+class LeaderboardView(PydanticView):
+    """
+    HTTP handler to get a page of the leaderboard.
+    """
+
+    async def get(
+        self, offset: int = 0, limit: int = 10
+    ) -> r200[LeaderboardPageSchema]:
+        """
+        Return the team members ranked from `offset` to `offset + limit`.
+
+        The team members are ranked by level, then the winners first, then by
+        the date when they reached their level.
+
+        Query parameters:
+            offset: The rank of the first team member, starting at 0.
+            limit: The number of team members, at most 100.
+        """
+        offset = max(offset, 0)
+        limit = min(max(limit, 0), 100)
+        leaderboard = self.request.app["model"].leaderboard
+        return json_response(
+            {
+                "total": len(leaderboard),
+                "offset": offset,
+                "limit": limit,
+                "entries": leaderboard.page(offset, limit),
+            }
+        )
+
+
+class LeaderboardTeamView(PydanticView):
+    """
+    HTTP handler to get the ranks of the team members of a game.
+    """
+
+    async def get(
+        self, team: str, /
+    ) -> Union[r200[List[LeaderboardEntrySchema]], r404[ErrorSchema]]:
+        """
+        Return the ranks of the team members of a game.
+
+        Status Codes:
+            200: Return the ranks, the list is empty if the game is not started.
+            404: The game is not found.
+        """
+        model = self.request.app["model"]
+        return json_response(model.leaderboard.team(model.game(team)))
+
+
+class LeaderboardMemberView(PydanticView):
+    """
+    HTTP handler to get the rank of a team member.
+    """
+
+    async def get(
+        self, team: str, team_member: str, /
+    ) -> Union[r200[LeaderboardEntrySchema], r404[ErrorSchema], r409[ErrorSchema]]:
+        """
+        Return the rank of a team member.
+
+        Status Codes:
+            200: Return the rank.
+            404: The game or the team member is not found.
+            409: The game is not started.
+        """
+        model = self.request.app["model"]
+        entry = model.leaderboard.member(model.member_from_id(team, team_member))
+        if entry is None:
+            raise GameConflict("The game `{name}` is not started".format(name=team))
+        return json_response(entry)
+
+
+class ThemeCollectionView(PydanticView):
+    """
+    HTTP handler to get the themes.
+    """
+
+    async def get(self) -> r200[List[ThemeSchema]]:
+        """
+        Return the themes and their number of levels.
+
+        The response has a strong ETag, a request with a matching
+        `If-None-Match` header gets a 304 response.
+        """
+        return cached_response(self.request, *theme_cache.get())
+
+
+class ThemeItemView(PydanticView):
+    """
+    HTTP handler to get the levels of a theme.
+    """
+
+    async def get(
+        self, theme: str, /
+    ) -> Union[r200[ThemeDetailSchema], r404[ErrorSchema]]:
+        """
+        Return a theme with the tip of each level.
+
+        The response has a strong ETag, a request with a matching
+        `If-None-Match` header gets a 304 response.
+
+        Status Codes:
+            200: Return the theme.
+            404: The theme is not found.
+        """
+        return cached_response(self.request, *theme_cache.get(theme))
+
+
+async def _play(model, team, team_member, member, message):
+    """
+    Run a message of the WebSocket play channel and return the replies.
+    """
+    action = message.get("action")
+    replies = []
+    if action == "puzzle":
+        question = await model.set_question_async(team, team_member)
+        replies.append(dict(question, type="puzzle"))
+    elif action == "solve":
+        is_exact, comment = await model.check_answer_async(
+            team, team_member, message.get("answer")
+        )
+        replies.append({"type": "answer", "exact": is_exact, "comment": comment})
+        if is_exact:
+            if member.won_at is None:
+                replies.append(
+                    {"type": "level-up", "level": member.levels_obj.level_number}
+                )
+            else:
+                replies.append({"type": "win", "won_at": member.won_at})
+    else:
+        replies.append(
+            {
+                "type": "error",
+                "message": "Unknown action {!r}".format(action),
+                "exception": "Invalid",
+            }
+        )
+    return replies
+
+
+async def asterios_websocket(request):
+    """
+    Play channel of a team member.
+
+    The client sends `{"action": "puzzle"}` to get the puzzle of the current
+    level and `{"action": "solve", "answer": ...}` to solve it. The replies
+    have a `type` field: "puzzle", "answer" or "error". An exact answer is
+    followed by a "level-up" or a "win" event. The `id` field of a message
+    is copied to its replies.
+    """
+    team = request.match_info["team"]
+    team_member = request.match_info["team_member"]
+    model = request.app["model"]
+    member = model.member_from_id(team, team_member)
+
+    websocket = web.WebSocketResponse()
+    await websocket.prepare(request)
+    async for frame in websocket:
+        if frame.type != WSMsgType.TEXT:
+            continue
+
+        message = {}
+        try:
+            decoded = json.loads(frame.data)
+            if not isinstance(decoded, dict):
+                raise ValueError("The message should be a JSON object")
+            message = decoded
+            if message.get("action") == "solve":
+                metrics.answer_size.observe(
+                    (member.levels_obj.theme,), len(frame.data)
+                )
+            replies = await _play(model, team, team_member, member, message)
+        except (DoesntExist, ModelConflict, ValueError) as exc:
+            replies = [
+                {"type": "error", "message": str(exc), "exception": type(exc).__name__}
+            ]
+        except LevelSet.DoneException as exc:
+            replies = [
+                {"type": "error", "message": "You win!", "exception": type(exc).__name__}
+            ]
+
+        for reply in replies:
+            if "id" in message:
+                reply["id"] = message["id"]
+            data = serializer.dumps(reply)
+            if reply["type"] == "puzzle":
+                metrics.puzzle_size.observe((member.levels_obj.theme,), len(data))
+            await websocket.send_str(data.decode())
+    return websocket
+
+
+SSE_HEARTBEAT = 15
+
+
+async def event_stream(request):
+    """
+    Stream the game events using Server-Sent Events.
+
+    The `team` query parameter filters the events of a team. A client
+    that doesn't read its events fast enough is disconnected. A comment
+    is sent every `SSE_HEARTBEAT` seconds without event.
+    """
+    broker = request.app["events"]
+    subscriber = broker.subscribe(request.query.get("team"))
+    try:
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscriber.get(), SSE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                frame = b":\n\n"
+            if frame is None:
+                break
+            await response.write(frame)
+    finally:
+        broker.unsubscribe(subscriber)
+    return response
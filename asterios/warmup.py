@@ -0,0 +1,100 @@
+"""
+This module contains the warmup of the loaded themes.
+
+When the warmup is enabled, `make_app` instantiates each level of each
+theme with each difficulty, generates a puzzle and encodes it before
+serving, so the first team members don't pay for the lazy imports and the
+caches of the levels. The shared levels (see `BaseLevel.member_state`) are
+instantiated and, when the `puzzle_pool` is enabled, the pools of
+the poolable levels are filled. The warmup also finds the broken themes:
+
+    - the missing levels, e.g. a theme defining `Level1` and `Level3`.
+    - the levels raising an error or generating a puzzle that can't be
+      encoded in JSON.
+    - the levels generating a puzzle slower than the budget.
+
+The duration of each level is logged. With `strict`, the server refuses
+to start when a theme is broken.
+"""
+
+import logging
+import time
+
+from .level import Difficulty, MetaLevel, _new_level
+from .puzzle_pool import puzzle_pool
+from .serializer import serializer
+
+
+_logger = logging.getLogger(__name__)
+
+
+def missing_levels(theme):
+    """
+    Return the numbers of the levels missing in `theme`.
+
+    >>> from asterios.level import BaseLevel
+    >>> MetaLevel.clean()
+    >>> class Level1(BaseLevel):
+    ...     "tip"
+    ...     def generate_puzzle(self):
+    ...         return 1
+    ...     def check_answer(self, answer):
+    ...         return (True, '')
+    >>> class Level3(Level1):
+    ...     "tip"
+    ...     generate_puzzle = Level1.generate_puzzle
+    ...     check_answer = Level1.check_answer
+    >>> missing_levels('asterios.warmup')
+    [2]
+    >>> MetaLevel.clean()
+    """
+    numbers = MetaLevel.get_levels(theme)
+    return [number for number in range(1, max(numbers) + 1) if number not in numbers]
+
+
+def warm_up(themes=None, budget=0.0):
+    """
+    Generate and encode a puzzle of each level of `themes` (all the loaded
+    themes by default) with each difficulty, then fill the `puzzle_pool`
+    of the level.
+
+    Return a 2-tuple with the list of (theme, level number, difficulty,
+    duration) and the list of errors. The levels slower than `budget`
+    seconds are errors, unless `budget` is 0.
+    """
+    durations = []
+    errors = []
+    for theme in themes or MetaLevel.get_themes():
+        errors.extend(
+            "{}: Level{} is missing".format(theme, number)
+            for number in missing_levels(theme)
+        )
+        for number, level_class in sorted(MetaLevel.get_levels(theme).items()):
+            for difficulty in Difficulty:
+                name = "{} Level{} ({})".format(theme, number, difficulty.value)
+                start = time.perf_counter()
+                try:
+                    level = _new_level(level_class, difficulty)
+                    serializer.dumps(level.generate_puzzle())
+                    duration = time.perf_counter() - start
+                    puzzle_pool.fill(theme, level_class, difficulty)
+                except Exception as error:  # pylint: disable=broad-except
+                    errors.append("{}: {!r}".format(name, error))
+                    continue
+                durations.append((theme, number, difficulty, duration))
+                _logger.info("%s: %.3f ms", name, duration * 1000)
+                if budget and duration > budget:
+                    errors.append(
+                        "{}: {:.3f} ms > {:.3f} ms".format(
+                            name, duration * 1000, budget * 1000
+                        )
+                    )
+
+    _logger.info(
+        "Warmed up %d puzzles in %.3f s",
+        len(durations),
+        sum(duration for *_, duration in durations),
+    )
+    for error in errors:
+        _logger.error(error)
+    return durations, errors
@@ -0,0 +1,310 @@
+"""
+This module contains the `Watchdog` measuring the lag of the event loop
+and finding the level code blocking it.
+
+A background task sleeps `interval` seconds in a loop, the lag is the time
+it wakes up late. `LevelSet.call_level` registers each call of
+`generate_puzzle` and `check_answer` in the watchdog, a background thread
+samples the stack of the calls running for longer than `threshold` and the
+calls slower than `threshold` are recorded by theme, level class and method.
+
+The offenders are returned by `GET /admin/lag` and the current lag by
+`GET /health`. When a file is configured, the number of slow calls of each
+level method is saved in it when the server stops, and the level methods
+slower than `threshold` at least `repeat` times are logged at startup.
+"""
+
+import asyncio
+from collections import deque
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from aiohttp import web
+from aiohttp_security import check_permission
+
+
+_logger = logging.getLogger(__name__)
+
+MAX_SAMPLES = 5
+STACK_DEPTH = 12
+
+
+def _stack(frame):
+    return [
+        "{}:{} {}".format(entry.filename, entry.lineno, entry.name)
+        for entry in traceback.extract_stack(frame, STACK_DEPTH)
+    ]
+
+
+def _offender_key(theme, level_class, method):
+    return "{}:{}.{}.{}".format(
+        theme, level_class.__module__, level_class.__qualname__, method
+    )
+
+
+class Watchdog:
+    """
+    Measures the lag of the event loop and records the slow level calls.
+
+    The watchdog is disabled while `threshold` is 0.
+
+    >>> from asterios.level import BaseLevel, MetaLevel
+    >>> class Level1(BaseLevel):
+    ...     "tip"
+    ...     def generate_puzzle(self):
+    ...         return 1
+    ...     def check_answer(self, answer):
+    ...         return (True, '')
+    >>> MetaLevel.clean()
+    >>> watchdog = Watchdog(threshold=0.001)
+    >>> call = watchdog.enter('theme', Level1, 'generate_puzzle')
+    >>> time.sleep(0.002)
+    >>> watchdog.exit(call)
+    >>> [(offender['level'], offender['method'], offender['count'])
+    ...  for offender in watchdog.report()['offenders']]
+    [('Level1', 'generate_puzzle', 1)]
+    """
+
+    def __init__(self, threshold=0.0, interval=0.01, path="", repeat=3):
+        self.threshold = threshold
+        self.interval = interval
+        self.path = path
+        self.repeat = repeat
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.offenders = {}
+        self.history = {}
+        self._running = {}
+        self._lock = threading.Lock()
+        self._task = None
+        self._thread = None
+        self._stopping = None
+
+    def configure(self, threshold, interval=0.01, path="", repeat=3):
+        """
+        Change the threshold, the sampling interval and the file
+        of the watchdog, and drop the recorded offenders.
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.path = path
+        self.repeat = repeat
+        self.clear()
+
+    @property
+    def enabled(self):
+        """
+        Returns True if the level calls are watched.
+        """
+        return self.threshold > 0
+
+    def enter(self, theme, level_class, method):
+        """
+        Register a level call in the current thread and return it,
+        or return None when the watchdog is disabled.
+        """
+        if self.threshold <= 0:
+            return None
+        call = (theme, level_class, method, time.perf_counter(), [])
+        self._running[threading.get_ident()] = call
+        return call
+
+    def exit(self, call):
+        """
+        Unregister `call` and record it if it is slower than the threshold.
+        """
+        self._running.pop(threading.get_ident(), None)
+        duration = time.perf_counter() - call[3]
+        if duration < self.threshold:
+            return
+
+        theme, level_class, method, _, samples = call
+        with self._lock:
+            offender = self.offenders.get((theme, level_class, method))
+            if offender is None:
+                offender = self.offenders[(theme, level_class, method)] = {
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "samples": deque(maxlen=MAX_SAMPLES),
+                }
+            offender["count"] += 1
+            offender["total"] += duration
+            offender["max"] = max(offender["max"], duration)
+            offender["samples"].extend(samples)
+
+    def sample(self):
+        """
+        Sample the stack of the level calls running for longer than
+        the threshold.
+        """
+        now = time.perf_counter()
+        frames = None
+        for ident, call in list(self._running.items()):
+            if now - call[3] < self.threshold or len(call[4]) >= MAX_SAMPLES:
+                continue
+            if frames is None:
+                frames = sys._current_frames()  # pylint: disable=protected-access
+            frame = frames.get(ident)
+            if frame is not None:
+                call[4].append(_stack(frame))
+
+    def report(self):
+        """
+        Returns the lag of the event loop and the slow level methods
+        sorted by max duration.
+        """
+        with self._lock:
+            offenders = [
+                {
+                    "theme": theme,
+                    "level": level_class.__name__,
+                    "module": level_class.__module__,
+                    "method": method,
+                    "count": offender["count"],
+                    "total": offender["total"],
+                    "max": offender["max"],
+                    "samples": list(offender["samples"]),
+                }
+                for (theme, level_class, method), offender in self.offenders.items()
+            ]
+        offenders.sort(key=lambda offender: offender["max"], reverse=True)
+        return {
+            "threshold": self.threshold,
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "offenders": offenders,
+            "flagged": self.flagged(),
+        }
+
+    def flagged(self):
+        """
+        Returns the level methods of the previous runs slower than
+        the threshold at least `repeat` times.
+        """
+        return sorted(
+            key for key, count in self.history.items() if count >= self.repeat
+        )
+
+    def clear(self):
+        """
+        Drop the recorded offenders and reset the lag.
+        """
+        with self._lock:
+            self.offenders.clear()
+        self.lag = self.max_lag = 0.0
+
+    def load(self):
+        """
+        Load the slow call counts of the previous runs and log the level
+        methods slower than the threshold at least `repeat` times.
+        """
+        self.history = {}
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as history_file:
+                self.history = json.load(history_file)
+        except ValueError:
+            _logger.warning("Ignore the invalid watchdog file %s", self.path)
+            return
+        for key in self.flagged():
+            _logger.warning(
+                "%s was slower than %ss %d times",
+                key,
+                self.threshold,
+                self.history[key],
+            )
+
+    def save(self):
+        """
+        Add the slow call counts of this run to the file.
+        """
+        if not self.path:
+            return
+        history = dict(self.history)
+        with self._lock:
+            for (theme, level_class, method), offender in self.offenders.items():
+                key = _offender_key(theme, level_class, method)
+                history[key] = history.get(key, 0) + offender["count"]
+        with open(self.path, "w", encoding="utf-8") as history_file:
+            json.dump(history, history_file, indent=1, sort_keys=True)
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - start - self.interval)
+            self.max_lag = max(self.max_lag, self.lag)
+
+    def _sample_periodically(self):
+        while not self._stopping.wait(self.interval):
+            self.sample()
+
+    async def start(self, app=None):
+        """
+        Start the task measuring the lag and the thread sampling
+        the slow level calls.
+
+        This coroutine can be used as aiohttp `on_startup` signal.
+        """
+        # pylint: disable=unused-argument
+        if self.enabled and self._task is None:
+            self.load()
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(
+                target=self._sample_periodically, name="asterios-watchdog", daemon=True
+            )
+            self._thread.start()
+            self._task = asyncio.ensure_future(self._measure())
+
+    async def stop(self, app=None):
+        """
+        Stop the task and the thread and save the slow call counts.
+
+        This coroutine can be used as aiohttp `on_cleanup` signal.
+        """
+        # pylint: disable=unused-argument
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+            self.save()
+
+
+watchdog = Watchdog()
+
+
+async def health_handler(request):
+    """
+    Return the lag of the event loop, the status is 503 while the lag
+    is greater than the threshold of the watchdog.
+    """
+    # pylint: disable=unused-argument
+    if not watchdog.enabled:
+        return web.json_response({"status": "ok", "lag": None})
+    lagging = watchdog.lag > watchdog.threshold
+    return web.json_response(
+        {"status": "lagging" if lagging else "ok", "lag": watchdog.lag},
+        status=503 if lagging else 200,
+    )
+
+
+async def lag_handler(request):
+    """
+    Return the report of the watchdog, only for the superuser.
+    """
+    await check_permission(request, "admin.read")
+    return web.json_response(watchdog.report())
@@ -8,6 +8,9 @@ class Level1(BaseLevel):
     ["2 + 3", "5 + 3", ...]  --> [6, 7, ...]
     """
 
+    poolable = True
+    member_state = ("expected",)
+
     def __init__(self, difficulty):
         super().__init__(difficulty)
         self.expected = []
@@ -34,6 +37,9 @@ class Level2(BaseLevel):
     ["a + b", "b + c", ...]  --> [??, ??, ...]
     """
 
+    poolable = True
+    member_state = ("expected", "tries")
+
     def __init__(self, difficulty):
         super().__init__(difficulty)
         self.tries = 0
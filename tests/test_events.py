@@ -0,0 +1,111 @@
+import asyncio
+import json
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from asterios.events import EventBroker
+from asterios.level import BaseLevel, MetaLevel
+from asterios.models import Model, error_middleware
+from asterios.routes import setup_routes
+
+
+def _load_level():
+    MetaLevel.clean()
+
+    class Level1(BaseLevel):
+        "tip"
+
+        def generate_puzzle(self):
+            return 1
+
+        def check_answer(self, answer):
+            return (answer == 1, '')
+
+
+class TestEventBroker(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        _load_level()
+        self.broker = EventBroker(buffer_size=2)
+        self.model = Model()
+        self.model.subscribe(self.broker)
+        self.model.create({
+            'team': 'SG1',
+            'team_members': [{'name': 'D. Jackson'}],
+            'duration': 60
+        })
+        self.model.create({
+            'team': 'SG2',
+            'team_members': [{'name': 'Teal\'c'}],
+            'duration': 60
+        })
+
+    async def test_event_should_be_serialized_once(self):
+        first = self.broker.subscribe()
+        second = self.broker.subscribe()
+        self.model.start('SG1')
+        frame = await first.get()
+        self.assertIs(await second.get(), frame)
+        self.assertTrue(frame.startswith(b'event: game-started\n'))
+
+    async def test_subscriber_should_receive_events_of_its_team(self):
+        subscriber = self.broker.subscribe('SG2')
+        self.model.start('SG1')
+        self.model.start('SG2')
+        frame = await subscriber.get()
+        self.assertIn(b'"team":"SG2"', frame)
+
+    async def test_slow_subscriber_should_be_dropped(self):
+        slow = self.broker.subscribe()
+        fast = self.broker.subscribe()
+        self.model.start('SG1')
+        await fast.get()
+        self.model.start('SG2')
+        await fast.get()
+        member = self.model.member_from_name('SG1', 'D. Jackson')
+        self.model.check_answer('SG1', member.id, 1)
+
+        self.assertTrue(slow.dropped)
+        self.assertIsNone(await slow.get())
+        self.assertEqual(self.broker.subscribers, {fast})
+        self.assertTrue((await fast.get()).startswith(b'event: win\n'))
+
+
+class TestEventStream(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        _load_level()
+        app = web.Application(middlewares=[error_middleware])
+        setup_routes(app)
+        app['model'] = Model()
+        app['events'] = EventBroker()
+        app['model'].subscribe(app['events'])
+        app.on_shutdown.append(app['events'].stop)
+        app['model'].create({
+            'team': 'SG1',
+            'team_members': [{'name': 'D. Jackson'}],
+            'duration': 60
+        })
+        self.model = app['model']
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_events_should_be_streamed(self):
+        response = await self.client.get('/events')
+        self.assertEqual(response.headers['Content-Type'], 'text/event-stream')
+        while not self.client.app['events'].subscribers:
+            await asyncio.sleep(0.01)
+
+        self.model.start('SG1')
+        member = self.model.member_from_name('SG1', 'D. Jackson')
+        self.model.check_answer('SG1', member.id, 1)
+
+        lines = [await response.content.readline() for _ in range(6)]
+        self.assertEqual(lines[0], b'event: game-started\n')
+        self.assertEqual(lines[3], b'event: win\n')
+        data = json.loads(lines[4][len(b'data: '):])
+        self.assertEqual(data['member_id'], member.id)
+        response.close()
@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
+
+from asterios.level import BaseLevel, Difficulty, MetaLevel, get_level_set
+
+
+def _load_level():
+    MetaLevel.clean()
+    created = []
+
+    class Level1(BaseLevel):
+        "Shared level"
+
+        member_state = ('expected', 'tries')
+
+        def __init__(self, difficulty):
+            super().__init__(difficulty)
+            created.append(type(self))
+            self.expected = None
+            self.tries = 0
+
+        def generate_puzzle(self):
+            self.expected = id(self) + self.tries
+            return 'puzzle'
+
+        def check_answer(self, answer):
+            self.tries += 1
+            return (answer == self.expected, str(self.tries))
+
+    class Level2(BaseLevel):
+        "Level by member"
+
+        def __init__(self, difficulty):
+            super().__init__(difficulty)
+            created.append(type(self))
+
+        def generate_puzzle(self):
+            return 'puzzle 2'
+
+        def check_answer(self, answer):
+            return (True, '')
+
+    return created
+
+
+class TestLazyLevelSet(unittest.TestCase):
+
+    def setUp(self):
+        self.created = _load_level()
+
+    def test_levels_should_be_instantiated_when_they_become_current(self):
+        level_set = get_level_set('tests.test_level')
+        self.assertEqual(self.created, [])
+        level_set.generate_puzzle()
+        self.assertEqual([cls.__name__ for cls in self.created], ['Level1'])
+
+    def test_stateless_levels_should_be_shared(self):
+        level_sets = [get_level_set('tests.test_level', difficulty=Difficulty.HARD)
+                      for _ in range(3)]
+        for level_set in level_sets:
+            level_set.generate_puzzle()
+
+        self.assertEqual(len(self.created), 1)
+        other = get_level_set('tests.test_level', difficulty=Difficulty.EASY)
+        other.generate_puzzle()
+        self.assertEqual(len(self.created), 2)
+
+    def test_member_state_should_be_kept_by_level_set(self):
+        first = get_level_set('tests.test_level')
+        second = get_level_set('tests.test_level')
+        first.generate_puzzle()
+        second.generate_puzzle()
+
+        self.assertEqual(first.check_answer(None), (False, '1'))
+        self.assertEqual(first.check_answer(None), (False, '2'))
+        self.assertEqual(second.check_answer(None), (False, '1'))
+
+        expected = second.current_level.expected
+        self.assertEqual(second.check_answer(expected), (True, '2'))
+        self.assertEqual(second.level_number, 2)
+        self.assertEqual(second.generate_puzzle(), 'puzzle 2')
+
+    def test_set_level_state_should_update_member_state(self):
+        level_set = get_level_set('tests.test_level')
+        level_set.set_level_state({'expected': 42})
+        self.assertEqual(level_set.check_answer(42), (True, '1'))
+
+    def test_current_level_should_be_a_copy_of_the_shared_level(self):
+        first = get_level_set('tests.test_level')
+        second = get_level_set('tests.test_level')
+        self.assertIsInstance(first.current_level, BaseLevel)
+        self.assertIsNot(first.current_level, second.current_level)
+        self.assertEqual(len(self.created), 1)
+
+    def test_level_set_should_only_keep_the_member_state(self):
+        level_set = get_level_set('tests.test_level')
+        level_set.generate_puzzle()
+        level_set.check_answer(None)
+        self.assertIsNone(level_set._level)
+        self.assertEqual(level_set._state,
+                         (level_set.current_level.expected, 1))
+
+    def test_calls_of_level_sets_should_run_concurrently(self):
+        MetaLevel.clean()
+        barrier = threading.Barrier(2, timeout=5)
+
+        class Level1(BaseLevel):
+            "Wait for the other team member"
+
+            member_state = ('expected',)
+
+            def generate_puzzle(self):
+                barrier.wait()
+                self.expected = threading.get_ident()
+                return 'puzzle'
+
+            def check_answer(self, answer):
+                return (answer == self.expected, '')
+
+        level_sets = [get_level_set('tests.test_level') for _ in range(2)]
+        with ThreadPoolExecutor(2) as pool:
+            puzzles = list(pool.map(lambda level_set: level_set.generate_puzzle(),
+                                    level_sets))
+        self.assertEqual(puzzles, ['puzzle', 'puzzle'])
+        self.assertNotEqual(level_sets[0].current_level.expected,
+                            level_sets[1].current_level.expected)
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        _load_level()
+
+    def test_level_sets_should_share_the_level_tuple(self):
+        first = get_level_set('tests.test_level')
+        second = get_level_set('tests.test_level', difficulty=Difficulty.HARD)
+        self.assertIs(first._levels, second._levels)
+        self.assertIs(MetaLevel.get_themes(), MetaLevel.get_themes())
+        self.assertEqual(MetaLevel.catalog().level_count('tests.test_level'), 2)
+
+    def test_tips_should_be_rendered_once(self):
+        level_set = get_level_set('tests.test_level')
+        self.assertIs(level_set.tip(), level_set.tip())
+        self.assertEqual(level_set.tip(), 'Shared level')
+
+    def test_catalog_should_be_compiled_when_a_level_is_defined(self):
+        catalog = MetaLevel.catalog()
+
+        class Level4(BaseLevel):
+            "Level after a missing level"
+
+            def generate_puzzle(self):
+                return 'puzzle 4'
+
+            def check_answer(self, answer):
+                return (True, '')
+
+        self.assertIsNot(MetaLevel.catalog(), catalog)
+        self.assertEqual(MetaLevel.get_themes(), ('tests.test_level',))
+        with self.assertRaisesRegex(LookupError, 'has missing levels'):
+            get_level_set('tests.test_level')
+        with self.assertRaisesRegex(LookupError, 'not in the register'):
+            get_level_set('unknown')
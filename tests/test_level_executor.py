@@ -0,0 +1,128 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+
+from asterios.level import BaseLevel, Difficulty, LevelSet, MetaLevel
+from asterios.level_executor import LevelExecutor
+from asterios.models import Model
+from asterios.models.storage import MemoryStorage
+
+
+class Level1(BaseLevel):
+    "Send the pid"
+
+    def generate_puzzle(self):
+        self.expected = os.getpid()
+        return 'pid ?'
+
+    def check_answer(self, answer):
+        return (answer == self.expected, str(os.getpid()))
+
+
+class TestProcessMode(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = LevelExecutor(process_themes=[__name__])
+
+    def tearDown(self):
+        asyncio.run(self.executor.shutdown())
+
+    def test_level_state_should_round_trip(self):
+        level_set = LevelSet(__name__, (Level1,), difficulty=Difficulty.EASY)
+
+        async def scenario():
+            puzzle = await self.executor.call_level(level_set, 'generate_puzzle')
+            worker_pid = level_set.current_level.expected
+            result = await self.executor.call_level(
+                level_set, 'check_answer', worker_pid)
+            return puzzle, worker_pid, result
+
+        puzzle, worker_pid, result = asyncio.run(scenario())
+        self.assertEqual(puzzle, 'pid ?')
+        self.assertNotEqual(worker_pid, os.getpid())
+        self.assertEqual(result[0], True)
+
+    def test_other_executors_should_run_inline(self):
+        level_set = LevelSet(__name__, (Level1,), difficulty=Difficulty.EASY)
+        asyncio.run(LevelExecutor().call_level(level_set, 'generate_puzzle'))
+        self.assertEqual(level_set.current_level.expected, os.getpid())
+
+
+class _ThreadRecorder(MemoryStorage):
+
+    def __init__(self):
+        self.threads = []
+
+    def level_advanced(self, game, member):
+        self.threads.append(threading.get_ident())
+
+
+class TestThreadMode(unittest.TestCase):
+
+    def setUp(self):
+        MetaLevel.clean()
+        self.active = active = []
+        self.overlaps = overlaps = []
+        self.threads = threads = []
+
+        class Level1(BaseLevel):
+            "Wait"
+
+            def generate_puzzle(self):
+                active.append(1)
+                overlaps.append(len(active))
+                threads.append(threading.get_ident())
+                time.sleep(0.001)
+                self.expected = 1
+                active.pop()
+                return 'wait'
+
+            def check_answer(self, answer):
+                return (answer == self.expected, '')
+
+        class Level2(Level1):
+            "Wait again"
+
+            generate_puzzle = Level1.generate_puzzle
+            check_answer = Level1.check_answer
+
+        self.recorder = _ThreadRecorder()
+        self.model = Model(executor=LevelExecutor(thread_themes=[__name__]))
+        self.model.subscribe(self.recorder)
+        self.model.create({
+            'team': 'SG1',
+            'team_members': [{'name': 'D. Jackson'}],
+            'duration': 60
+        })
+        self.model.start('SG1')
+        self.member = self.model.member_from_name('SG1', 'D. Jackson')
+
+    def tearDown(self):
+        asyncio.run(self.model.executor.shutdown())
+
+    def test_calls_of_a_member_should_be_serialized(self):
+        async def scenario():
+            await asyncio.gather(*(
+                self.model.set_question_async('SG1', self.member.id)
+                for _ in range(10)
+            ))
+
+        asyncio.run(scenario())
+        self.assertEqual(self.overlaps, [1] * 10)
+
+    def test_only_the_level_code_should_leave_the_event_loop(self):
+        async def scenario():
+            question = await self.model.set_question_async('SG1', self.member.id)
+            result = await self.model.check_answer_async(
+                'SG1', self.member.id, 1)
+            return question, result
+
+        question, result = asyncio.run(scenario())
+        self.assertEqual(question['puzzle'], 'wait')
+        self.assertEqual(result, (True, ''))
+        self.assertEqual(self.member.levels_obj.level_number, 2)
+        self.assertEqual(len(self.threads), 2)
+        self.assertNotIn(threading.get_ident(), self.threads)
+        self.assertEqual(self.recorder.threads, [threading.get_ident()])
@@ -0,0 +1,75 @@
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from asterios.level import BaseLevel, MetaLevel
+from asterios.metrics import Histogram, metrics, metrics_middleware
+from asterios.models import Model, error_middleware
+from asterios.routes import setup_routes
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_buckets_should_be_cumulative(self):
+        histogram = Histogram('duration', 'The durations.', (), (1, 2))
+        for value in (0.5, 1, 1.5, 3):
+            histogram.observe((), value)
+        self.assertEqual(histogram.render().splitlines()[2:], [
+            'duration_bucket{le="1"} 2',
+            'duration_bucket{le="2"} 3',
+            'duration_bucket{le="+Inf"} 4',
+            'duration_sum{} 6.0',
+            'duration_count{} 4',
+        ])
+
+
+class TestMetricsMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip"
+
+            def generate_puzzle(self):
+                return [1, 2, 3]
+
+            def check_answer(self, answer):
+                return (answer == 6, '')
+
+        metrics.clear()
+        app = web.Application(middlewares=[metrics_middleware, error_middleware])
+        setup_routes(app)
+        app['model'] = Model()
+        game = app['model'].create({
+            'team': 'SG1',
+            'team_members': [{'name': 'D. Jackson'}],
+            'duration': 60
+        })
+        app['model'].start('SG1')
+        self.member_id = game.member_from_name('D. Jackson').id
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_requests_and_levels_should_be_recorded(self):
+        url = '/asterios/SG1/member/{}/'.format(self.member_id)
+        await self.client.put(url + 'puzzle')
+        await self.client.put(url + 'solve', json=6)
+        await self.client.get('/game-config/SG2')
+
+        response = await self.client.get('/metrics')
+        self.assertEqual(response.status, 200)
+        text = await response.text()
+        self.assertIn('asterios_requests_total{route="asterios-puzzle",'
+                      'method="PUT",status="200"} 1', text)
+        self.assertIn('asterios_requests_total{route="game-item",'
+                      'method="GET",status="404"} 1', text)
+        self.assertIn('asterios_level_duration_seconds_count{'
+                      'theme="tests.test_metrics",level="Level1",'
+                      'difficulty="easy",method="check_answer"} 1', text)
+        self.assertIn('asterios_puzzle_size_bytes_sum{'
+                      'theme="tests.test_metrics"} 30', text)
+        self.assertIn('asterios_answer_size_bytes_sum{'
+                      'theme="tests.test_metrics"} 1', text)
@@ -1,5 +1,6 @@
 import unittest
 from asterios.models.basemodel import *
+from asterios.models.errors import DoesntExist
 
 from voluptuous import Schema, Invalid
 
@@ -63,3 +64,59 @@ class TestCollectionFunction(unittest.TestCase):
             self.schema([])
 
 
+class Item(ModelMixin):
+    schema = Schema({'name': str, 'color': str})
+    color = IndexedField()
+
+    def __init__(self, name, color):
+        self.name = name
+        self.color = color
+
+
+class ItemCollection(Collection):
+    indexes = ('color',)
+
+
+class TestCollectionIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.red = Item('apple', 'red')
+        self.green = Item('pear', 'green')
+        self.collection = ItemCollection([self.red, self.green])
+        self.red_key = next(key for key, item in self.collection._objects.items()
+                            if item is self.red)
+
+    def test_filter_should_use_the_index(self):
+        self.assertEqual(self.collection.filter('color', 'red'), [self.red])
+        self.assertEqual(self.collection.filter('color', 'blue'), [])
+
+    def test_filter_on_unindexed_field_should_scan_the_collection(self):
+        self.assertEqual(self.collection.filter('name', 'pear'), [self.green])
+
+    def test_index_should_follow_field_mutation(self):
+        self.red.color = 'green'
+        self.assertEqual(self.collection.filter('color', 'red'), [])
+        self.assertEqual(self.collection.filter('color', 'green'),
+                         [self.red, self.green])
+
+    def test_filter_should_keep_the_insertion_order(self):
+        plum = Item('plum', 'green')
+        self.collection.append(plum)
+        self.green.color = 'red'
+        self.green.color = 'green'
+        self.assertEqual(self.collection.filter('color', 'green'),
+                         [self.green, plum])
+        self.assertEqual(self.collection.filter('color', 'green'),
+                         [item for item in self.collection if item.color == 'green'])
+
+    def test_deleted_item_should_be_unindexed(self):
+        self.collection.delete(self.red_key)
+        self.assertEqual(self.collection.filter('color', 'red'), [])
+        self.red.color = 'green'
+        self.assertEqual(self.collection.filter('color', 'green'), [self.green])
+
+    def test_clear_should_empty_the_indexes(self):
+        self.collection.clear()
+        self.assertEqual(self.collection.filter('color', 'green'), [])
+        with self.assertRaises(DoesntExist):
+            self.collection.get_first_from_value('color', 'green')
@@ -0,0 +1,119 @@
+from datetime import timedelta
+import random
+import unittest
+
+from asterios.level import BaseLevel, MetaLevel
+from asterios.models import Model
+from asterios.models.leaderboard import RankedList
+from asterios.models.utils import utcnow
+
+
+class TestRankedList(unittest.TestCase):
+
+    def test_ranked_list_should_stay_sorted(self):
+        ranked = RankedList()
+        expected = []
+        for _ in range(5000):
+            if expected and random.random() < 0.4:
+                key = random.choice(expected)
+                expected.remove(key)
+                ranked.remove(key)
+            else:
+                key = random.random()
+                expected.append(key)
+                ranked.add(key)
+        expected.sort()
+
+        self.assertEqual(list(ranked), expected)
+        self.assertEqual(len(ranked), len(expected))
+        for index in random.sample(range(len(expected)), 50):
+            self.assertEqual(ranked[index], expected[index])
+            self.assertEqual(ranked.rank(expected[index]), index)
+            self.assertEqual(list(ranked.iter_from(index)), expected[index:])
+
+    def test_remove_missing_key_should_raise_key_error(self):
+        ranked = RankedList()
+        ranked.add(1)
+        with self.assertRaises(KeyError):
+            ranked.remove(2)
+
+
+class TestLeaderboard(unittest.TestCase):
+
+    def setUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip 1"
+
+            def generate_puzzle(self):
+                return 1
+
+            def check_answer(self, answer):
+                return (answer == 1, '')
+
+        class Level2(BaseLevel):
+            "tip 2"
+
+            generate_puzzle = Level1.generate_puzzle
+            check_answer = Level1.check_answer
+
+        self.model = Model()
+        self.start = utcnow()
+        for team in ('SG1', 'SG2', 'SG3'):
+            self.model.create({
+                'team': team,
+                'team_members': [{'name': 'A'}, {'name': 'B'}],
+                'duration': 60
+            })
+        with utcnow.patch(self.start):
+            self.model.start('SG1')
+            self.model.start('SG2')
+
+    def solve(self, team, name, minutes):
+        member = self.model.member_from_name(team, name)
+        with utcnow.patch(self.start + timedelta(minutes=minutes)):
+            self.model.check_answer(team, member.id, 1)
+
+    def ranking(self):
+        return [(entry['team'], entry['name'])
+                for entry in self.model.leaderboard.page(0, 100)]
+
+    def test_members_of_started_games_should_be_ranked(self):
+        self.assertEqual(len(self.model.leaderboard), 4)
+        self.assertEqual(self.model.leaderboard.team(self.model.game('SG3')), [])
+
+    def test_members_should_be_ranked_by_level_and_date(self):
+        self.solve('SG2', 'B', 1)
+        self.solve('SG1', 'A', 2)
+        self.solve('SG1', 'A', 3)
+        self.assertEqual(self.ranking()[:2], [('SG1', 'A'), ('SG2', 'B')])
+        entry = self.model.leaderboard.page(0, 1)[0]
+        self.assertEqual(entry['rank'], 1)
+        self.assertEqual(entry['won_at'], self.start + timedelta(minutes=3))
+
+    def test_winner_should_be_ranked_before_member_of_the_same_level(self):
+        self.solve('SG2', 'B', 1)
+        self.solve('SG1', 'A', 2)
+        self.solve('SG1', 'A', 3)
+        self.solve('SG1', 'B', 4)
+        self.assertEqual(self.ranking()[:3],
+                         [('SG1', 'A'), ('SG2', 'B'), ('SG1', 'B')])
+
+    def test_member_and_team_views_should_return_ranks(self):
+        self.solve('SG2', 'B', 1)
+        member = self.model.member_from_name('SG2', 'B')
+        self.assertEqual(self.model.leaderboard.member(member)['rank'], 1)
+        self.assertEqual(
+            [entry['name']
+             for entry in self.model.leaderboard.team(self.model.game('SG2'))],
+            ['B', 'A'])
+
+    def test_pages_should_not_overlap(self):
+        pages = [self.model.leaderboard.page(offset, 3) for offset in (0, 3)]
+        self.assertEqual([len(page) for page in pages], [3, 1])
+        self.assertEqual([entry['rank'] for entry in pages[1]], [4])
+
+    def test_deleted_game_should_be_removed(self):
+        self.model.delete_game('SG1')
+        self.assertEqual(sorted(self.ranking()), [('SG2', 'A'), ('SG2', 'B')])
@@ -0,0 +1,87 @@
+import unittest
+
+from asterios.level import BaseLevel, MetaLevel
+from asterios.models import Model
+from asterios.models.basemodel import IdAllocator
+from asterios.models.errors import GameConflict, GameDoesntExist, MemberDoesntExist
+
+
+class TestIdAllocator(unittest.TestCase):
+
+    def test_ids_should_be_unique_across_blocks(self):
+        allocate = IdAllocator(start=10)
+        ids = [allocate() for _ in range(5000)]
+        self.assertEqual(len(set(ids)), 5000)
+        self.assertEqual(min(ids), 10)
+
+    def test_ids_should_stay_compact_across_restores(self):
+        ids = set()
+        for _ in range(20):
+            allocate = IdAllocator(start=10)
+            allocate.reserve(ids)
+            ids.update(allocate() for _ in range(40))
+        self.assertEqual(len(ids), 800)
+        self.assertLess(max(ids), 1000)
+
+
+class TestMemberIndex(unittest.TestCase):
+
+    def setUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip"
+
+            def generate_puzzle(self):
+                return ''
+
+            def check_answer(self, answer):
+                return (True, '')
+
+        self.model = Model()
+        for team in ('SG1', 'SG2'):
+            self.model.create({
+                'team': team,
+                'team_members': [{'name': 'member {}'.format(i)}
+                                 for i in range(50)],
+                'duration': 60
+            })
+
+    def test_member_ids_should_be_unique_in_the_model(self):
+        ids = [member.id for game in self.model for member in game.team_members]
+        self.assertEqual(len(set(ids)), 100)
+
+    def test_member_should_be_found_from_its_id(self):
+        member = self.model.member_from_name('SG2', 'member 3')
+        self.assertIs(self.model.member_from_id('SG2', str(member.id)), member)
+
+    def test_member_of_another_game_should_not_be_found(self):
+        member = self.model.member_from_name('SG2', 'member 3')
+        with self.assertRaises(MemberDoesntExist):
+            self.model.member_from_id('SG1', member.id)
+        with self.assertRaises(GameDoesntExist):
+            self.model.member_from_id('SG3', member.id)
+
+    def test_game_should_be_checked_before_the_member(self):
+        with self.assertRaises(GameDoesntExist):
+            self.model.set_question('SG3', 'not an id')
+        with self.assertRaises(GameDoesntExist):
+            self.model.check_answer('SG3', 'not an id', 1)
+        with self.assertRaises(GameConflict):
+            self.model.set_question('SG1', 'not an id')
+        with self.assertRaises(GameConflict):
+            self.model.check_answer('SG1', 'not an id', 1)
+        self.model.start('SG1')
+        with self.assertRaises(MemberDoesntExist):
+            self.model.set_question('SG1', 'not an id')
+
+    def test_added_member_should_be_indexed(self):
+        self.model.add_member('SG1', {'name': 'new'})
+        member = self.model.member_from_name('SG1', 'new')
+        self.assertIs(self.model.member_from_id('SG1', member.id), member)
+
+    def test_members_of_deleted_game_should_be_unindexed(self):
+        member = self.model.member_from_name('SG1', 'member 3')
+        self.model.delete_game('SG1')
+        with self.assertRaises(GameDoesntExist):
+            self.model.member_from_id('SG1', member.id)
@@ -0,0 +1,68 @@
+from enum import Enum
+import gc
+import sys
+import time
+import types
+import unittest
+
+from asterios.level import BaseLevel, MetaLevel
+from asterios.models import Model
+
+
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, Enum)
+
+
+def deep_sizeof(root):
+    """
+    Return the size of all objects reachable from `root` excluding
+    the classes, modules, functions and enum members shared by all objects.
+    """
+    seen = set()
+    size = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+class TestModelScale(unittest.TestCase):
+
+    MEMBER_COUNT = 100000
+    MEMBERS_BY_GAME = 100
+    BYTES_BY_MEMBER_CEILING = 700
+
+    def setUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip"
+
+            member_state = ('expected',)
+
+            def generate_puzzle(self):
+                self.expected = 1
+                return ''
+
+            def check_answer(self, answer):
+                return (answer == self.expected, '')
+
+    def test_memory_by_member_should_be_under_the_ceiling(self):
+        model = Model()
+        start = time.perf_counter()
+        for game_number in range(self.MEMBER_COUNT // self.MEMBERS_BY_GAME):
+            model.create({
+                'team': 'team-{}'.format(game_number),
+                'team_members': [{'name': 'member {}'.format(number)}
+                                 for number in range(self.MEMBERS_BY_GAME)],
+                'duration': 60
+            })
+        elapsed = time.perf_counter() - start
+
+        bytes_by_member = deep_sizeof(model) / self.MEMBER_COUNT
+        self.assertLess(bytes_by_member, self.BYTES_BY_MEMBER_CEILING)
+        self.assertLess(elapsed, 60)
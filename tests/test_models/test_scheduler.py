@@ -0,0 +1,64 @@
+from datetime import datetime
+import unittest
+
+from asterios.level import BaseLevel, MetaLevel
+from asterios.models import Model
+from asterios.models.utils import utcnow
+
+
+class TestExpiryScheduler(unittest.TestCase):
+
+    def setUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip"
+
+            def generate_puzzle(self):
+                return ''
+
+            def check_answer(self, answer):
+                return (True, '')
+
+        self.stopped = []
+        self.model = Model()
+        self.model.scheduler.on_expire = self.stopped.append
+        for team, duration in (('SG1', 2), ('SG2', 1), ('SG3', 3)):
+            self.model.create({
+                'team': team,
+                'team_members': [{'name': 'D. Jackson'}],
+                'duration': duration
+            })
+
+        with utcnow.patch(datetime(2018, 1, 1, 12, 0)):
+            self.model.start('SG1')
+            self.model.start('SG2')
+
+    def test_games_should_be_stopped_once_in_deadline_order(self):
+        with utcnow.patch(datetime(2018, 1, 1, 12, 1)):
+            self.model.games()
+            self.assertEqual([game.team for game in self.stopped], ['SG2'])
+
+        with utcnow.patch(datetime(2018, 1, 1, 12, 5)):
+            self.model.games()
+            self.model.games()
+            self.assertEqual([game.team for game in self.stopped], ['SG2', 'SG1'])
+
+        self.assertEqual(self.model.game('SG3').state, 'ready')
+
+    def test_remaining_should_not_mutate_the_game(self):
+        with utcnow.patch(datetime(2018, 1, 1, 12, 0, 30)):
+            game = self.model.game('SG1')
+            self.assertEqual(game.remaining, 2)
+
+        with utcnow.patch(datetime(2018, 1, 1, 12, 1)):
+            self.assertEqual(game.remaining, 1)
+            self.assertEqual(game.state, 'started')
+        self.assertIsNone(self.model.game('SG3').remaining)
+
+    def test_deleted_game_should_not_be_stopped(self):
+        self.model.delete_game('SG2')
+        with utcnow.patch(datetime(2018, 1, 1, 12, 5)):
+            self.model.games()
+        self.assertEqual([game.team for game in self.stopped], ['SG1'])
+        self.assertEqual(len(self.model.scheduler), 0)
@@ -0,0 +1,212 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from asterios.level import BaseLevel, MetaLevel
+from asterios.models import Model
+from asterios.models.basemodel import IdAllocator
+from asterios.models.storage import JournalStorage, SQLiteStorage
+
+
+class TestSQLiteStorage(unittest.TestCase):
+
+    def setUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip 1"
+
+            def generate_puzzle(self):
+                return 1
+
+            def check_answer(self, answer):
+                return (answer == 1, '')
+
+        class Level2(BaseLevel):
+            "tip 2"
+
+            generate_puzzle = Level1.generate_puzzle
+            check_answer = Level1.check_answer
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'asterios.db')
+
+    def make_model(self):
+        storage = SQLiteStorage(self.path)
+        self.addCleanup(storage.close)
+        return Model(storage=storage)
+
+    def test_games_should_be_restored(self):
+        model = self.make_model()
+        model.create({
+            'team': 'SG1',
+            'team_members': [{'name': 'O Neil'}, {'name': 'D. Jackson'}],
+            'duration': 60
+        })
+        model.create({
+            'team': 'SG2',
+            'team_members': [{'name': 'Teal\'c'}],
+            'duration': 60
+        })
+        model.start('SG1')
+        model.add_member('SG1', {'name': 'S. Carter'})
+        jackson = model.member_from_name('SG1', 'D. Jackson')
+        model.check_answer('SG1', jackson.id, 1)
+        model.check_answer('SG1', jackson.id, 1)
+        model.delete_game('SG2')
+        model.storage.flush()
+
+        restored = self.make_model()
+        restored.load()
+
+        self.assertEqual([game.team for game in restored], ['SG1'])
+        game = restored.game('SG1')
+        self.assertEqual(game.state, 'started')
+        self.assertEqual(game.start_at, model.game('SG1').start_at)
+        self.assertEqual(
+            [(member.id, member.name) for member in game.team_members],
+            [(member.id, member.name)
+             for member in model.game('SG1').team_members])
+
+        member = restored.member_from_id('SG1', jackson.id)
+        self.assertTrue(member.levels_obj.done)
+        self.assertEqual(member.won_at, jackson.won_at)
+
+    def test_new_ids_should_not_collide_with_restored_ids(self):
+        game = None
+        for restart in range(10):
+            # Each restart uses the allocator of a new process.
+            allocate = IdAllocator(start=1)
+            with mock.patch('asterios.models.member_ids', allocate), \
+                    mock.patch('asterios.models.games.member_ids', allocate):
+                model = self.make_model()
+                model.load()
+                if game is None:
+                    model.create({
+                        'team': 'SG1',
+                        'team_members': [{'name': 'O Neil'}],
+                        'duration': 60
+                    })
+                for index in range(5):
+                    game = model.add_member(
+                        'SG1', {'name': 'member {} {}'.format(restart, index)})
+                model.storage.flush()
+
+        ids = [member.id for member in game.team_members]
+        self.assertEqual(len(set(ids)), 51)
+        self.assertLess(max(ids), 100)
+
+
+class TestJournalStorage(unittest.TestCase):
+
+    def setUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip 1"
+
+            def generate_puzzle(self):
+                return 1
+
+            def check_answer(self, answer):
+                return (answer == 1, '')
+
+        class Level2(BaseLevel):
+            "tip 2"
+
+            generate_puzzle = Level1.generate_puzzle
+            check_answer = Level1.check_answer
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def make_model(self):
+        storage = JournalStorage(self.directory)
+        self.addCleanup(storage.close)
+        return Model(storage=storage)
+
+    def play(self, model):
+        model.create({
+            'team': 'SG1',
+            'team_members': [{'name': 'O Neil'}, {'name': 'D. Jackson'}],
+            'duration': 60
+        })
+        model.create({
+            'team': 'SG2',
+            'team_members': [{'name': 'Teal\'c'}],
+            'duration': 60
+        })
+        model.start('SG1')
+        model.add_member('SG1', {'name': 'S. Carter'})
+        member = model.member_from_name('SG1', 'D. Jackson')
+        model.check_answer('SG1', member.id, 1)
+        model.delete_game('SG2')
+
+    def assertRestored(self, model, restored):
+        self.assertEqual([game.team for game in restored], ['SG1'])
+        game = restored.game('SG1')
+        self.assertEqual(game.state, 'started')
+        self.assertEqual(game.start_at, model.game('SG1').start_at)
+        self.assertEqual(
+            [(member.id, member.levels_obj.level_number)
+             for member in game.team_members],
+            [(member.id, member.levels_obj.level_number)
+             for member in model.game('SG1').team_members])
+
+    def test_journal_should_be_replayed(self):
+        model = self.make_model()
+        self.play(model)
+        model.storage.flush()
+
+        restored = self.make_model()
+        restored.load()
+        self.assertRestored(model, restored)
+
+    def test_snapshot_should_truncate_journal(self):
+        model = self.make_model()
+        self.play(model)
+        model.storage.snapshot().result()
+
+        self.assertEqual(os.path.getsize(model.storage.journal_path), 0)
+        restored = self.make_model()
+        restored.load()
+        self.assertRestored(model, restored)
+
+    def test_entries_in_snapshot_should_be_skipped(self):
+        model = self.make_model()
+        self.play(model)
+        model.storage.flush()
+        with open(model.storage.journal_path, 'rb') as journal:
+            content = journal.read()
+        model.storage.snapshot().result()
+        # The server stopped before the journal was truncated
+        # and the last entry was partially written.
+        with open(model.storage.journal_path, 'wb') as journal:
+            journal.write(content + b'{"op": "cre')
+
+        restored = self.make_model()
+        restored.load()
+        self.assertRestored(model, restored)
+
+    def test_truncated_entry_should_be_removed_before_appending(self):
+        model = self.make_model()
+        model.create({'team': 'A', 'team_members': [{'name': 'O Neil'}],
+                      'duration': 60})
+        model.storage.flush()
+        with open(model.storage.journal_path, 'ab') as journal:
+            journal.write(b'{"op": "cre')
+
+        restarted = self.make_model()
+        restarted.load()
+        restarted.create({'team': 'B', 'team_members': [{'name': 'O Neil'}],
+                          'duration': 60})
+        restarted.create({'team': 'C', 'team_members': [{'name': 'O Neil'}],
+                          'duration': 60})
+        restarted.storage.flush()
+
+        restored = self.make_model()
+        restored.load()
+        self.assertEqual([game.team for game in restored], ['A', 'B', 'C'])
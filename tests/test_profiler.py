@@ -0,0 +1,124 @@
+import asyncio
+import sys
+import threading
+import tracemalloc
+import types
+import unittest
+from unittest import mock
+
+from aiohttp import BasicAuth, web
+from aiohttp.test_utils import TestClient, TestServer
+from aiohttp_security import setup as setup_security
+
+from asterios.authorization import AuthorizationPolicy, BasicAuthIdentityPolicy
+from asterios.level import MetaLevel, get_level_set
+from asterios.models import error_middleware
+from asterios.profiler import reset_peak
+from asterios.routes import setup_routes
+
+
+LEVEL_MODULE = '''
+from asterios.level import BaseLevel
+
+
+class Level1(BaseLevel):
+    "tip"
+
+    def generate_puzzle(self):
+        self.puzzle = [bytearray(1000) for _ in range(100)]
+        return 1
+
+    def check_answer(self, answer):
+        return (answer == 1, '')
+'''
+
+
+class TestProfiler(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        MetaLevel.clean()
+        module = types.ModuleType('profiled_levels')
+        module.__file__ = '<profiled_levels>'
+        sys.modules[module.__name__] = module
+        self.addCleanup(sys.modules.pop, module.__name__)
+        exec(compile(LEVEL_MODULE, module.__file__, 'exec'), vars(module))
+
+        user_map = {'admin': {'password': 'secret', 'role': 'superuser'}}
+        app = web.Application(middlewares=[error_middleware])
+        setup_routes(app)
+        setup_security(
+            app, BasicAuthIdentityPolicy(user_map), AuthorizationPolicy(user_map))
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+        self.auth = BasicAuth('admin', 'secret')
+
+    async def test_profile_should_return_collapsed_stacks(self):
+        stop = threading.Event()
+
+        def busy():
+            while not stop.is_set():
+                sum(range(1000))
+
+        thread = threading.Thread(target=busy, name='busy')
+        thread.start()
+        try:
+            response = await self.client.get(
+                '/admin/profile?seconds=0.1', auth=self.auth)
+            text = await response.text()
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertEqual(response.status, 200)
+        stacks = dict(line.rsplit(' ', 1) for line in text.splitlines())
+        self.assertTrue(any(stack.startswith('busy;') and stack.endswith(':busy')
+                            for stack in stacks))
+        self.assertTrue(all(count.isdigit() for count in stacks.values()))
+
+    async def test_memory_should_be_grouped_by_level_module(self):
+        levels = get_level_set('profiled_levels')
+        request = asyncio.ensure_future(
+            self.client.get('/admin/memory?seconds=0.2', auth=self.auth))
+        await asyncio.sleep(0.05)
+        levels.generate_puzzle()
+        response = await request
+        report = await response.json()
+
+        self.assertEqual(response.status, 200)
+        modules = {group['module']: group for group in report['modules']}
+        self.assertGreater(modules['profiled_levels']['size'], 100000)
+        self.assertLessEqual(len(report['top']), 10)
+
+    async def test_profiler_should_require_the_superuser(self):
+        for url in ('/admin/profile', '/admin/memory'):
+            response = await self.client.get(url)
+            self.assertEqual(response.status, 401)
+
+    async def test_invalid_duration_should_be_rejected(self):
+        response = await self.client.get(
+            '/admin/profile?seconds=3600', auth=self.auth)
+        self.assertEqual(response.status, 400)
+
+
+class TestResetPeak(unittest.TestCase):
+
+    def setUp(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+
+    def assertPeakReset(self):
+        data = bytearray(100000)
+        del data
+        self.assertGreater(tracemalloc.get_traced_memory()[1], 100000)
+        reset_peak()
+        self.assertLess(tracemalloc.get_traced_memory()[1], 100000)
+
+    def test_peak_should_be_reset(self):
+        self.assertPeakReset()
+
+    def test_peak_should_be_reset_with_python_3_8(self):
+        without_reset_peak = types.SimpleNamespace(
+            clear_traces=tracemalloc.clear_traces)
+        with mock.patch('asterios.profiler.tracemalloc', without_reset_peak):
+            self.assertPeakReset()
@@ -0,0 +1,137 @@
+import asyncio
+import unittest
+
+from asterios.level import BaseLevel, Difficulty, MetaLevel
+from asterios.metrics import metrics
+from asterios.models import Model
+from asterios.puzzle_pool import PuzzlePool, puzzle_pool
+
+
+def _load_level():
+    MetaLevel.clean()
+
+    class Level1(BaseLevel):
+        "resolve calcul"
+
+        poolable = True
+        count = 0
+
+        def generate_puzzle(self):
+            type(self).count += 1
+            self.expected = type(self).count
+            return 'puzzle {}'.format(self.expected)
+
+        def check_answer(self, answer):
+            return (answer == self.expected, '')
+
+    return Level1
+
+
+class TestPuzzlePool(unittest.TestCase):
+
+    def setUp(self):
+        self.level_class = _load_level()
+        self.key = ('tests.test_puzzle_pool', self.level_class, Difficulty.EASY)
+        self.pool = PuzzlePool(depth=3)
+
+    def test_pool_should_be_bounded(self):
+        self.assertEqual(self.pool.fill(*self.key), 3)
+        self.assertEqual(self.pool.fill(*self.key), 0)
+        self.assertEqual(self.pool.stats()[self.key]['size'], 3)
+
+    def test_entries_should_be_taken_in_generation_order(self):
+        self.pool.fill(*self.key)
+        for number in (1, 2):
+            puzzle, state = self.pool.take(*self.key)
+            self.assertEqual((puzzle, state['expected']),
+                             ('puzzle {}'.format(number), number))
+
+    def test_level_without_poolable_should_not_be_pooled(self):
+        self.level_class.poolable = False
+        self.assertEqual(self.pool.fill(*self.key), 0)
+        self.assertIsNone(self.pool.take(*self.key))
+        self.assertEqual(self.pool.stats(), {})
+
+    def test_generated_puzzles_should_be_recorded_in_metrics(self):
+        metrics.clear()
+        self.pool.fill(*self.key)
+        self.assertIn('asterios_level_duration_seconds_count{'
+                      'theme="tests.test_puzzle_pool",level="Level1",'
+                      'difficulty="easy",method="generate_puzzle"} 3',
+                      metrics.render())
+
+    def test_background_task_should_fill_requested_pools(self):
+        async def scenario():
+            await self.pool.start()
+            self.pool.request_fill(*self.key)
+            for _ in range(100):
+                if self.pool.stats().get(self.key, {}).get('size') == 3:
+                    break
+                await asyncio.sleep(0.01)
+            await self.pool.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(self.pool.stats()[self.key]['size'], 3)
+
+
+class TestTeamMemberWithPuzzlePool(unittest.TestCase):
+
+    def setUp(self):
+        _load_level()
+        puzzle_pool.configure(2)
+        self.model = Model()
+        self.model.create({
+            'team': 'SG1',
+            'team_members': [{'name': 'D. Jackson'}],
+            'duration': 60
+        })
+
+    def tearDown(self):
+        puzzle_pool.configure(0)
+
+    def test_set_question_should_use_pooled_puzzle(self):
+        self.model.start('SG1')
+        member = self.model.member_from_name('SG1', 'D. Jackson')
+        level_set = member.levels_obj
+        puzzle_pool.fill(level_set.theme, level_set.current_level_class,
+                         member.difficulty)
+
+        question = self.model.set_question('SG1', member.id)
+
+        self.assertEqual(question['puzzle'], 'puzzle 1')
+        self.assertEqual(level_set.current_level.expected, 1)
+        self.assertEqual(sum(puzzle_pool.hits.values()), 1)
+        self.assertTrue(member.check_answer(1)[0])
+
+    def test_state_changed_in_place_should_be_pooled(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "sort the list"
+
+            poolable = True
+
+            def __init__(self, difficulty):
+                super().__init__(difficulty)
+                self.expected = []
+
+            def generate_puzzle(self):
+                self.expected.extend([1, 2])
+                return [2, 1]
+
+            def check_answer(self, answer):
+                return (answer == self.expected, '')
+
+        self.model.create({
+            'team': 'SG2',
+            'team_members': [{'name': 'T. Teal\'c'}],
+            'duration': 60
+        })
+        self.model.start('SG2')
+        member = self.model.member_from_name('SG2', 'T. Teal\'c')
+        puzzle_pool.fill(member.levels_obj.theme, Level1, member.difficulty)
+
+        self.assertEqual(self.model.set_question('SG2', member.id)['puzzle'], [2, 1])
+        self.assertEqual(sum(puzzle_pool.hits.values()), 1)
+        self.assertEqual(self.model.check_answer('SG2', member.id, [1, 2]),
+                         (True, ''))
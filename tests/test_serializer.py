@@ -0,0 +1,87 @@
+from collections import namedtuple
+from dataclasses import dataclass
+from datetime import datetime
+import enum
+import json
+import unittest
+
+from asterios.level import Difficulty
+from asterios.serializer import Serializer, serializer
+
+
+class Point:
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+@dataclass
+class Vector:
+    x: int
+    y: int
+
+
+class Color(enum.Enum):
+    RED = 'red'
+
+
+class Tag(str):
+    pass
+
+
+class Scores(dict):
+    pass
+
+
+Pair = namedtuple('Pair', 'first second')
+
+
+class TestSerializer(unittest.TestCase):
+
+    def setUp(self):
+        self.value = {
+            'date': datetime(2018, 1, 1, 12, 0),
+            'difficulty': Difficulty.HARD,
+            'puzzle': ['1 + 1'] * 3,
+        }
+
+    def test_native_and_stdlib_backends_should_encode_same_json(self):
+        expected = {
+            'date': '2018-01-01T12:00:00',
+            'difficulty': 'hard',
+            'puzzle': ['1 + 1'] * 3,
+        }
+        for native in (True, False):
+            with self.subTest(native=native):
+                self.assertEqual(
+                    json.loads(Serializer(native, serializer.encoders).dumps(self.value)), expected)
+
+    def test_encoder_should_be_found_from_a_base_class(self):
+        class Point3D(Point):
+            pass
+
+        local = Serializer()
+        local.register(Point, lambda point: [point.x, point.y])
+        self.assertEqual(local.dumps([Point3D(1, 2)]), b'[[1,2]]')
+
+    def test_large_integers_should_fallback_to_stdlib(self):
+        self.assertEqual(serializer.dumps([2 ** 70]), b'[1180591620717411303424]')
+
+    def test_backends_should_encode_subclasses_and_dataclasses_the_same(self):
+        encoders = dict(serializer.encoders)
+        native = Serializer(True, encoders)
+        native.register(Vector, lambda vector: [vector.x, vector.y])
+        stdlib = Serializer(False, encoders)
+        value = [Vector(1, 2), Color.RED, Difficulty.EASY, Tag('tag'),
+                 Scores(a=1), Pair(1, 2), {Tag('key'): Pair(3, 4)}]
+
+        expected = b'[[1,2],"red","easy","tag",{"a":1},[1,2],{"key":[3,4]}]'
+        self.assertEqual(stdlib.dumps(value), expected)
+        self.assertEqual(native.dumps(value), expected)
+
+    def test_natively_encoded_types_should_not_be_registered(self):
+        for type_ in (Color, Difficulty, Tag, Scores, Pair, str):
+            with self.subTest(type_=type_):
+                with self.assertRaises(TypeError):
+                    Serializer().register(type_, repr)
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from aiohttp import WSServerHandshakeError, web
+from aiohttp.test_utils import TestClient, TestServer
+
+from asterios.events import EventBroker
+from asterios.level import BaseLevel, MetaLevel
+from asterios.models import Model, error_middleware
+from asterios.routes import setup_routes
+from asterios.sharding import make_router_app, shard_of
+
+
+class TestRouter(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip"
+
+            def generate_puzzle(self):
+                return 1
+
+            def check_answer(self, answer):
+                return (answer == 1, '')
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        paths = [os.path.join(directory.name, 'worker-{}.sock'.format(index))
+                 for index in range(2)]
+
+        self.workers = []
+        for path in paths:
+            app = web.Application(middlewares=[error_middleware])
+            setup_routes(app)
+            app['model'] = Model()
+            app['events'] = EventBroker()
+            app['model'].subscribe(app['events'])
+            app.on_shutdown.append(app['events'].stop)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            await web.UnixSite(runner, path).start()
+            self.addAsyncCleanup(runner.cleanup)
+            self.workers.append(app)
+
+        self.client = TestClient(TestServer(make_router_app(paths)))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+        self.teams = ['team-{}'.format(index) for index in range(6)]
+        for team in self.teams:
+            response = await self.client.post('/game-config', json={
+                'team': team,
+                'team_members': [{'name': 'member'}],
+                'duration': 10,
+            })
+            self.assertEqual(response.status, 201)
+
+    def test_games_should_be_partitioned_by_team(self):
+        for team in self.teams:
+            owner = self.workers[shard_of(team, 2)]['model']
+            other = self.workers[1 - shard_of(team, 2)]['model']
+            self.assertEqual(owner.game(team).team, team)
+            self.assertFalse(other._games.has_id(team))
+
+    async def test_requests_should_be_routed_to_the_owner(self):
+        for team in self.teams:
+            response = await self.client.put(
+                '/game-config/{}/start'.format(team))
+            self.assertEqual(response.status, 200)
+            member = (await response.json())['team_members'][0]
+            response = await self.client.put(
+                '/asterios/{}/member/{}/solve'.format(team, member['id']),
+                json=1)
+            self.assertEqual(response.status, 201)
+
+    async def test_games_of_all_workers_should_be_listed(self):
+        response = await self.client.get('/game-config')
+        self.assertEqual(response.status, 200)
+        teams = [game['team'] for game in await response.json()]
+        self.assertEqual(sorted(teams), self.teams)
+
+    async def test_unknown_game_should_return_404(self):
+        response = await self.client.get('/game-config/unknown')
+        self.assertEqual(response.status, 404)
+
+    async def test_websocket_should_be_proxied_to_the_owner(self):
+        response = await self.client.put('/game-config/team-0/start')
+        member = (await response.json())['team_members'][0]
+        async with self.client.ws_connect(
+                '/asterios/team-0/member/{}/ws'.format(member['id'])) as ws:
+            await ws.send_json({'action': 'solve', 'answer': 1})
+            self.assertTrue((await ws.receive_json())['exact'])
+            self.assertEqual((await ws.receive_json())['type'], 'win')
+
+    async def test_websocket_of_unknown_member_should_return_404(self):
+        with self.assertRaises(WSServerHandshakeError) as context:
+            await self.client.ws_connect('/asterios/team-0/member/1/ws')
+        self.assertEqual(context.exception.status, 404)
+
+    async def test_events_of_all_workers_should_be_streamed(self):
+        response = await self.client.get('/events')
+        for worker in self.workers:
+            while not worker['events'].subscribers:
+                await asyncio.sleep(0.01)
+
+        for team in self.teams:
+            await self.client.put('/game-config/{}/start'.format(team))
+
+        teams = []
+        for _ in self.teams:
+            self.assertEqual(await response.content.readline(),
+                             b'event: game-started\n')
+            teams.append(json.loads(
+                (await response.content.readline())[len(b'data: '):])['team'])
+            await response.content.readline()
+        self.assertEqual(sorted(teams), self.teams)
+        response.close()
+
+    async def test_leaderboards_of_workers_should_be_merged(self):
+        for team in self.teams:
+            await self.client.put('/game-config/{}/start'.format(team))
+        response = await self.client.get('/game-config/team-3')
+        member = (await response.json())['team_members'][0]
+        await self.client.put(
+            '/asterios/team-3/member/{}/solve'.format(member['id']), json=1)
+
+        response = await self.client.get('/leaderboard?offset=0&limit=4')
+        page = await response.json()
+        self.assertEqual(page['total'], 6)
+        self.assertEqual([entry['rank'] for entry in page['entries']],
+                         [1, 2, 3, 4])
+        self.assertEqual(page['entries'][0]['team'], 'team-3')
+
+        response = await self.client.get('/leaderboard?offset=4&limit=4')
+        page = await response.json()
+        self.assertEqual([entry['rank'] for entry in page['entries']], [5, 6])
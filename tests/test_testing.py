@@ -0,0 +1,81 @@
+import sys
+import types
+import unittest
+
+from asterios.level import MetaLevel
+from asterios.testing import (
+    Budget,
+    BudgetExceeded,
+    assert_within_budget,
+    profile_theme,
+)
+
+
+LEVEL_MODULE = '''
+import time
+
+from asterios.level import BaseLevel
+
+
+class Level1(BaseLevel):
+    "tip"
+
+    def generate_puzzle(self):
+        self.expected = 6
+        return [1, 2, 3]
+
+    def check_answer(self, answer):
+        return (answer == self.expected, '')
+
+
+class Level2(BaseLevel):
+    "tip"
+
+    size = 1000
+
+    def generate_puzzle(self):
+        time.sleep(0.002)
+        return 'x' * self.size
+
+    def check_answer(self, answer):
+        return (False, '')
+'''
+
+
+class TestLevelHarness(unittest.TestCase):
+
+    def setUp(self):
+        MetaLevel.clean()
+        self.addCleanup(MetaLevel.clean)
+        module = types.ModuleType('harnessed_levels')
+        sys.modules[module.__name__] = module
+        self.addCleanup(sys.modules.pop, module.__name__)
+        exec(LEVEL_MODULE, vars(module))
+
+    def test_each_level_and_difficulty_should_be_reported(self):
+        reports = profile_theme('harnessed_levels', runs=5, solvers={1: sum})
+        self.assertEqual(
+            [(report['level'], report['difficulty']) for report in reports],
+            [(1, 'easy'), (1, 'normal'), (1, 'hard'),
+             (2, 'easy'), (2, 'normal'), (2, 'hard')])
+        self.assertEqual(reports[0]['puzzle_size'], len(b'[1,2,3]'))
+        self.assertEqual(reports[0]['answer_size'], len(b'6'))
+        self.assertEqual(reports[3]['answer_size'], len(b'null'))
+        self.assertGreaterEqual(reports[3]['generate']['p50'], 0.002)
+        self.assertGreater(reports[3]['peak_memory'], 1000)
+
+    def test_slow_level_should_exceed_the_budget(self):
+        with self.assertRaises(BudgetExceeded) as context:
+            assert_within_budget(
+                'harnessed_levels',
+                Budget(generate_p99=0.001, puzzle_size=100),
+                runs=3)
+        messages = str(context.exception).splitlines()
+        self.assertEqual(len(messages), 6)
+        self.assertTrue(all(message.startswith('harnessed_levels Level2 (')
+                            for message in messages))
+
+    def test_levels_within_the_budget_should_pass(self):
+        reports = assert_within_budget(
+            'harnessed_levels', Budget(generate_p99=1.0), runs=3)
+        self.assertEqual(len(reports), 6)
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from asterios.level import BaseLevel, MetaLevel
+from asterios.models import Model, error_middleware
+from asterios.routes import setup_routes
+from asterios.tracing import Tracer
+
+
+class TestTracer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip"
+
+            def generate_puzzle(self):
+                return [1, 2, 3]
+
+            def check_answer(self, answer):
+                return (answer == 6, '')
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'trace.jsonl')
+
+    async def start_client(self, tracer):
+        app = web.Application(middlewares=[tracer.middleware, error_middleware])
+        setup_routes(app)
+        app.on_startup.append(tracer.start)
+        app.on_cleanup.append(tracer.stop)
+        app['model'] = Model()
+        game = app['model'].create({
+            'team': 'SG1',
+            'team_members': [{'name': 'D. Jackson'}],
+            'duration': 60
+        })
+        app['model'].start('SG1')
+        self.url = '/asterios/SG1/member/{}/'.format(
+            game.member_from_name('D. Jackson').id)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def test_server_timing_should_contain_the_phases(self):
+        await self.start_client(Tracer())
+        response = await self.client.put(self.url + 'solve', json=6)
+        await self.client.close()
+
+        self.assertEqual(response.status, 201)
+        phases = [metric.split(';')[0]
+                  for metric in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual(
+            phases,
+            ['validation', 'parse', 'model', 'level', 'encode', 'total'])
+
+    async def test_trace_file_should_contain_the_requests(self):
+        await self.start_client(Tracer(server_timing=False, path=self.path))
+        response = await self.client.put(self.url + 'puzzle')
+        await self.client.get('/game-config/SG2')
+        await self.client.close()
+
+        self.assertNotIn('Server-Timing', response.headers)
+        with open(self.path) as trace_file:
+            traces = [json.loads(line) for line in trace_file]
+        self.assertEqual([(trace['path'], trace['status']) for trace in traces],
+                         [(self.url + 'puzzle', 200), ('/game-config/SG2', 404)])
+        self.assertEqual(set(traces[0]['spans']),
+                         {'validation', 'model', 'level', 'encode'})
+
+    async def test_fast_requests_should_not_be_written(self):
+        await self.start_client(Tracer(path=self.path, slow=60.0))
+        await self.client.put(self.url + 'puzzle')
+        await self.client.close()
+
+        with open(self.path) as trace_file:
+            self.assertEqual(trace_file.read(), '')
@@ -1,10 +1,16 @@
-from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
+import json
+import unittest
+
+from aiohttp.test_utils import (
+    AioHTTPTestCase, TestClient, TestServer, unittest_run_loop)
 from aiohttp import web
 from asterios.routes import setup_routes
 from asterios.models import Model, error_middleware
 from asterios.level import MetaLevel, BaseLevel
 from datetime import datetime
 from asterios.models.utils import utcnow
+from asterios.serializer import serializer
+from asterios.views import EncodingCache
 
 
 def _load_level():
@@ -61,6 +67,15 @@ class TestGameConfigView(AioHTTPTestCase):
         self.assertEqual(request.status, 200)
         self.assertEqual((await request.json()), [])
 
+    @unittest_run_loop
+    async def test_get_with_state(self):
+        url = self.app.router['game-collection'].url_for()
+        request = await self.client.request("GET", url.with_query(state='ready'))
+        self.assertEqual(request.status, 200)
+        self.assertEqual((await request.json()), [])
+        request = await self.client.request("GET", url.with_query(state='paused'))
+        self.assertEqual(request.status, 400)
+
     @unittest_run_loop
     async def test_get_unexisting(self):
         url = self.app.router['game-item'].url_for(name='unexisting')
@@ -217,3 +232,242 @@ class TestAsteriosView(AioHTTPTestCase):
                 self.assertEqual(request.status, 200, json)
                 self.assertEqual(json, {'tip': 'resolve calcul again',
                                         'puzzle': '2 * 3'})
+
+
+class TestAsteriosWebSocket(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        _load_level()
+        app = web.Application(middlewares=[error_middleware])
+        app['model'] = Model()
+        setup_routes(app)
+        app['model'].create({
+            'team': 'SG1',
+            'team_members': [{'name': 'D. Jackson', 'level_max': 2},
+                             {'name': 'S. Karter', 'level_max': 1}],
+            'duration': 60
+        })
+        app['model'].start('SG1')
+        self.id_jackson = app['model'].member_from_name('SG1', 'D. Jackson').id
+        self.id_karter = app['model'].member_from_name('SG1', 'S. Karter').id
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_puzzle_and_solve_should_be_multiplexed(self):
+        async with self.client.ws_connect(
+                '/asterios/SG1/member/{}/ws'.format(self.id_jackson)) as ws:
+            await ws.send_json({'action': 'puzzle', 'id': 1})
+            self.assertEqual(await ws.receive_json(), {
+                'type': 'puzzle', 'id': 1,
+                'tip': 'resolve calcul', 'puzzle': '1 + 1'})
+
+            await ws.send_json({'action': 'solve', 'answer': 3, 'id': 2})
+            self.assertEqual(await ws.receive_json(), {
+                'type': 'answer', 'id': 2, 'exact': False, 'comment': ':-|'})
+
+            await ws.send_json({'action': 'solve', 'answer': 2, 'id': 3})
+            self.assertEqual(await ws.receive_json(), {
+                'type': 'answer', 'id': 3, 'exact': True, 'comment': ':-)'})
+            self.assertEqual(await ws.receive_json(), {
+                'type': 'level-up', 'id': 3, 'level': 2})
+
+    async def test_last_level_should_push_win_event(self):
+        async with self.client.ws_connect(
+                '/asterios/SG1/member/{}/ws'.format(self.id_karter)) as ws:
+            await ws.send_json({'action': 'puzzle'})
+            await ws.receive_json()
+            await ws.send_json({'action': 'solve', 'answer': 2})
+            self.assertTrue((await ws.receive_json())['exact'])
+            self.assertEqual((await ws.receive_json())['type'], 'win')
+
+            await ws.send_json({'action': 'puzzle'})
+            self.assertEqual(await ws.receive_json(), {
+                'type': 'error', 'message': 'You win!',
+                'exception': 'DoneException'})
+
+    async def test_invalid_message_should_return_an_error(self):
+        async with self.client.ws_connect(
+                '/asterios/SG1/member/{}/ws'.format(self.id_jackson)) as ws:
+            await ws.send_str('{')
+            self.assertEqual((await ws.receive_json())['type'], 'error')
+            await ws.send_json({'action': 'dance'})
+            self.assertEqual((await ws.receive_json())['type'], 'error')
+
+    async def test_non_object_message_should_return_an_error(self):
+        async with self.client.ws_connect(
+                '/asterios/SG1/member/{}/ws'.format(self.id_jackson)) as ws:
+            await ws.send_str('"hidden"')
+            self.assertEqual((await ws.receive_json())['type'], 'error')
+            await ws.send_json(['id'])
+            self.assertEqual(await ws.receive_json(), {
+                'type': 'error',
+                'message': 'The message should be a JSON object',
+                'exception': 'ValueError'})
+            await ws.send_json({'action': 'puzzle', 'id': 1})
+            self.assertEqual((await ws.receive_json())['type'], 'puzzle')
+
+    async def test_unknown_member_should_return_404(self):
+        response = await self.client.get('/asterios/SG1/member/1/ws')
+        self.assertEqual(response.status, 404)
+
+
+class TestLeaderboardView(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        _load_level()
+        app = web.Application(middlewares=[error_middleware])
+        app['model'] = Model()
+        setup_routes(app)
+        for team in ('SG1', 'SG2'):
+            app['model'].create({
+                'team': team,
+                'team_members': [{'name': 'D. Jackson'}, {'name': 'S. Karter'}],
+                'duration': 60
+            })
+        app['model'].start('SG1')
+        self.member = app['model'].member_from_name('SG1', 'S. Karter')
+        app['model'].set_question('SG1', self.member.id)
+        app['model'].set_question('SG1', self.member.id)
+        app['model'].check_answer('SG1', self.member.id, 4)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_leaderboard_should_be_paginated(self):
+        response = await self.client.get('/leaderboard?offset=0&limit=1')
+        self.assertEqual(response.status, 200)
+        page = await response.json()
+        self.assertEqual(page['total'], 2)
+        self.assertEqual(len(page['entries']), 1)
+        self.assertEqual(page['entries'][0]['id'], self.member.id)
+        self.assertEqual(page['entries'][0]['level'], 2)
+
+        response = await self.client.get('/leaderboard?offset=1&limit=10')
+        page = await response.json()
+        self.assertEqual([entry['rank'] for entry in page['entries']], [2])
+
+    async def test_team_leaderboard_should_return_team_members(self):
+        response = await self.client.get('/leaderboard/SG1')
+        self.assertEqual([entry['name'] for entry in await response.json()],
+                         ['S. Karter', 'D. Jackson'])
+        response = await self.client.get('/leaderboard/SG2')
+        self.assertEqual(await response.json(), [])
+        response = await self.client.get('/leaderboard/SG3')
+        self.assertEqual(response.status, 404)
+
+    async def test_member_leaderboard_should_return_the_rank(self):
+        response = await self.client.get(
+            '/leaderboard/SG1/{}'.format(self.member.id))
+        self.assertEqual((await response.json())['rank'], 1)
+        response = await self.client.get('/leaderboard/SG2/1')
+        self.assertEqual(response.status, 404)
+
+
+class TestThemeView(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        _load_level()
+        app = web.Application(middlewares=[error_middleware])
+        app['model'] = Model()
+        setup_routes(app)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_themes_should_be_listed(self):
+        response = await self.client.get('/themes')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await response.json(),
+                         [{'name': 'tests.test_views', 'level_count': 2}])
+        self.assertEqual(response.headers['Cache-Control'],
+                         'public, max-age=86400')
+
+    async def test_theme_should_contain_the_tips(self):
+        response = await self.client.get('/themes/tests.test_views')
+        self.assertEqual(await response.json(), {
+            'name': 'tests.test_views',
+            'level_count': 2,
+            'levels': [{'level': 1, 'tip': 'resolve calcul'},
+                       {'level': 2, 'tip': 'resolve calcul again'}]})
+        response = await self.client.get('/themes/unknown')
+        self.assertEqual(response.status, 404)
+        self.assertEqual((await response.json())['exception'],
+                         'ThemeDoesntExist')
+
+    async def test_matching_etag_should_return_not_modified(self):
+        response = await self.client.get('/themes/tests.test_views')
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('"'))
+        response = await self.client.get(
+            '/themes/tests.test_views', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(await response.read(), b'')
+        response = await self.client.get(
+            '/themes', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+
+    async def test_etag_should_change_when_the_catalog_changes(self):
+        response = await self.client.get('/themes')
+        etag = response.headers['ETag']
+        _load_level()
+        response = await self.client.get('/themes')
+        self.assertEqual(response.headers['ETag'], etag)
+
+        class Level3(BaseLevel):
+            "last level"
+
+            def generate_puzzle(self):
+                return 1
+
+            def check_answer(self, answer):
+                return (True, '')
+
+        response = await self.client.get('/themes')
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual((await response.json())[0]['level_count'], 3)
+
+
+class TestEncodingCache(unittest.TestCase):
+
+    def setUp(self):
+        _load_level()
+        self.cache = EncodingCache()
+        self.model = Model()
+        self.game = self.model.create({
+            'team': 'SG1',
+            'team_members': [{'name': 'D. Jackson', 'theme': 'tests.test_views'}],
+            'duration': 60
+        })
+
+    def assertEncoded(self, game):
+        self.assertEqual(json.loads(self.cache.game(game)),
+                         json.loads(serializer.dumps(game)))
+
+    def test_cached_game_should_be_encoded_as_serializer(self):
+        self.assertEncoded(self.game)
+        with utcnow.patch(datetime(2018, 1, 1, 12, 0)):
+            self.model.start('SG1')
+            self.assertEncoded(self.game)
+
+    def test_cached_game_should_be_reused_until_a_mutation(self):
+        encoded = self.cache.game(self.game)
+        self.assertIs(self.cache.game(self.game), encoded)
+
+        self.game.add_member({'name': 'S. Karter', 'theme': 'tests.test_views'})
+        self.assertIsNot(self.cache.game(self.game), encoded)
+        self.assertEncoded(self.game)
+
+    def test_solve_should_invalidate_the_cached_member(self):
+        with utcnow.patch(datetime(2018, 1, 1, 12, 0)):
+            self.model.start('SG1')
+            member = self.model.member_from_name('SG1', 'D. Jackson')
+            self.model.set_question('SG1', member.id)
+            encoded = self.cache.member(member)
+            self.model.check_answer('SG1', member.id, 2)
+            self.assertIsNot(self.cache.member(member), encoded)
+            self.assertEncoded(self.game)
+            self.assertEqual(
+                json.loads(self.cache.game(self.game))['team_members'][0]
+                ['levels_obj']['level'], 2)
@@ -0,0 +1,99 @@
+import time
+import unittest
+
+from asterios.level import BaseLevel, Difficulty, MetaLevel, get_level_set
+from asterios.puzzle_pool import puzzle_pool
+from asterios.warmup import warm_up
+
+
+class TestWarmUp(unittest.TestCase):
+
+    def setUp(self):
+        MetaLevel.clean()
+        self.addCleanup(MetaLevel.clean)
+        self.calls = calls = []
+
+        class Level1(BaseLevel):
+            "tip"
+
+            def generate_puzzle(self):
+                calls.append(self.difficulty)
+                return [1, 2, 3]
+
+            def check_answer(self, answer):
+                return (True, '')
+
+        class Level2(BaseLevel):
+            "tip"
+
+            def generate_puzzle(self):
+                time.sleep(0.01)
+                return 2
+
+            check_answer = Level1.check_answer
+
+        self.Level1 = Level1
+
+    def test_each_level_should_generate_a_puzzle(self):
+        with self.assertLogs('asterios.warmup', 'INFO'):
+            durations, errors = warm_up()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.calls, list(Difficulty))
+        self.assertEqual([(number, difficulty)
+                          for _, number, difficulty, _ in durations],
+                         [(1, difficulty) for difficulty in Difficulty]
+                         + [(2, difficulty) for difficulty in Difficulty])
+
+    def test_slow_level_should_exceed_the_budget(self):
+        with self.assertLogs('asterios.warmup', 'ERROR') as logs:
+            _, errors = warm_up(budget=0.005)
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all(' Level2 (' in error for error in errors))
+        self.assertEqual(len(logs.records), 3)
+
+    def test_broken_levels_should_be_errors(self):
+        class Level4(BaseLevel):
+            "tip"
+
+            def generate_puzzle(self):
+                return object()
+
+            check_answer = self.Level1.check_answer
+
+        _, errors = warm_up(budget=1.0)
+        self.assertEqual(errors[0], '{}: Level3 is missing'.format(__name__))
+        self.assertEqual(len(errors), 4)
+        self.assertTrue(
+            errors[1].startswith('{} Level4 (easy): TypeError'.format(__name__)))
+
+    def test_shared_levels_and_pools_should_be_ready(self):
+        instantiated = []
+
+        class Level3(BaseLevel):
+            "tip"
+
+            poolable = True
+            member_state = ('expected',)
+
+            def __init__(self, difficulty):
+                super().__init__(difficulty)
+                instantiated.append(difficulty)
+
+            def generate_puzzle(self):
+                self.expected = 3
+                return 3
+
+            check_answer = self.Level1.check_answer
+
+        puzzle_pool.configure(2)
+        self.addCleanup(puzzle_pool.configure, 0)
+        _, errors = warm_up()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(instantiated, list(Difficulty))
+        self.assertEqual(puzzle_pool.stats()[(__name__, Level3, Difficulty.EASY)],
+                         {'size': 2, 'hits': 0, 'misses': 0})
+        level_set = get_level_set(__name__, start_level=3,
+                                  difficulty=Difficulty.EASY)
+        self.assertEqual(level_set.generate_puzzle(), 3)
+        self.assertEqual(instantiated, list(Difficulty))
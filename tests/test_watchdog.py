@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from aiohttp import BasicAuth, web
+from aiohttp.test_utils import TestClient, TestServer
+from aiohttp_security import setup as setup_security
+
+from asterios.authorization import AuthorizationPolicy, BasicAuthIdentityPolicy
+from asterios.level import BaseLevel, MetaLevel, get_level_set
+from asterios.models import error_middleware
+from asterios.routes import setup_routes
+from asterios.watchdog import watchdog
+
+
+class TestWatchdog(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        MetaLevel.clean()
+
+        class Level1(BaseLevel):
+            "tip"
+
+            def generate_puzzle(self):
+                time.sleep(0.05)
+                return 1
+
+            def check_answer(self, answer):
+                return (answer == 1, '')
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'watchdog.json')
+        watchdog.configure(0.01, interval=0.002, path=self.path, repeat=2)
+        self.addCleanup(watchdog.configure, 0.0)
+
+        user_map = {'admin': {'password': 'secret', 'role': 'superuser'}}
+        app = web.Application(middlewares=[error_middleware])
+        setup_routes(app)
+        setup_security(
+            app, BasicAuthIdentityPolicy(user_map), AuthorizationPolicy(user_map))
+        app.on_startup.append(watchdog.start)
+        app.on_cleanup.append(watchdog.stop)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.levels = get_level_set(MetaLevel.get_themes()[0])
+
+    async def test_slow_level_should_be_reported(self):
+        self.levels.generate_puzzle()
+        self.levels.check_answer(1)
+        await asyncio.sleep(0.01)
+
+        response = await self.client.get(
+            '/admin/lag', auth=BasicAuth('admin', 'secret'))
+        report = await response.json()
+        await self.client.close()
+
+        self.assertGreater(report['max_lag'], 0.01)
+        self.assertEqual(len(report['offenders']), 1)
+        offender = report['offenders'][0]
+        self.assertEqual((offender['level'], offender['method'], offender['count']),
+                         ('Level1', 'generate_puzzle', 1))
+        self.assertTrue(offender['samples'][0][-1].endswith(' generate_puzzle'))
+
+    async def test_admin_endpoint_should_require_the_superuser(self):
+        response = await self.client.get('/admin/lag')
+        await self.client.close()
+        self.assertEqual(response.status, 401)
+
+    async def test_health_should_return_the_lag(self):
+        # The lag is set by the test, a slow test runner can lag.
+        await watchdog.stop()
+        watchdog.lag = 0.0
+        response = await self.client.get('/health')
+        health = await response.json()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(health['status'], 'ok')
+
+        watchdog.lag = 0.05
+        response = await self.client.get('/health')
+        health = await response.json()
+        await self.client.close()
+        self.assertEqual(response.status, 503)
+        self.assertEqual(health, {'status': 'lagging', 'lag': 0.05})
+
+    async def test_repeated_offenders_should_be_flagged_at_startup(self):
+        for _ in range(2):
+            self.levels.generate_puzzle()
+        await self.client.close()
+
+        with open(self.path) as history_file:
+            history = json.load(history_file)
+        self.assertEqual(list(history.values()), [2])
+
+        watchdog.configure(0.01, path=self.path, repeat=2)
+        with self.assertLogs('asterios.watchdog', 'WARNING'):
+            await watchdog.start()
+        await watchdog.stop()
+        self.assertEqual(watchdog.flagged(), list(history))